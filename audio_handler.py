@@ -2,18 +2,20 @@
 
 import os
 import pathlib
+import threading
+import time
 from tkinter import filedialog, messagebox
-from pydub import AudioSegment, exceptions as pydub_exceptions
+import audio_stream
 import config
+import metrics
 
-# Variable para guardar la ruta del archivo temporal si se crea
-_temp_wav_path: pathlib.Path | None = None
+# WAV temporales creados (puede haber más de uno: se puede elegir otro audio mientras se convierte el anterior)
+_temp_wav_paths: set[pathlib.Path] = set()
+_temp_wav_lock = threading.Lock()
 
 def select_audio_file() -> pathlib.Path | None:
     """Abre diálogo para seleccionar archivo de audio, devuelve Path o None."""
-    global _temp_wav_path # Asegurarse de resetear al seleccionar nuevo archivo
     cleanup_temp_wav() # Limpiar anterior si existe
-    _temp_wav_path = None
 
     ruta_audio_str = filedialog.askopenfilename(
         defaultextension=config.DEFAULT_EXTENSION,
@@ -26,40 +28,57 @@ def select_audio_file() -> pathlib.Path | None:
         print("Selección de archivo cancelada.")
         return None
 
+def select_audio_files(parent=None) -> list[pathlib.Path]:
+    """Abre diálogo para seleccionar varios archivos de audio (cola), devuelve lista de Path (vacía si se cancela)."""
+    rutas = filedialog.askopenfilenames(
+        parent=parent,
+        defaultextension=config.DEFAULT_EXTENSION,
+        filetypes=config.AUDIO_FILE_TYPES
+    )
+    if rutas:
+        print(f"{len(rutas)} archivos seleccionados para la cola.")
+    return [pathlib.Path(ruta) for ruta in rutas]
+
+def temp_wav_path_for(audio_path: pathlib.Path) -> pathlib.Path:
+    """Ruta del WAV temporal de reproducción/transcripción de 'audio_path'."""
+    return audio_path.with_name(f"{audio_path.stem}_temp_playback.wav") # Nombre específico
+
 def convert_to_wav_if_needed(audio_path: pathlib.Path) -> pathlib.Path | None:
     """
     Intenta cargar el archivo de audio y SIEMPRE lo re-exporta a un WAV estándar temporal.
     Esto valida y normaliza el archivo, incluso si ya tenía extensión .wav.
+    La decodificación se hace en streaming desde ffmpeg (memoria constante sea cual sea la duración).
     Devuelve la ruta al archivo WAV temporal si tiene éxito.
     Devuelve None si hay error en la carga o conversión.
-    Almacena la ruta temporal en _temp_wav_path si se crea una.
+    Anota la ruta temporal en _temp_wav_paths (la borra cleanup_temp_wav() o discard_temp_wav()).
     """
-    global _temp_wav_path
-
     # Crear nombre para archivo temporal WAV
-    temp_wav_path_obj = audio_path.with_name(f"{audio_path.stem}_temp_playback.wav") # Nombre específico
+    temp_wav_path_obj = temp_wav_path_for(audio_path)
 
     try:
-        print(f"Intentando cargar: {audio_path.name}...")
-        audio = AudioSegment.from_file(str(audio_path))
-
-        print(f"Cargado con éxito. Re-exportando a WAV estándar: {temp_wav_path_obj.name}...")
+        print(f"Decodificando en streaming: {audio_path.name} -> {temp_wav_path_obj.name}...")
         # Exportar a WAV estándar (PCM 16-bit little-endian es lo más compatible)
-        audio.export(str(temp_wav_path_obj), format="wav", codec="pcm_s16le")
-        print(f"Re-exportación exitosa: {temp_wav_path_obj.name}")
-        _temp_wav_path = temp_wav_path_obj # Guardar ruta temporal
+        start_time = time.perf_counter()
+        duration_sec = audio_stream.stream_to_wav(audio_path, temp_wav_path_obj)
+        metrics.observe("conversion_seconds", time.perf_counter() - start_time)
+        print(f"Re-exportación exitosa: {temp_wav_path_obj.name} ({duration_sec:.1f} s)")
+        with _temp_wav_lock:
+            _temp_wav_paths.add(temp_wav_path_obj) # Guardar ruta temporal
         return temp_wav_path_obj
-    except pydub_exceptions.CouldntDecodeError as e:
-        error_msg = (f"Pydub/FFmpeg no pudo decodificar el archivo: {audio_path.name}. "
+    except audio_stream.AudioDecodeError as e:
+        metrics.record_failure("conversion", e)
+        error_msg = (f"FFmpeg no pudo decodificar el archivo: {audio_path.name}. "
                      f"Puede estar corrupto o en un formato no soportado.\nError: {e}")
         print(error_msg)
         messagebox.showerror("Error de Carga/Conversión", error_msg)
     except FileNotFoundError as e:
-        error_msg = (f"No se encontró ffmpeg o ffprobe. Pydub los necesita.\n"
+        metrics.record_failure("conversion", e)
+        error_msg = (f"No se encontró ffmpeg o ffprobe.\n"
                      f"Asegúrate de que estén instalados y en el PATH del sistema.\nError: {e}")
         print(error_msg)
         messagebox.showerror("Error de Dependencia", error_msg)
     except Exception as e:
+        metrics.record_failure("conversion", e)
         error_msg = f"Error inesperado al procesar {audio_path.name}: {e}"
         print(error_msg)
         messagebox.showerror("Error Inesperado", error_msg)
@@ -68,22 +87,22 @@ def convert_to_wav_if_needed(audio_path: pathlib.Path) -> pathlib.Path | None:
                 os.remove(temp_wav_path_obj)
             except OSError: pass
 
-    _temp_wav_path = None # Falló la conversión/carga
-    return None
-
-def get_temp_wav_path() -> pathlib.Path | None:
-    """Devuelve la ruta del archivo WAV temporal si existe."""
-    return _temp_wav_path
+    return None # Falló la conversión/carga
 
-def cleanup_temp_wav():
-    """Elimina el archivo WAV temporal si existe."""
-    global _temp_wav_path
-    if _temp_wav_path and _temp_wav_path.exists():
+def discard_temp_wav(wav_path: pathlib.Path):
+    """Elimina un WAV temporal concreto (p. ej. el de una conversión que ya no corresponde al audio elegido)."""
+    with _temp_wav_lock:
+        _temp_wav_paths.discard(wav_path)
+    if wav_path.exists():
         try:
-            print(f"Eliminando archivo WAV temporal: {_temp_wav_path.name}")
-            os.remove(_temp_wav_path)
-            _temp_wav_path = None
+            print(f"Eliminando archivo WAV temporal: {wav_path.name}")
+            os.remove(wav_path)
         except Exception as e:
-            print(f"Advertencia: No se pudo eliminar el archivo WAV temporal {_temp_wav_path.name}: {e}")
-    else:
-        _temp_wav_path = None
\ No newline at end of file
+            print(f"Advertencia: No se pudo eliminar el archivo WAV temporal {wav_path.name}: {e}")
+
+def cleanup_temp_wav():
+    """Elimina los archivos WAV temporales creados."""
+    with _temp_wav_lock:
+        paths = list(_temp_wav_paths)
+    for wav_path in paths:
+        discard_temp_wav(wav_path)
\ No newline at end of file
@@ -0,0 +1,315 @@
+# audio_stream.py
+"""
+Decodificación de audio en streaming con ffmpeg.
+
+ffmpeg escribe PCM crudo (s16le) en una tubería y se lee en bloques de tamaño fijo
+sobre buffers reutilizables, de modo que la memoria usada es constante sin importar
+la duración del archivo (una grabación de 3 horas cuesta lo mismo que una nota de voz).
+"""
+
+import collections
+import hashlib
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import threading
+import wave
+import config
+
+try:
+    import numpy as np # Dependencia de Whisper; solo necesaria para las funciones float32
+except ImportError:
+    np = None
+
+WHISPER_SAMPLE_RATE = 16000 # Frecuencia que esperan los modelos Whisper
+BYTES_PER_SAMPLE = 2 # PCM s16le
+_FINGERPRINT_BLOCK_BYTES = 1024 * 1024 # Bloques leídos para la huella de un archivo
+
+
+class AudioDecodeError(Exception):
+    """ffmpeg no pudo decodificar el archivo (corrupto o formato no soportado)."""
+
+
+def _subprocess_window_kwargs() -> dict:
+    """En Windows, evita que se abra una consola por cada proceso ffmpeg."""
+    if platform.system() != "Windows":
+        return {}
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = subprocess.SW_HIDE
+    return {"startupinfo": startupinfo, "creationflags": subprocess.CREATE_NO_WINDOW}
+
+def probe_audio(source: pathlib.Path) -> tuple[int, int]:
+    """
+    Devuelve (sample_rate, canales) del primer stream de audio usando ffprobe.
+    Lanza FileNotFoundError si ffprobe no está instalado y AudioDecodeError si no hay audio.
+    """
+    command = [
+        "ffprobe", "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=sample_rate,channels", "-of", "json", str(source)
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_subprocess_window_kwargs())
+    if completed.returncode != 0:
+        raise AudioDecodeError(completed.stderr.decode("utf-8", errors="replace").strip() or "ffprobe falló.")
+    try:
+        stream_info = json.loads(completed.stdout)["streams"][0]
+        return int(stream_info["sample_rate"]), int(stream_info["channels"])
+    except (ValueError, KeyError, IndexError) as e:
+        raise AudioDecodeError(f"No se encontró un stream de audio válido en {pathlib.Path(source).name}.") from e
+
+def probe_duration(source: pathlib.Path) -> float | None:
+    """
+    Duración del archivo en segundos según el contenedor (format=duration de ffprobe), sin
+    decodificar el audio. None si ffprobe no está instalado o no la conoce.
+    """
+    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", str(source)]
+    try:
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_subprocess_window_kwargs())
+    except OSError:
+        return None
+    if completed.returncode != 0:
+        return None
+    try:
+        return float(json.loads(completed.stdout)["format"]["duration"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class PCMStream:
+    """
+    Iterador sobre el PCM s16le que ffmpeg produce para 'source'.
+
+    Cada iteración entrega un memoryview de un buffer REUTILIZADO (se sobrescribe en la
+    siguiente iteración: copiar con bytes() si hay que conservarlo). Todos los bloques
+    tienen chunk_seconds de audio salvo el último.
+
+    'source' puede ser una ruta o un objeto tipo archivo (con read(), p. ej. un miembro de
+    un ZIP): en ese caso se envía a ffmpeg por stdin sin escribirlo a disco. Los formatos que
+    necesitan búsqueda (MP4/M4A con el índice al final) pueden no decodificarse desde stdin.
+    """
+
+    def __init__(self, source: pathlib.Path, sample_rate: int | None = None, channels: int | None = None,
+                 chunk_seconds: float | None = None, offset_sec: float = 0.0, max_duration_sec: float | None = None):
+        """
+        Args:
+            source: Ruta del archivo de audio (cualquier formato que entienda ffmpeg) u objeto con read().
+            sample_rate / channels: Formato de salida. None = el del archivo original (se consulta con ffprobe,
+                                    solo posible con rutas).
+            chunk_seconds: Duración de cada bloque (None = config.STREAM_CHUNK_SECONDS).
+            offset_sec / max_duration_sec: Decodificar solo un fragmento del archivo.
+        """
+        self.source = source
+        self._from_fileobj = hasattr(source, "read")
+        self.source_name = pathlib.Path(getattr(source, "name", "stream") if self._from_fileobj else source).name
+        self.offset_sec = offset_sec
+        self.max_duration_sec = max_duration_sec
+        if self._from_fileobj and (sample_rate is None or channels is None):
+            raise ValueError("Con un objeto tipo archivo hay que indicar sample_rate y channels.")
+        if sample_rate is None or channels is None:
+            probed_rate, probed_channels = probe_audio(source)
+            sample_rate = sample_rate or probed_rate
+            channels = channels or probed_channels
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_bytes = BYTES_PER_SAMPLE * channels
+        chunk_frames = max(1, int((chunk_seconds or config.STREAM_CHUNK_SECONDS) * sample_rate))
+        self._buffer = bytearray(chunk_frames * self.frame_bytes)
+        self._process = None
+        self._stderr_tail = collections.deque(maxlen=20) # Últimas líneas de error de ffmpeg
+        self._stderr_thread = None
+        self._feeder_thread = None
+        self.frames_read = 0
+
+    def _build_command(self) -> list[str]:
+        command = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
+        if self.offset_sec > 0:
+            command += ["-ss", f"{self.offset_sec:.3f}"] # Antes de -i: búsqueda rápida en la entrada
+        if self.max_duration_sec is not None:
+            command += ["-t", f"{self.max_duration_sec:.3f}"]
+        return command + [
+            "-i", "pipe:0" if self._from_fileobj else str(self.source),
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", str(self.channels), "-ar", str(self.sample_rate),
+            "pipe:1"
+        ]
+
+    def _drain_stderr(self):
+        # Leer stderr en paralelo evita que ffmpeg se bloquee si escribe muchos errores
+        for line in iter(self._process.stderr.readline, b""):
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def _feed_stdin(self):
+        # Copia el objeto de entrada a ffmpeg en bloques (memoria constante)
+        try:
+            while True:
+                data = self.source.read(64 * 1024)
+                if not data:
+                    break
+                self._process.stdin.write(data)
+        except (BrokenPipeError, ValueError, OSError):
+            pass # ffmpeg terminó antes (error o iteración abandonada)
+        finally:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+
+    def _start(self):
+        self._process = subprocess.Popen(
+            self._build_command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0,
+            stdin=subprocess.PIPE if self._from_fileobj else subprocess.DEVNULL,
+            **_subprocess_window_kwargs()
+        )
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        if self._from_fileobj:
+            self._feeder_thread = threading.Thread(target=self._feed_stdin, daemon=True)
+            self._feeder_thread.start()
+
+    def _fill_buffer(self, view: memoryview) -> int:
+        """Llena el buffer todo lo posible. Devuelve los bytes leídos (< tamaño solo al final)."""
+        total = 0
+        while total < len(view):
+            read = self._process.stdout.readinto(view[total:])
+            if not read:
+                break
+            total += read
+        return total
+
+    def __iter__(self):
+        self._start()
+        view = memoryview(self._buffer)
+        try:
+            while True:
+                read = self._fill_buffer(view)
+                read -= read % self.frame_bytes # Solo tramas completas
+                if read == 0:
+                    break
+                self.frames_read += read // self.frame_bytes
+                yield view[:read]
+            return_code = self._process.wait()
+            if self._stderr_thread:
+                self._stderr_thread.join(timeout=1.0)
+            if return_code != 0:
+                details = "\n".join(self._stderr_tail) or f"código de salida {return_code}"
+                raise AudioDecodeError(f"ffmpeg no pudo decodificar {self.source_name}: {details}")
+        finally:
+            self.close()
+
+    @property
+    def duration_sec(self) -> float:
+        """Duración del audio leído hasta el momento."""
+        return self.frames_read / float(self.sample_rate)
+
+    def close(self):
+        """Termina ffmpeg si sigue vivo (p. ej. si el consumidor abandona la iteración)."""
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        if self._process and self._process.stdout:
+            self._process.stdout.close()
+        if self._feeder_thread:
+            self._feeder_thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_float32(source: pathlib.Path, sample_rate: int = WHISPER_SAMPLE_RATE, chunk_seconds: float | None = None):
+    """
+    Genera bloques mono float32 en [-1, 1) (el formato de entrada de Whisper).
+    Cada bloque es una vista de un array reutilizado, válida hasta la siguiente iteración.
+    """
+    if np is None:
+        raise ImportError("numpy es necesario para iter_float32 (se instala con openai-whisper).")
+    stream = PCMStream(source, sample_rate=sample_rate, channels=1, chunk_seconds=chunk_seconds)
+    float_buffer = np.empty(len(stream._buffer) // BYTES_PER_SAMPLE, dtype=np.float32)
+    for chunk in stream:
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        out = float_buffer[:len(samples)]
+        np.multiply(samples, 1.0 / 32768.0, out=out)
+        yield out
+
+def load_range(source: pathlib.Path, start_sec: float, end_sec: float, sample_rate: int = WHISPER_SAMPLE_RATE):
+    """
+    Decodifica solo el fragmento [start_sec, end_sec) como array mono float32 (formato Whisper).
+    El coste es proporcional a la duración del fragmento, no a la del archivo.
+    """
+    if np is None:
+        raise ImportError("numpy es necesario para load_range (se instala con openai-whisper).")
+    duration = max(0.0, end_sec - start_sec)
+    samples = np.zeros(int(round(duration * sample_rate)), dtype=np.float32)
+    stream = PCMStream(source, sample_rate=sample_rate, channels=1, offset_sec=start_sec, max_duration_sec=duration)
+    position = 0
+    for chunk in stream:
+        chunk_samples = np.frombuffer(chunk, dtype=np.int16)[:len(samples) - position]
+        np.multiply(chunk_samples, 1.0 / 32768.0, out=samples[position:position + len(chunk_samples)])
+        position += len(chunk_samples)
+        if position >= len(samples):
+            break
+    return samples[:position]
+
+def load_float32(source, sample_rate: int = WHISPER_SAMPLE_RATE):
+    """
+    Decodifica 'source' (ruta u objeto con read()) completo como array mono float32.
+    Pensado para clips cortos (notas de voz); para archivos largos usar iter_float32().
+    """
+    if np is None:
+        raise ImportError("numpy es necesario para load_float32 (se instala con openai-whisper).")
+    chunks = [np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+              for chunk in PCMStream(source, sample_rate=sample_rate, channels=1)]
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.concatenate(chunks)
+    samples *= 1.0 / 32768.0
+    return samples
+
+def stream_to_wav(source: pathlib.Path, wav_path: pathlib.Path) -> float:
+    """
+    Decodifica 'source' a un WAV PCM 16-bit (misma frecuencia y canales que el original)
+    bloque a bloque, sin cargar el audio entero en memoria. Devuelve la duración en segundos.
+    Si falla, borra el WAV parcial y relanza la excepción.
+    """
+    stream = PCMStream(source)
+    try:
+        with wave.open(str(wav_path), "wb") as wav_file:
+            wav_file.setnchannels(stream.channels)
+            wav_file.setsampwidth(BYTES_PER_SAMPLE)
+            wav_file.setframerate(stream.sample_rate)
+            for chunk in stream:
+                wav_file.writeframesraw(chunk)
+    except BaseException:
+        try:
+            os.remove(wav_path)
+        except OSError:
+            pass
+        raise
+    return stream.duration_sec
+
+def file_fingerprint(path: pathlib.Path) -> str:
+    """
+    Huella del contenido: tamaño + primer, central y último MB. Coste constante aunque el
+    archivo ocupe gigas, y distinta para audios distintos en la práctica.
+    """
+    path = pathlib.Path(path)
+    size = path.stat().st_size
+    digest = hashlib.blake2b(str(size).encode("ascii"), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - _FINGERPRINT_BLOCK_BYTES // 2), max(0, size - _FINGERPRINT_BLOCK_BYTES)}):
+            f.seek(offset)
+            digest.update(f.read(_FINGERPRINT_BLOCK_BYTES))
+    return digest.hexdigest()
+
+def wav_duration(wav_path: pathlib.Path) -> float | None:
+    """Duración de un WAV leyendo solo la cabecera. None si no se puede leer."""
+    try:
+        with wave.open(str(wav_path), "rb") as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except (OSError, wave.Error, ZeroDivisionError) as e:
+        print(f"Advertencia: No se pudo leer la duración de {pathlib.Path(wav_path).name}: {e}")
+        return None
@@ -0,0 +1,464 @@
+# batch_queue.py
+"""
+Cola de varios archivos con las etapas en cadena (pipeline).
+
+Cada archivo pasa por tres etapas, cada una en su propio hilo y unidas por colas:
+  1. conversión a WAV (ffmpeg en streaming),
+  2. transcripción con el modelo cargado (en el proceso de trabajo si está activo),
+  3. exportación de resultados (.txt/.srt... junto al audio) e indexado.
+Así, mientras el archivo N está en inferencia, el N+1 ya se está convirtiendo y los
+resultados del N-1 se escriben en disco: el modelo no espera a ffmpeg ni a las escrituras.
+La conversión solo se adelanta config.BATCH_PREFETCH_FILES archivos (los WAV temporales
+ocupan disco). BatchPipeline no toca Tk: avisa de los cambios con on_change() desde sus
+hilos. QueuePanel es la ventana que muestra la cola, el estado y la ETA de cada archivo
+y el rendimiento total.
+"""
+
+import os
+import pathlib
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+import audio_handler
+import audio_stream
+import config
+import exporters
+import metrics
+import transcript_index
+import whisper_transcriber
+
+# Estados de un archivo (también son el texto que se muestra)
+STATE_QUEUED = "En cola"
+STATE_CONVERTING = "Convirtiendo"
+STATE_CONVERTED = "Convertido"
+STATE_TRANSCRIBING = "Transcribiendo"
+STATE_EXPORTING = "Exportando"
+STATE_DONE = "Hecho"
+STATE_ERROR = "Error"
+STATE_CANCELLED = "Cancelado"
+FINAL_STATES = (STATE_DONE, STATE_ERROR, STATE_CANCELLED)
+
+
+class BatchItem:
+    """Un archivo de la cola, con los ajustes de transcripción y los tiempos de cada etapa."""
+
+    def __init__(self, audio_path: pathlib.Path, settings: dict, generation: int):
+        self.audio_path = pathlib.Path(audio_path)
+        self.settings = dict(settings) # speed_factor, decoding_preset, detect_language, recheck_low_confidence
+        self.generation = generation # Detener la cola cancela los archivos de la generación actual
+        self.state = STATE_QUEUED
+        self.error: str | None = None
+        self.wav_path: pathlib.Path | None = None
+        self.duration_sec: float | None = None
+        try:
+            self.size_bytes = self.audio_path.stat().st_size
+        except OSError:
+            self.size_bytes = 0
+        self.stage_started_at: float | None = None
+        self.convert_sec: float | None = None
+        self.transcribe_sec: float | None = None
+        self.export_sec: float | None = None
+        self.segment_count = 0
+
+
+class BatchPipeline:
+    """Convierte, transcribe y exporta una lista de archivos con las tres etapas solapadas."""
+
+    def __init__(self, on_change=None, can_transcribe=None, export_formats=None, output_dir: pathlib.Path | None = None):
+        """
+        Args:
+            on_change (callable | None): Se llama (desde los hilos) cada vez que cambia un archivo.
+            can_transcribe (callable | None): Devuelve False mientras el modelo no está libre
+                (cargando, o transcribiendo el archivo de la ventana principal).
+            export_formats: Extensiones de salida (None = config.BATCH_EXPORT_FORMATS).
+            output_dir: Carpeta de resultados (None = junto a cada audio).
+        """
+        self.on_change = on_change or (lambda: None)
+        self.can_transcribe = can_transcribe or (lambda: True)
+        self.export_formats = list(export_formats or config.BATCH_EXPORT_FORMATS)
+        self.output_dir = pathlib.Path(output_dir) if output_dir else None
+        self.items: list[BatchItem] = []
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._decode_queue: queue.Queue = queue.Queue()
+        self._transcribe_queue: queue.Queue = queue.Queue(maxsize=config.BATCH_PREFETCH_FILES)
+        self._export_queue: queue.Queue = queue.Queue()
+        self._transcriber = None # WhisperTranscriber del archivo en inferencia (para detenerlo)
+        self._temp_dir: pathlib.Path | None = None
+        self._threads: list[threading.Thread] = []
+        self._wav_counter = 0
+        self.busy_since: float | None = None # Inicio del tramo de trabajo actual (para el rendimiento)
+        self.busy_sec = 0.0 # Tiempo acumulado de tramos anteriores
+
+    # --- Control ---
+
+    def add_files(self, paths, settings: dict):
+        """Añade archivos al final de la cola (arranca las etapas la primera vez)."""
+        with self._lock:
+            if not self._threads:
+                self._temp_dir = pathlib.Path(tempfile.mkdtemp(prefix="audio_transcriptor_cola_"))
+                for target in (self._decode_loop, self._transcribe_loop, self._export_loop):
+                    thread = threading.Thread(target=target, daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+                metrics.register_callback("queue_depth", self.pending_count, queue="batch")
+            new_items = [BatchItem(path, settings, self._generation) for path in paths]
+            self.items.extend(new_items)
+            if self.busy_since is None:
+                self.busy_since = time.perf_counter()
+        for item in new_items:
+            self._decode_queue.put(item)
+        self.on_change()
+
+    def stop(self):
+        """Cancela los archivos pendientes y detiene el que está en inferencia."""
+        with self._lock:
+            self._generation += 1
+            transcriber = self._transcriber
+            for item in self.items:
+                if item.state in (STATE_QUEUED, STATE_CONVERTED):
+                    item.state = STATE_CANCELLED
+        if transcriber is not None and transcriber.is_running():
+            transcriber.stop()
+        self._update_busy()
+        self.on_change()
+
+    def clear_finished(self):
+        """Quita de la lista los archivos terminados, con error o cancelados."""
+        with self._lock:
+            self.items = [item for item in self.items if item.state not in FINAL_STATES]
+        self.on_change()
+
+    def shutdown(self):
+        """Detiene todo y borra los WAV temporales (al salir de la aplicación)."""
+        self.stop()
+        metrics.unregister_callback("queue_depth", queue="batch")
+        for stage_queue in (self._decode_queue, self._export_queue):
+            stage_queue.put(None)
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+    def is_active(self) -> bool:
+        """True si queda algún archivo por terminar."""
+        with self._lock:
+            return any(item.state not in FINAL_STATES for item in self.items)
+
+    def pending_count(self) -> int:
+        """Archivos de la cola que aún no han empezado la inferencia."""
+        with self._lock:
+            return sum(item.state in (STATE_QUEUED, STATE_CONVERTING, STATE_CONVERTED) for item in self.items)
+
+    def is_transcribing(self) -> bool:
+        """True si un archivo de la cola está usando el modelo."""
+        with self._lock:
+            return self._transcriber is not None
+
+    # --- Etapas ---
+
+    def _set_state(self, item: BatchItem, state: str):
+        item.state = state
+        item.stage_started_at = time.perf_counter()
+        if state in FINAL_STATES:
+            self._update_busy()
+        self.on_change()
+
+    def _update_busy(self):
+        """Cierra el tramo de trabajo si ya no queda nada pendiente (el rendimiento no cuenta la inactividad)."""
+        with self._lock:
+            if self.busy_since is not None and all(item.state in FINAL_STATES for item in self.items):
+                self.busy_sec += time.perf_counter() - self.busy_since
+                self.busy_since = None
+
+    def _is_current(self, item: BatchItem) -> bool:
+        return item.generation == self._generation and item.state != STATE_CANCELLED
+
+    def _discard_wav(self, item: BatchItem):
+        if item.wav_path is not None:
+            try:
+                os.remove(item.wav_path)
+            except OSError:
+                pass
+            item.wav_path = None
+
+    def _decode_loop(self):
+        """Etapa 1: conversión a WAV, adelantándose como mucho BATCH_PREFETCH_FILES archivos."""
+        while True:
+            item = self._decode_queue.get()
+            if item is None:
+                return
+            if not self._is_current(item):
+                continue
+            self._set_state(item, STATE_CONVERTING)
+            self._wav_counter += 1
+            wav_path = self._temp_dir / f"{self._wav_counter:05d}_{item.audio_path.stem}.wav"
+            start = time.perf_counter()
+            try:
+                item.duration_sec = audio_stream.stream_to_wav(item.audio_path, wav_path)
+            except (audio_stream.AudioDecodeError, OSError) as e: # OSError: incluye ffmpeg no instalado
+                metrics.record_failure("conversion", e)
+                item.error = f"No se pudo convertir: {e}"
+                print(f"ERROR (cola): {item.audio_path.name}: {item.error}")
+                self._set_state(item, STATE_ERROR)
+                continue
+            item.wav_path = wav_path
+            item.convert_sec = time.perf_counter() - start
+            metrics.observe("conversion_seconds", item.convert_sec)
+            self._set_state(item, STATE_CONVERTED)
+            while True: # Espera con la cola llena (prefetch acotado) sin dejar de atender a stop()
+                if not self._is_current(item):
+                    self._discard_wav(item)
+                    self._set_state(item, STATE_CANCELLED)
+                    break
+                try:
+                    self._transcribe_queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def _transcribe_loop(self):
+        """Etapa 2: transcripción, un archivo a la vez y solo cuando el modelo está libre."""
+        while True:
+            item = self._transcribe_queue.get()
+            outcome = {"success": False, "result": None, "error": None}
+
+            def on_complete(success, result, outcome=outcome):
+                outcome["success"], outcome["result"] = success, result
+
+            def on_error(message, outcome=outcome):
+                outcome["error"] = message
+
+            transcriber = whisper_transcriber.WhisperTranscriber(lambda _result: None, lambda _status: None, on_complete, on_error)
+            transcriber.set_audio_file(item.wav_path)
+            for key, value in item.settings.items():
+                setattr(transcriber, key, value)
+            while self._is_current(item):
+                if self.can_transcribe():
+                    with self._lock:
+                        self._transcriber = transcriber # Desde aquí la ventana principal no empieza otra transcripción
+                    if self.can_transcribe(): # Se comprueba otra vez por si la empezó justo antes
+                        break
+                    with self._lock:
+                        self._transcriber = None
+                time.sleep(0.5)
+            if not self._is_current(item):
+                with self._lock:
+                    self._transcriber = None
+                self._discard_wav(item)
+                self._set_state(item, STATE_CANCELLED)
+                continue
+            self._set_state(item, STATE_TRANSCRIBING)
+            start = time.perf_counter()
+            transcriber.start()
+            transcriber.join()
+            with self._lock:
+                self._transcriber = None
+            item.transcribe_sec = time.perf_counter() - start
+            result = outcome["result"]
+            if outcome["success"] and result is not None:
+                self._export_queue.put((item, result))
+                self._set_state(item, STATE_EXPORTING)
+            else:
+                self._discard_wav(item)
+                if (result or {}).get("cancelled"):
+                    self._set_state(item, STATE_CANCELLED)
+                else:
+                    item.error = outcome["error"] or "La transcripción falló."
+                    self._set_state(item, STATE_ERROR)
+
+    def _export_loop(self):
+        """Etapa 3: resultados en disco e índice de búsqueda, en paralelo con la siguiente inferencia."""
+        while True:
+            entry = self._export_queue.get()
+            if entry is None:
+                return
+            item, result = entry
+            start = time.perf_counter()
+            self._discard_wav(item)
+            segments = result.get("segments", [])
+            item.segment_count = len(segments)
+            try:
+                for extension in self.export_formats:
+                    output_path = self._result_path(item.audio_path, extension)
+                    if extension == ".txt":
+                        tmp_path = output_path.with_suffix(".tmp")
+                        tmp_path.write_text(result.get("text", "").strip() + "\n", encoding="utf-8")
+                        os.replace(tmp_path, output_path)
+                    else:
+                        exporters.export_segments(segments, output_path)
+            except (OSError, ValueError) as e:
+                metrics.record_failure("export", e)
+                item.error = f"No se pudieron escribir los resultados: {e}"
+                print(f"ERROR (cola): {item.audio_path.name}: {item.error}")
+                self._set_state(item, STATE_ERROR)
+                continue
+            model_name = (result.get("language_detection") or {}).get("model_name") or whisper_transcriber.get_loaded_model_name()
+            transcript_index.index_result(item.audio_path, result, model_name)
+            item.export_sec = time.perf_counter() - start
+            self._set_state(item, STATE_DONE)
+
+    def _result_path(self, audio_path: pathlib.Path, extension: str) -> pathlib.Path:
+        return (self.output_dir or audio_path.parent) / f"{audio_path.name}{extension}"
+
+    # --- Estimaciones ---
+
+    def realtime_factor(self) -> float | None:
+        """Segundos de inferencia por segundo de audio en los archivos ya transcritos (None si aún no hay)."""
+        with self._lock:
+            done = [item for item in self.items if item.transcribe_sec is not None and item.duration_sec and item.state != STATE_CANCELLED]
+        audio_sec = sum(item.duration_sec for item in done)
+        return sum(item.transcribe_sec for item in done) / audio_sec if audio_sec else None
+
+    def estimated_durations(self) -> dict[BatchItem, float | None]:
+        """Duración de cada archivo; la de los no convertidos, por su tamaño y los bytes/segundo de los ya convertidos."""
+        with self._lock:
+            items = list(self.items)
+        known = [item for item in items if item.duration_sec and item.size_bytes]
+        bytes_per_sec = sum(item.size_bytes for item in known) / sum(item.duration_sec for item in known) if known else None
+        return {item: item.duration_sec if item.duration_sec is not None
+                else (item.size_bytes / bytes_per_sec if bytes_per_sec else None) for item in items}
+
+    def eta_by_item(self) -> dict[BatchItem, float | None]:
+        """Segundos hasta que termine cada archivo pendiente (la inferencia es la etapa que limita)."""
+        rtf = self.realtime_factor()
+        durations = self.estimated_durations()
+        now = time.perf_counter()
+        etas = {}
+        elapsed_total = 0.0
+        unknown = rtf is None
+        with self._lock:
+            pending = [item for item in self.items if item.state not in FINAL_STATES]
+        pending.sort(key=lambda item: item.state != STATE_TRANSCRIBING) # El que está en inferencia va primero
+        for item in pending:
+            duration = durations.get(item)
+            if unknown or duration is None:
+                unknown = True
+                etas[item] = None
+                continue
+            remaining = duration * rtf
+            if item.state == STATE_TRANSCRIBING and item.stage_started_at is not None:
+                remaining = max(0.0, remaining - (now - item.stage_started_at))
+            elapsed_total += remaining
+            etas[item] = elapsed_total
+        return etas
+
+    def throughput(self) -> dict:
+        """Archivos y audio terminados, tiempo de trabajo y velocidad global (audio procesado / tiempo real)."""
+        with self._lock:
+            done = [item for item in self.items if item.state == STATE_DONE]
+            total = len(self.items)
+            wall_sec = self.busy_sec + (time.perf_counter() - self.busy_since if self.busy_since is not None else 0.0)
+        audio_sec = sum(item.duration_sec or 0.0 for item in done)
+        return {"files_done": len(done), "files_total": total, "audio_sec": audio_sec, "wall_sec": wall_sec,
+                "speed": audio_sec / wall_sec if wall_sec else None,
+                "files_per_hour": 3600.0 * len(done) / wall_sec if wall_sec else None}
+
+
+# --- Ventana de la cola ---
+
+def _format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "—"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+class QueuePanel(tk.Toplevel):
+    """Ventana con la cola de archivos: estado y ETA por archivo y rendimiento global."""
+
+    COLUMNS = (("archivo", "Archivo", 260), ("estado", "Estado", 110), ("duracion", "Duración", 70),
+               ("tiempo", "Tiempo / ETA", 90), ("detalle", "Detalle", 240))
+
+    def __init__(self, master, pipeline: BatchPipeline, get_settings):
+        """get_settings (callable): ajustes actuales de la ventana principal para los archivos que se añaden."""
+        super().__init__(master)
+        self.pipeline = pipeline
+        self.get_settings = get_settings
+        self.title("Cola de archivos")
+        self.geometry("820x360")
+        self._refresh_id = None
+
+        buttons = tk.Frame(self)
+        buttons.pack(fill=tk.X, padx=8, pady=(8, 4))
+        tk.Button(buttons, text="Añadir archivos...", command=self._add_files_action, padx=10).pack(side=tk.LEFT)
+        self.stop_button = tk.Button(buttons, text="Detener cola", command=self.pipeline.stop, padx=10)
+        self.stop_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Quitar terminados", command=self.pipeline.clear_finished, padx=10).pack(side=tk.LEFT)
+
+        self.tree = ttk.Treeview(self, columns=[key for key, _title, _width in self.COLUMNS], show="headings", height=12)
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor="w")
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=8)
+        self.summary_label = tk.Label(self, text="", anchor="w", justify=tk.LEFT)
+        self.summary_label.pack(fill=tk.X, padx=8, pady=(4, 8))
+        self.protocol("WM_DELETE_WINDOW", self.withdraw) # Cerrar solo oculta: la cola sigue trabajando
+        self.refresh()
+
+    def _add_files_action(self):
+        paths = audio_handler.select_audio_files(parent=self)
+        if paths:
+            self.pipeline.add_files(paths, self.get_settings())
+
+    def refresh(self):
+        """Redibuja la lista (llamar en el hilo de Tk). Mientras haya trabajo se repite cada segundo para la ETA."""
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        try:
+            if not self.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        etas = self.pipeline.eta_by_item()
+        durations = self.pipeline.estimated_durations()
+        now = time.perf_counter()
+        rows = []
+        for item in list(self.pipeline.items):
+            if item.state == STATE_DONE:
+                timing = _format_duration((item.convert_sec or 0.0) + (item.transcribe_sec or 0.0) + (item.export_sec or 0.0))
+                detail = f"{item.segment_count} segmentos (inferencia {_format_duration(item.transcribe_sec)})"
+            elif item.state in (STATE_ERROR, STATE_CANCELLED):
+                timing, detail = "—", item.error or ""
+            else:
+                eta = etas.get(item)
+                timing = f"~{_format_duration(eta)}" if eta is not None else "—"
+                detail = ""
+                if item.state == STATE_TRANSCRIBING and item.stage_started_at is not None:
+                    detail = f"en inferencia desde hace {_format_duration(now - item.stage_started_at)}"
+                elif item.state == STATE_CONVERTED and not self.pipeline.is_transcribing():
+                    detail = "esperando al modelo"
+            duration = item.duration_sec if item.duration_sec is not None else durations.get(item)
+            duration_text = _format_duration(duration) if item.duration_sec is not None else (
+                f"~{_format_duration(duration)}" if duration is not None else "—")
+            rows.append((item.audio_path.name, item.state, duration_text, timing, detail))
+        children = self.tree.get_children()
+        for index, values in enumerate(rows): # Se reutilizan las filas existentes (sin parpadeo)
+            if index < len(children):
+                if tuple(self.tree.item(children[index], "values")) != values:
+                    self.tree.item(children[index], values=values)
+            else:
+                self.tree.insert("", tk.END, values=values)
+        if len(children) > len(rows):
+            self.tree.delete(*children[len(rows):])
+
+        stats = self.pipeline.throughput()
+        summary = f"{stats['files_done']}/{stats['files_total']} archivos terminados"
+        if stats["files_done"]:
+            summary += (f" | {_format_duration(stats['audio_sec'])} de audio en {_format_duration(stats['wall_sec'])}"
+                        f" ({stats['speed']:.1f}x tiempo real, {stats['files_per_hour']:.0f} archivos/h)")
+        rtf = self.pipeline.realtime_factor()
+        if rtf is not None:
+            summary += f" | Inferencia: RTF {rtf:.2f}"
+        pending_etas = [eta for eta in etas.values() if eta is not None]
+        if etas and len(pending_etas) == len(etas):
+            summary += f" | Restante: ~{_format_duration(max(pending_etas))}"
+        self.summary_label.config(text=summary)
+        active = self.pipeline.is_active()
+        self.stop_button.config(state=tk.NORMAL if active else tk.DISABLED)
+        if active:
+            self._refresh_id = self.after(1000, self.refresh)
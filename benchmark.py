@@ -0,0 +1,505 @@
+# benchmark.py
+"""
+Benchmarks de rendimiento para AudioTranscriptorPro (se ejecutan sin GUI).
+
+Corpus de referencia: un directorio con archivos de audio y, junto a cada uno,
+un .txt con el mismo nombre que contiene la transcripción correcta.
+
+Uso:
+    python benchmark.py quantization --corpus ruta/al/corpus --model small [--device cuda]
+    python benchmark.py engines --corpus ruta/al/corpus --model small --precision int8
+    python benchmark.py segments --count 20000
+    python benchmark.py model-load --model medium --processes 3
+    python benchmark.py windowed --corpus ruta/a/grabaciones_largas --model small
+    python benchmark.py speed --corpus ruta/al/corpus --model small --factors 1 1.25 1.5
+    python benchmark.py presets --corpus ruta/al/corpus --model small
+"""
+
+import argparse
+import bisect
+import json
+import os
+import pathlib
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+import unicodedata
+
+import audio_stream
+import config
+import segment_store
+import time_compression
+import transcription_engines
+import utils
+import whisper_transcriber
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".opus", ".flac", ".m4a"}
+
+# --- Utilidades comunes ---
+
+def load_corpus(corpus_dir: pathlib.Path) -> list[tuple[pathlib.Path, str]]:
+    """Devuelve la lista de (audio, texto_referencia) del corpus. Ignora audios sin .txt."""
+    corpus = []
+    for audio_path in sorted(corpus_dir.iterdir()):
+        if audio_path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference_path = audio_path.with_suffix(".txt")
+        if not reference_path.exists():
+            print(f"Advertencia: {audio_path.name} no tiene transcripción de referencia (.txt). Se omite.")
+            continue
+        corpus.append((audio_path, reference_path.read_text(encoding="utf-8")))
+    return corpus
+
+def _normalize_words(text: str) -> list[str]:
+    """Minúsculas, sin acentos ni puntuación, separado en palabras."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9ñ']+", text)
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER = (sustituciones + borrados + inserciones) / palabras de referencia."""
+    ref_words = _normalize_words(reference)
+    hyp_words = _normalize_words(hypothesis)
+    if not ref_words:
+        return 0.0 if not hyp_words else 1.0
+    # Distancia de Levenshtein por palabras, solo dos filas en memoria
+    previous_row = list(range(len(hyp_words) + 1))
+    for i, ref_word in enumerate(ref_words, start=1):
+        current_row = [i] + [0] * len(hyp_words)
+        for j, hyp_word in enumerate(hyp_words, start=1):
+            cost = 0 if ref_word == hyp_word else 1
+            current_row[j] = min(previous_row[j] + 1, current_row[j - 1] + 1, previous_row[j - 1] + cost)
+        previous_row = current_row
+    return previous_row[-1] / len(ref_words)
+
+def _format_mb(value: float | None) -> str:
+    return f"{value:.0f} MB" if value is not None else "n/d"
+
+def _print_table(headers: list[str], rows: list[list[str]]):
+    """Imprime una tabla de texto simple alineada por columnas."""
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(cell).ljust(w) for cell, w in zip(row, widths)))
+
+def transcribe_corpus(engine, corpus: list[tuple[pathlib.Path, str]], options: dict) -> dict:
+    """Transcribe todo el corpus con un motor ya cargado. Devuelve tiempos, duración de audio y WER medio."""
+    total_audio_sec = 0.0
+    total_time = 0.0
+    wers = []
+    for audio_path, reference in corpus:
+        start = time.perf_counter()
+        result = engine.transcribe(str(audio_path), **options)
+        total_time += time.perf_counter() - start
+        segments = result.get("segments") or []
+        total_audio_sec += segments[-1]["end"] if segments else 0.0
+        wers.append(word_error_rate(reference, result.get("text", "")))
+    return {
+        "time": total_time,
+        "audio_sec": total_audio_sec,
+        "rtf": total_time / total_audio_sec if total_audio_sec else None,
+        "wer": sum(wers) / len(wers) if wers else None,
+    }
+
+def _format_rtf(stats: dict) -> str:
+    return f"{stats['rtf']:.3f}" if stats["rtf"] is not None else "n/d"
+
+def _format_wer(stats: dict) -> str:
+    return f"{100 * stats['wer']:.1f}%" if stats["wer"] is not None else "n/d"
+
+def _load_engine_measured(engine_name: str, model_name: str, precision: str):
+    """Carga un motor midiendo tiempo de carga y memoria añadida. Devuelve (motor, segundos, MB)."""
+    rss_before = utils.get_process_rss_mb()
+    load_start = time.perf_counter()
+    engine = transcription_engines.ENGINES[engine_name]()
+    engine.load(model_name, precision)
+    load_time = time.perf_counter() - load_start
+    rss_after = utils.get_process_rss_mb()
+    model_mb = (rss_after - rss_before) if rss_before is not None and rss_after is not None else None
+    return engine, load_time, model_mb
+
+# --- Benchmark: cuantización / precisión reducida ---
+
+def _quantization_worker(corpus_dir: pathlib.Path, model_name: str, precision: str):
+    """
+    Proceso hijo: carga el modelo en un modo de precisión, transcribe el corpus y escribe en stdout
+    una línea JSON con tiempos, WER y el pico de memoria de este proceso (RSS y, en GPU, VRAM).
+    """
+    torch = transcription_engines.torch
+    use_cuda = torch.cuda.is_available()
+    engine, load_time, model_mb = _load_engine_measured(transcription_engines.WhisperEngine.name, model_name, precision)
+    stats = transcribe_corpus(engine, load_corpus(corpus_dir), whisper_transcriber.build_transcribe_options())
+    print(json.dumps({**stats, "load_sec": load_time, "model_mb": model_mb,
+                      "device": "cuda" if use_cuda else "cpu",
+                      "peak_rss_mb": utils.get_process_peak_rss_mb(),
+                      "peak_vram_mb": torch.cuda.max_memory_allocated() / (1024 * 1024) if use_cuda else None}), flush=True)
+
+def run_quantization_benchmark(corpus_dir: pathlib.Path, model_name: str, modes: list[str], device: str):
+    """
+    Compara velocidad, memoria y WER de cada modo de precisión frente a fp32 (motor whisper).
+    Cada modo se mide en un proceso nuevo (la memoria de un modo no se mezcla con la del anterior)
+    y en el mismo dispositivo: int8 y bf16 solo existen en CPU, así que en "cuda" solo se mide fp32.
+    """
+    engine_cls = transcription_engines.WhisperEngine
+    env = dict(os.environ)
+    if device == "cpu":
+        env["CUDA_VISIBLE_DEVICES"] = "" # Sin esto fp32 iría a la GPU y el resto a la CPU
+    rows = []
+    baseline_time = None
+    for requested_mode in modes:
+        precision = engine_cls.resolve_precision(requested_mode)
+        if precision != requested_mode or (device == "cuda" and precision != "fp32"):
+            print(f"Modo '{requested_mode}' no disponible en '{device}' en esta máquina. Se omite.")
+            continue
+        completed = subprocess.run([sys.executable, __file__, "quantization-worker", "--corpus", str(corpus_dir),
+                                    "--model", model_name, "--precision", precision],
+                                   stdout=subprocess.PIPE, text=True, env=env)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+        if completed.returncode != 0 or not lines:
+            print(f"Advertencia: No se pudo medir el modo '{precision}'. Se omite.")
+            continue
+        report = json.loads(lines[-1])
+        if report["device"] != device:
+            print(f"Advertencia: El modo '{precision}' se ejecutó en '{report['device']}' en lugar de '{device}'. Se omite.")
+            continue
+        if precision == "fp32":
+            baseline_time = report["time"]
+        rows.append([
+            precision,
+            f"{report['load_sec']:.2f}s",
+            f"{report['time']:.2f}s",
+            _format_rtf(report),
+            f"{baseline_time / report['time']:.2f}x" if baseline_time and report["time"] else "-",
+            _format_mb(report["model_mb"]),
+            _format_mb(report["peak_rss_mb"]),
+            _format_mb(report["peak_vram_mb"]),
+            _format_wer(report),
+        ])
+    print(f"\nModelo: {model_name} | Dispositivo: {device} | Archivos: {len(load_corpus(corpus_dir))}")
+    _print_table(["Precisión", "Carga", "Transcripción", "RTF", "Aceleración", "Memoria modelo",
+                  "Pico RSS", "Pico VRAM", "WER"], rows)
+
+# --- Benchmark: motores de transcripción ---
+
+def run_engines_benchmark(corpus: list[tuple[pathlib.Path, str]], model_name: str, precision: str):
+    """Compara los motores instalados con el mismo modelo y precisión."""
+    options = whisper_transcriber.build_transcribe_options()
+    rows = []
+    for engine_name in transcription_engines.available_engines():
+        effective_precision = transcription_engines.ENGINES[engine_name].resolve_precision(precision)
+        engine, load_time, model_mb = _load_engine_measured(engine_name, model_name, effective_precision)
+        stats = transcribe_corpus(engine, corpus, options)
+        del engine
+        rows.append([engine_name, effective_precision, f"{load_time:.2f}s", f"{stats['time']:.2f}s",
+                     _format_rtf(stats), _format_mb(model_mb), _format_wer(stats)])
+    print(f"\nModelo: {model_name} | Archivos: {len(corpus)}")
+    _print_table(["Motor", "Precisión", "Carga", "Transcripción", "RTF", "Memoria modelo", "WER"], rows)
+
+# --- Benchmark: representación de los segmentos ---
+
+def _synthetic_whisper_segments(count: int) -> list[dict]:
+    """Segmentos con la forma exacta de los de openai-whisper (tokens incluidos)."""
+    rng = random.Random(0)
+    return [{"id": index, "seek": index * 200, "start": index * 2.5, "end": index * 2.5 + 2.2,
+             "text": f" Frase de ejemplo número {index} para medir la memoria de los segmentos.",
+             "tokens": [rng.randrange(50000) for _ in range(24)], "temperature": 0.0,
+             "avg_logprob": rng.uniform(-1.4, -0.1), "compression_ratio": rng.uniform(1.0, 2.8),
+             "no_speech_prob": rng.uniform(0.0, 0.7)} for index in range(count)]
+
+def _measure_allocation(build):
+    """(objeto, bytes asignados) construyendo con 'build'."""
+    tracemalloc.start()
+    obj = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, allocated
+
+def run_segments_benchmark(count: int, lookups: int):
+    """Compara memoria y tiempo de recorrido: dicts de Whisper, dicts reducidos y SegmentStore."""
+    raw, raw_bytes = _measure_allocation(lambda: _synthetic_whisper_segments(count))
+    slim, slim_bytes = _measure_allocation(lambda: segment_store.slim_segments(raw))
+    store = segment_store.SegmentStore.from_segments(slim)
+    duration = raw[-1]["end"] if raw else 0.0
+    times = [random.uniform(0.0, duration) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    starts = [segment["start"] for segment in slim]
+    for time_sec in times:
+        index = bisect.bisect_right(starts, time_sec) - 1
+        _found = index if index >= 0 and time_sec < slim[index]["end"] else -1
+    dict_lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    for time_sec in times:
+        store.find_at(time_sec)
+    store_lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    store.find_many(times)
+    store_batch_lookup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dict_flagged = sum(1 for segment in slim if whisper_transcriber.is_low_confidence(segment))
+    dict_scan = time.perf_counter() - start
+    start = time.perf_counter()
+    store_flagged = int(store.low_confidence_mask().sum())
+    store_scan = time.perf_counter() - start
+    assert dict_flagged == store_flagged
+
+    print(f"{count} segmentos, {lookups} búsquedas por tiempo, {store_flagged} segmentos dudosos.")
+    rows = [
+        ["dicts de Whisper", f"{raw_bytes / 1e6:.1f} MB", "-", "-"],
+        ["dicts reducidos", f"{slim_bytes / 1e6:.1f} MB", f"{1000 * dict_lookup:.1f} ms", f"{1000 * dict_scan:.2f} ms"],
+        ["SegmentStore", f"{store.nbytes / 1e6:.1f} MB", f"{1000 * store_lookup:.1f} ms (lote: {1000 * store_batch_lookup:.1f} ms)",
+         f"{1000 * store_scan:.2f} ms"],
+    ]
+    _print_table(["Representación", "Memoria", "Búsquedas", "Recorrido confianza"], rows)
+
+# --- Benchmark: carga de pesos (normal frente a memory-map) ---
+
+def _load_worker(model_name: str, mode: str):
+    """Proceso hijo: carga el modelo en CPU y escribe en stdout una línea JSON con tiempo y memoria."""
+    start = time.perf_counter()
+    if mode == "mmap":
+        model = transcription_engines._load_whisper_model_mmap(model_name)
+    else:
+        model = transcription_engines.whisper.load_model(model_name, device="cpu")
+    load_sec = time.perf_counter() - start
+    print(json.dumps({"load_sec": load_sec, "rss_mb": utils.get_process_rss_mb(),
+                      "anonymous_mb": utils.get_process_anonymous_mb()}), flush=True)
+    del model
+
+def run_model_load_benchmark(model_name: str, processes: int):
+    """Lanza 'processes' procesos a la vez por modo y compara tiempo de carga, RSS y memoria privada."""
+    if not transcription_engines._mmap_cache_path(model_name).exists():
+        transcription_engines._load_whisper_model_mmap(model_name) # Conversión única, fuera de la medida
+    rows = []
+    for mode in ("normal", "mmap"):
+        workers = [subprocess.Popen([sys.executable, __file__, "load-worker", "--model", model_name, "--mode", mode],
+                                    stdout=subprocess.PIPE, text=True) for _ in range(processes)]
+        reports = []
+        for worker in workers:
+            output, _ = worker.communicate()
+            lines = [line for line in output.splitlines() if line.startswith("{")]
+            if worker.returncode == 0 and lines:
+                reports.append(json.loads(lines[-1]))
+        if not reports:
+            print(f"Modo '{mode}': ningún proceso pudo cargar el modelo.")
+            continue
+        average = lambda key: (sum(report[key] for report in reports if report[key] is not None) /
+                               max(1, sum(1 for report in reports if report[key] is not None)))
+        rows.append([mode, f"{average('load_sec'):.2f}s", _format_mb(average("rss_mb")), _format_mb(average("anonymous_mb"))])
+    print(f"\nModelo: {model_name} | Procesos simultáneos por modo: {processes}")
+    _print_table(["Carga", "Tiempo (media)", "RSS por proceso", "Memoria privada por proceso"], rows)
+
+# --- Benchmark: transcripción completa frente a transcripción por ventanas ---
+
+def _transcribe_worker(model_name: str, audio_path: pathlib.Path, mode: str):
+    """Proceso hijo: transcribe un archivo y escribe en stdout una línea JSON con tiempo, pico de memoria y texto."""
+    config.WINDOWED_TRANSCRIPTION = mode == "windowed"
+    config.WINDOWED_MIN_DURATION_SEC = 0.0
+    engine = transcription_engines.WhisperEngine()
+    engine.load(model_name, "fp32")
+    rss_loaded = utils.get_process_rss_mb()
+    start = time.perf_counter()
+    result = engine.transcribe(str(audio_path), **whisper_transcriber.build_transcribe_options())
+    elapsed = time.perf_counter() - start
+    peak = utils.get_process_peak_rss_mb()
+    segments = result.get("segments") or []
+    print(json.dumps({"time": elapsed, "audio_sec": segments[-1]["end"] if segments else 0.0, "text": result.get("text", ""),
+                      "extra_peak_mb": peak - rss_loaded if peak is not None and rss_loaded is not None else None}), flush=True)
+
+def run_windowed_benchmark(corpus: list[tuple[pathlib.Path, str]], model_name: str):
+    """
+    Transcribe cada archivo con model.transcribe() y por ventanas, cada uno en un proceso
+    nuevo (el pico de memoria no se comparte). Muestra tiempo, memoria añadida por la
+    transcripción sobre la del modelo, WER y la diferencia entre ambas salidas.
+    """
+    rows = []
+    for audio_path, reference in corpus:
+        reports = {}
+        for mode in ("full", "windowed"):
+            completed = subprocess.run([sys.executable, __file__, "transcribe-worker", "--model", model_name,
+                                        "--audio", str(audio_path), "--mode", mode], stdout=subprocess.PIPE, text=True)
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+            if completed.returncode == 0 and lines:
+                reports[mode] = json.loads(lines[-1])
+        if len(reports) < 2:
+            print(f"Advertencia: No se pudo transcribir {audio_path.name} en los dos modos. Se omite.")
+            continue
+        full, windowed = reports["full"], reports["windowed"]
+        for mode, report in (("completo", full), ("ventanas", windowed)):
+            rows.append([audio_path.name, mode, f"{report['audio_sec'] / 60:.1f} min", f"{report['time']:.1f}s",
+                         _format_mb(report["extra_peak_mb"]), f"{100 * word_error_rate(reference, report['text']):.1f}%"])
+        rows.append([audio_path.name, "diferencia", "", "", "", f"{100 * word_error_rate(full['text'], windowed['text']):.1f}%"])
+    print(f"\nModelo: {model_name} | Archivos: {len(corpus)}")
+    _print_table(["Archivo", "Modo", "Duración", "Transcripción", "Pico de memoria (sin modelo)", "WER"], rows)
+
+# --- Benchmark: modo acelerado (audio comprimido en el tiempo) ---
+
+def run_speed_benchmark(corpus: list[tuple[pathlib.Path, str]], model_name: str, precision: str, factors: list[float]):
+    """Velocidad y WER de cada factor de aceleración (la compresión cuenta en el tiempo)."""
+    engine_name = transcription_engines.select_engine_name()
+    precision = transcription_engines.ENGINES[engine_name].resolve_precision(precision)
+    engine, _load_time, _model_mb = _load_engine_measured(engine_name, model_name, precision)
+    options = whisper_transcriber.build_transcribe_options()
+    decoded = [(audio_stream.load_float32(audio_path), reference) for audio_path, reference in corpus]
+    audio_sec = sum(len(samples) for samples, _reference in decoded) / audio_stream.WHISPER_SAMPLE_RATE
+    rows = []
+    baseline_time = None
+    for factor in sorted(factors):
+        total_time = 0.0
+        compress_time = 0.0
+        wers = []
+        for samples, reference in decoded:
+            start = time.perf_counter()
+            compressed = time_compression.compress(samples, factor)
+            compress_time += time.perf_counter() - start
+            result = engine.transcribe(compressed, **options)
+            total_time += time.perf_counter() - start
+            wers.append(word_error_rate(reference, result.get("text", "")))
+        if baseline_time is None:
+            baseline_time = total_time
+        rows.append([time_compression.format_factor(factor), f"{total_time:.2f}s", f"{compress_time:.2f}s",
+                     f"{total_time / audio_sec:.3f}" if audio_sec else "n/d",
+                     f"{baseline_time / total_time:.2f}x" if total_time else "-", f"{100 * sum(wers) / len(wers):.1f}%"])
+    print(f"\nModelo: {model_name} ({engine.name}, {precision}) | Archivos: {len(corpus)} | Audio: {audio_sec / 60:.1f} min")
+    _print_table(["Factor", "Tiempo total", "Compresión", "RTF", "Aceleración", "WER"], rows)
+
+# --- Benchmark: preajustes de decodificación ---
+
+def run_presets_benchmark(corpus: list[tuple[pathlib.Path, str]], model_name: str, precision: str, presets: list[str]):
+    """Velocidad, WER y reintentos por temperatura de cada preajuste de config.DECODING_PRESETS."""
+    engine_name = transcription_engines.select_engine_name()
+    precision = transcription_engines.ENGINES[engine_name].resolve_precision(precision)
+    engine, _load_time, _model_mb = _load_engine_measured(engine_name, model_name, precision)
+    decoded = [(audio_stream.load_float32(audio_path), reference) for audio_path, reference in corpus]
+    audio_sec = sum(len(samples) for samples, _reference in decoded) / audio_stream.WHISPER_SAMPLE_RATE
+    timings = {}
+    rows = []
+    for preset in presets:
+        options = whisper_transcriber.build_transcribe_options(preset=preset)
+        total_time = 0.0
+        wers = []
+        segment_count = 0
+        fallback_count = 0 # Segmentos que salieron de un reintento (temperatura > 0)
+        for samples, reference in decoded:
+            start = time.perf_counter()
+            result = engine.transcribe(samples, **options)
+            total_time += time.perf_counter() - start
+            wers.append(word_error_rate(reference, result.get("text", "")))
+            segments = result.get("segments", [])
+            segment_count += len(segments)
+            fallback_count += sum(1 for segment in segments if (segment.get("temperature") or 0.0) > 0.0)
+        timings[preset] = total_time
+        rows.append([preset, f"{total_time:.2f}s", f"{total_time / audio_sec:.3f}" if audio_sec else "n/d",
+                     f"{fallback_count}/{segment_count}", f"{100 * sum(wers) / len(wers):.1f}%"])
+    baseline = timings.get(config.DEFAULT_DECODING_PRESET, next(iter(timings.values())))
+    for row, preset in zip(rows, presets):
+        row.insert(3, f"{baseline / timings[preset]:.2f}x" if timings[preset] else "-")
+    print(f"\nModelo: {model_name} ({engine.name}, {precision}) | Archivos: {len(corpus)} | Audio: {audio_sec / 60:.1f} min")
+    _print_table(["Preajuste", "Tiempo total", "RTF", f"Velocidad vs {config.DEFAULT_DECODING_PRESET}",
+                  "Segmentos reintentados", "WER"], rows)
+
+# --- Punto de entrada ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de AudioTranscriptorPro.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    quant_parser = subparsers.add_parser("quantization", help="Compara fp32 con int8/bf16.")
+    quant_parser.add_argument("--corpus", type=pathlib.Path, required=True, help="Directorio con audios y .txt de referencia.")
+    quant_parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    quant_parser.add_argument("--modes", nargs="+", default=config.WHISPER_PRECISION_MODES, choices=config.WHISPER_PRECISION_MODES)
+    quant_parser.add_argument("--device", default="cpu", choices=("cpu", "cuda"),
+                              help="Dispositivo común a todos los modos (int8 y bf16 solo en CPU).")
+    quant_worker_parser = subparsers.add_parser("quantization-worker") # Uso interno de quantization
+    quant_worker_parser.add_argument("--corpus", type=pathlib.Path, required=True)
+    quant_worker_parser.add_argument("--model", required=True)
+    quant_worker_parser.add_argument("--precision", choices=config.WHISPER_PRECISION_MODES, required=True)
+
+    engines_parser = subparsers.add_parser("engines", help="Compara los motores de transcripción instalados.")
+    engines_parser.add_argument("--corpus", type=pathlib.Path, required=True, help="Directorio con audios y .txt de referencia.")
+    engines_parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    engines_parser.add_argument("--precision", default=config.DEFAULT_WHISPER_PRECISION, choices=config.WHISPER_PRECISION_MODES)
+
+    segments_parser = subparsers.add_parser("segments", help="Memoria y recorridos de la representación de segmentos.")
+    segments_parser.add_argument("--count", type=int, default=20000, help="Número de segmentos sintéticos.")
+    segments_parser.add_argument("--lookups", type=int, default=100000, help="Búsquedas por tiempo a medir.")
+
+    load_parser = subparsers.add_parser("model-load", help="Compara la carga normal de pesos con la carga por memory-map.")
+    load_parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    load_parser.add_argument("--processes", type=int, default=2, help="Procesos que cargan el modelo a la vez.")
+    worker_parser = subparsers.add_parser("load-worker") # Uso interno de model-load
+    worker_parser.add_argument("--model", required=True)
+    worker_parser.add_argument("--mode", choices=("normal", "mmap"), required=True)
+
+    speed_parser = subparsers.add_parser("speed", help="Velocidad y WER del modo acelerado por factor.")
+    speed_parser.add_argument("--corpus", type=pathlib.Path, required=True, help="Directorio con audios y .txt de referencia.")
+    speed_parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    speed_parser.add_argument("--precision", default=config.DEFAULT_WHISPER_PRECISION, choices=config.WHISPER_PRECISION_MODES)
+    speed_parser.add_argument("--factors", type=float, nargs="+", default=config.SPEED_FACTORS)
+
+    presets_parser = subparsers.add_parser("presets", help="Velocidad y WER de cada preajuste de decodificación.")
+    presets_parser.add_argument("--corpus", type=pathlib.Path, required=True, help="Directorio con audios y .txt de referencia.")
+    presets_parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    presets_parser.add_argument("--precision", default=config.DEFAULT_WHISPER_PRECISION, choices=config.WHISPER_PRECISION_MODES)
+    presets_parser.add_argument("--presets", nargs="+", default=list(config.DECODING_PRESETS), choices=list(config.DECODING_PRESETS))
+
+    windowed_parser = subparsers.add_parser("windowed", help="Compara model.transcribe() con la transcripción por ventanas.")
+    windowed_parser.add_argument("--corpus", type=pathlib.Path, required=True, help="Directorio con audios y .txt de referencia.")
+    windowed_parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    transcribe_worker_parser = subparsers.add_parser("transcribe-worker") # Uso interno de windowed
+    transcribe_worker_parser.add_argument("--model", required=True)
+    transcribe_worker_parser.add_argument("--audio", type=pathlib.Path, required=True)
+    transcribe_worker_parser.add_argument("--mode", choices=("full", "windowed"), required=True)
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "segments": # No necesita modelo ni corpus
+        run_segments_benchmark(args.count, args.lookups)
+        return 0
+    if args.benchmark in ("model-load", "load-worker"):
+        if transcription_engines.whisper is None:
+            print("ERROR: Whisper no está instalado. No se puede ejecutar el benchmark.")
+            return 1
+        if args.benchmark == "load-worker":
+            _load_worker(args.model, args.mode)
+        else:
+            run_model_load_benchmark(args.model, args.processes)
+        return 0
+    if not whisper_transcriber.WHISPER_AVAILABLE:
+        print("ERROR: Whisper no está instalado. No se puede ejecutar el benchmark.")
+        return 1
+    if args.benchmark == "transcribe-worker":
+        _transcribe_worker(args.model, args.audio, args.mode)
+        return 0
+    if args.benchmark == "quantization-worker":
+        _quantization_worker(args.corpus, args.model, args.precision)
+        return 0
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"ERROR: No se encontraron audios con referencia en {args.corpus}.")
+        return 1
+
+    if args.benchmark == "quantization":
+        # fp32 primero para que sirva de referencia de velocidad
+        modes = sorted(args.modes, key=lambda m: m != "fp32")
+        if args.device == "cuda" and not transcription_engines.torch.cuda.is_available():
+            print("ERROR: No hay GPU CUDA disponible para el benchmark.")
+            return 1
+        run_quantization_benchmark(args.corpus, args.model, modes, args.device)
+    elif args.benchmark == "engines":
+        run_engines_benchmark(corpus, args.model, args.precision)
+    elif args.benchmark == "windowed":
+        run_windowed_benchmark(corpus, args.model)
+    elif args.benchmark == "speed":
+        run_speed_benchmark(corpus, args.model, args.precision, args.factors)
+    elif args.benchmark == "presets":
+        run_presets_benchmark(corpus, args.model, args.precision, args.presets)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# cli.py
+"""
+Modos sin interfaz gráfica de AudioTranscriptorPro.
+
+Se invocan desde main.py cuando se pasan argumentos, p. ej.:
+    python main.py watch ruta/a/carpeta --model small --output resultados/
+    python main.py whatsapp "WhatsApp Chat - Ana.zip" --model small
+    python main.py search "número de factura"
+No importa Tkinter ni pygame, así que funciona en servidores sin pantalla ni audio.
+"""
+
+import argparse
+import functools
+import pathlib
+import time
+import zipfile
+import config
+import exporters
+import metrics
+import whisper_transcriber
+
+
+def _add_model_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--model", default=config.DEFAULT_WHISPER_MODEL, choices=config.WHISPER_MODELS)
+    parser.add_argument("--precision", default=config.DEFAULT_WHISPER_PRECISION, choices=config.WHISPER_PRECISION_MODES)
+    parser.add_argument("--engine", default=None, help="Motor de transcripción (por defecto el más rápido instalado).")
+    parser.add_argument("--preset", default=config.DEFAULT_DECODING_PRESET, choices=list(config.DECODING_PRESETS),
+                        help="Preajuste de decodificación: beam, reintentos por temperatura y contexto (config.DECODING_PRESETS).")
+
+def _add_metrics_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Expone métricas en http://127.0.0.1:<puerto>/metrics (Prometheus) y /metrics.json.")
+    parser.add_argument("--metrics-json", type=pathlib.Path, default=None,
+                        help="Añade una instantánea JSON de las métricas a este archivo cada config.METRICS_SNAPSHOT_INTERVAL_SEC.")
+
+def _load_model(args) -> bool:
+    if not whisper_transcriber.WHISPER_AVAILABLE:
+        print("ERROR: No hay ningún motor de transcripción instalado (pip install openai-whisper).")
+        return False
+    print(f"Cargando modelo '{args.model}' ({args.precision})...")
+    if not whisper_transcriber.load_model_blocking(args.model, precision=args.precision, engine=args.engine):
+        print(f"ERROR: No se pudo cargar el modelo '{args.model}'.")
+        return False
+    return True
+
+def _run_watch(args) -> int:
+    import watch_folder
+    if not args.directory.is_dir():
+        print(f"ERROR: {args.directory} no es un directorio.")
+        return 1
+    if not _load_model(args):
+        return 1
+    service = watch_folder.WatchService(args.directory, output_dir=args.output, export_formats=args.formats,
+                                        transcribe=functools.partial(whisper_transcriber.transcribe_file_blocking,
+                                                                     speed_factor=args.speed, decoding_preset=args.preset))
+    metrics_exporters = metrics.start_exporters(args.metrics_port, args.metrics_json)
+    try:
+        service.run()
+    finally:
+        metrics.stop_exporters(metrics_exporters)
+    return 0
+
+def _run_whatsapp(args) -> int:
+    import whatsapp_import
+    if not args.zip_path.is_file():
+        print(f"ERROR: No se encuentra {args.zip_path}.")
+        return 1
+    if not _load_model(args):
+        return 1
+    output_path = args.output or args.zip_path.with_name(f"{args.zip_path.stem}_transcrito.txt")
+    importer = whatsapp_import.WhatsAppExportImporter(args.zip_path, decode_workers=args.workers, decoding_preset=args.preset)
+    metrics_exporters = metrics.start_exporters(args.metrics_port, args.metrics_json)
+    try:
+        stats = importer.run(output_path)
+    except (ValueError, RuntimeError, zipfile.BadZipFile) as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        metrics.stop_exporters(metrics_exporters)
+    return 0 if stats["failed"] == 0 else 2
+
+def _run_search(args) -> int:
+    import transcript_index
+    index = transcript_index.get_index()
+    if index is None:
+        return 1
+    start_time = time.perf_counter()
+    hits = index.search(" ".join(args.query), limit=args.limit)
+    elapsed_ms = 1000.0 * (time.perf_counter() - start_time)
+    for hit in hits:
+        print(f"{hit['path']} [{exporters.format_timestamp(hit['start'], '.')} - {exporters.format_timestamp(hit['end'], '.')}] "
+              f"({hit['model'] or '?'}): {hit['snippet']}")
+    stats = index.stats()
+    print(f"{len(hits)} resultados en {elapsed_ms:.1f} ms ({stats['segments']} segmentos de {stats['files']} archivos indexados).")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py", description="AudioTranscriptorPro sin interfaz gráfica.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    watch_parser = subparsers.add_parser("watch", help="Transcribe automáticamente los audios nuevos de una carpeta.")
+    watch_parser.add_argument("directory", type=pathlib.Path, help="Carpeta a vigilar.")
+    watch_parser.add_argument("--output", type=pathlib.Path, default=None, help="Carpeta de resultados (por defecto, junto a cada audio).")
+    watch_parser.add_argument("--formats", nargs="+", default=None,
+                              help="Formatos de salida: .txt .srt .vtt .jsonl (por defecto config.WATCH_EXPORT_FORMATS).")
+    watch_parser.add_argument("--speed", type=float, default=config.DEFAULT_SPEED_FACTOR,
+                              help="Modo acelerado: comprime el audio este factor (ej. 1.25, 1.5) antes de transcribir.")
+    _add_model_arguments(watch_parser)
+    _add_metrics_arguments(watch_parser)
+
+    whatsapp_parser = subparsers.add_parser("whatsapp", help="Transcribe las notas de voz de un chat exportado de WhatsApp (.zip).")
+    whatsapp_parser.add_argument("zip_path", type=pathlib.Path, help="ZIP de la exportación (con _chat.txt y los audios).")
+    whatsapp_parser.add_argument("--output", type=pathlib.Path, default=None, help="Chat transcrito (por defecto <zip>_transcrito.txt).")
+    whatsapp_parser.add_argument("--workers", type=int, default=None,
+                                 help="Decodificadores en paralelo (por defecto config.WHATSAPP_DECODE_WORKERS).")
+    _add_model_arguments(whatsapp_parser)
+    _add_metrics_arguments(whatsapp_parser)
+
+    search_parser = subparsers.add_parser("search", help="Busca en todas las transcripciones indexadas.")
+    search_parser.add_argument("query", nargs="+", help="Palabras a buscar (cada una también como prefijo).")
+    search_parser.add_argument("--limit", type=int, default=None,
+                               help="Resultados máximos (por defecto config.TRANSCRIPT_SEARCH_LIMIT).")
+
+    args = parser.parse_args(argv)
+    if args.command == "watch":
+        return _run_watch(args)
+    if args.command == "whatsapp":
+        return _run_whatsapp(args)
+    if args.command == "search":
+        return _run_search(args)
+    return 1
@@ -1,6 +1,8 @@
 # In config.py
 """Configuración y constantes para la aplicación AudioTranscriptorPro."""
 
+import os
+
 __version__ = "rev41__whisper_only_depuration"  # Updated version
 
 # Tipos de archivo de audio soportados
@@ -20,6 +22,160 @@ WHISPER_MODELS = ["tiny", "base", "small", "medium", "large"]
 DEFAULT_WHISPER_MODEL = "tiny"
 WHISPER_INITIAL_PROMPT = "Transcripción en español." # Prompt inicial para Whisper
 
+# --- Detección de idioma por archivo ---
+# Si está activa, cada archivo se transcribe en su idioma (con su prompt) en lugar de TARGET_LANGUAGE.
+# Desactivada por defecto: sin ella todo se transcribe en TARGET_LANGUAGE, como siempre.
+LANGUAGE_DETECTION_ENABLED = False
+LANGUAGE_DETECTION_MODEL = "tiny" # Modelo pequeño (multilingüe) para identificar el idioma
+LANGUAGE_DETECTION_WINDOW_SEC = 30.0 # Ventana analizada (la de entrada de Whisper)
+LANGUAGE_DETECTION_SCAN_SEC = 120.0 # Hasta dónde buscar el inicio de la voz
+LANGUAGE_DETECTION_SPEECH_RMS = 0.01 # Energía mínima (RMS en [0, 1]) para considerar que hay voz
+LANGUAGE_DETECTION_MIN_PROBABILITY = 0.5 # Por debajo se usa TARGET_LANGUAGE
+LANGUAGE_CACHE_MAX_ENTRIES = 2000
+# Prompt inicial por idioma (los idiomas que no estén aquí se transcriben sin prompt)
+LANGUAGE_PROMPTS = {
+    "es": WHISPER_INITIAL_PROMPT,
+    "en": "Transcription in English.",
+    "pt": "Transcrição em português.",
+    "fr": "Transcription en français.",
+    "it": "Trascrizione in italiano.",
+    "de": "Transkription auf Deutsch.",
+    "ca": "Transcripció en català.",
+}
+# Usar las variantes solo-inglés (tiny.en ... medium.en, más precisas) para audios en inglés
+ENGLISH_MODEL_VARIANTS = False
+ENGLISH_VARIANT_MODELS = ["tiny", "base", "small", "medium"]
+
+# Motor de transcripción: "auto" elige el más rápido instalado (faster-whisper > whisper).
+# Valores: "auto", "whisper", "faster-whisper", "fake" (motor determinista para pruebas).
+# Se puede cambiar sin tocar el código con la variable de entorno AUDIO_TRANSCRIPTOR_ENGINE.
+TRANSCRIPTION_ENGINE = os.environ.get("AUDIO_TRANSCRIPTOR_ENGINE", "auto")
+
+# Transcribir automáticamente en cuanto el modelo esté cargado y el audio convertido
+AUTO_TRANSCRIBE_DEFAULT = False
+
+# --- Transcripción progresiva (borrador rápido + refinado en segundo plano) ---
+PROGRESSIVE_DRAFT_MODEL = "tiny" # Modelo del borrador inmediato
+PROGRESSIVE_WINDOW_SEC = 30.0 # Duración aproximada de cada ventana que se refina con el modelo grande
+
+# --- Revisión selectiva de segmentos dudosos con un modelo mayor ---
+RECHECK_MODEL = "medium" # Modelo que vuelve a transcribir solo los fragmentos de baja confianza
+RECHECK_AVG_LOGPROB_THRESHOLD = -1.0 # Segmento dudoso si avg_logprob es menor (mismo umbral que Whisper)
+RECHECK_COMPRESSION_RATIO_THRESHOLD = 2.4 # ... o si el texto es demasiado repetitivo (alucinación)
+RECHECK_NO_SPEECH_THRESHOLD = 0.6 # ... o si probablemente no hay voz (texto inventado sobre silencio)
+RECHECK_MIN_RANGE_SEC = 3.0 # Los fragmentos más cortos se amplían con segmentos vecinos (más contexto)
+
+# Directorio base para cachés persistentes de la aplicación (modelos cuantizados, etc.)
+APP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "audio_transcriptor_pro")
+WAVEFORM_CACHE_DIR = os.path.join(APP_CACHE_DIR, "peaks") # Pirámides de picos (memory-mapped) por huella de WAV
+LANGUAGE_CACHE_FILE = os.path.join(APP_CACHE_DIR, "language_cache.json") # Idioma detectado por huella de archivo
+SESSION_JOURNAL_DIR = os.path.join(APP_CACHE_DIR, "sessions") # Diario de autoguardado (texto + ediciones) por audio
+TRANSCRIPT_INDEX_FILE = os.path.join(APP_CACHE_DIR, "transcripts.sqlite3") # Índice FTS5 de todas las transcripciones
+
+# --- Autoguardado de la sesión (diario de ediciones) ---
+SESSION_JOURNAL_ENABLED = True
+SESSION_JOURNAL_DEBOUNCE_MS = 700 # Se anota una ráfaga de tecleo tras esta pausa sin cambios
+SESSION_JOURNAL_COMPACT_OPS = 200 # Ediciones anotadas antes de compactar el diario en una instantánea
+SESSION_JOURNAL_COMPACT_MIN_BYTES = 65536 # ... o cuando las ediciones pesan más que el texto (y al menos esto)
+SESSION_JOURNAL_MAX_FILES = 200 # Sesiones guardadas como máximo (se borran las más antiguas)
+
+# --- Índice de búsqueda de transcripciones ---
+TRANSCRIPT_INDEX_ENABLED = True # Indexar cada resultado terminado (GUI y carpeta vigilada)
+TRANSCRIPT_SEARCH_LIMIT = 50 # Resultados máximos por búsqueda
+
+# --- Precisión reducida en CPU ---
+# "fp32": pesos completos (comportamiento original).
+# "int8": cuantización dinámica int8 de las capas lineales (se guarda en disco la primera vez).
+# "bf16": autocast bfloat16 en CPU (solo si la CPU lo soporta, si no se usa fp32).
+WHISPER_PRECISION_MODES = ["fp32", "int8", "bf16"]
+DEFAULT_WHISPER_PRECISION = "fp32"
+QUANTIZED_MODELS_DIR = os.path.join(APP_CACHE_DIR, "quantized_models")
+# Pesos fp32 convertidos (una vez) a un checkpoint que se carga por memory-map: carga casi
+# instantánea y la caché de páginas del sistema se comparte entre procesos con el mismo modelo
+MMAP_MODEL_WEIGHTS = True
+MMAP_MODELS_DIR = os.path.join(APP_CACHE_DIR, "mmap_models")
+
+# --- Decodificación en streaming (ffmpeg) ---
+STREAM_CHUNK_SECONDS = 5.0 # Segundos de audio por bloque leído de la tubería de ffmpeg
+
+# --- Transcripción por ventanas (grabaciones largas, motor whisper) ---
+# El audio se lee en streaming y el espectrograma se calcula ventana a ventana (30 s): la
+# memoria no depende de la duración. Los archivos más cortos usan model.transcribe() tal cual.
+WINDOWED_TRANSCRIPTION = True
+WINDOWED_MIN_DURATION_SEC = 600.0
+
+# --- Modo acelerado (audio comprimido en el tiempo, conservando el tono) ---
+SPEED_FACTORS = [1.0, 1.25, 1.5] # 1.0 = velocidad normal; más rápido = menos tiempo y algo menos de precisión
+DEFAULT_SPEED_FACTOR = 1.0
+
+# --- Proceso de trabajo para la transcripción ---
+# La transcripción completa se ejecuta en un proceso hijo con su propia copia del modelo:
+# la interfaz no compite por el GIL y "Detener" mata el proceso al instante (se arranca
+# otro con el modelo). Se recicla si su memoria privada crece más que esto desde la carga.
+# Todos los modelos (el principal y los auxiliares: borrador, idioma, variantes .en, revisión)
+# se cargan solo en ese proceso; la aplicación no hace inferencia.
+OUT_OF_PROCESS_TRANSCRIPTION = True
+WORKER_MAX_MEMORY_GROWTH_MB = 1024
+
+# --- Preajustes de decodificación (beam, reintentos por temperatura y contexto) ---
+# Cada preajuste son opciones de transcribe() de openai-whisper (faster-whisper las traduce).
+# "temperature": temperaturas con las que se reintenta una ventana si el resultado es
+# repetitivo (compression_ratio_threshold) o improbable (logprob_threshold); cada reintento
+# es otra decodificación completa de la ventana. "condition_on_previous_text": usar el texto
+# anterior como prompt (más coherente, pero puede entrar en bucles de repetición).
+DECODING_PRESETS = {
+    "default": { # Los valores por defecto de transcribe() de openai-whisper (la decodificación de siempre)
+        "beam_size": None, "best_of": None, "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": True,
+    },
+    "fast": { # Greedy, sin reintentos ni contexto: lo más rápido, ideal para notas de voz
+        "beam_size": None, "best_of": None, "temperature": (0.0,),
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": False,
+    },
+    "balanced": { # Greedy con pocos reintentos; el contexto ayuda a la coherencia en audios largos
+        "beam_size": None, "best_of": None, "temperature": (0.0, 0.4, 0.8),
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": True,
+    },
+    "accurate": { # Búsqueda en haz y la escala completa de temperaturas (los valores de la CLI de Whisper)
+        "beam_size": 5, "best_of": 5, "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": True,
+    },
+}
+DEFAULT_DECODING_PRESET = "default" # Sin cambios respecto a versiones anteriores
+
+# --- Exportación en vivo ---
+# Extensiones que se escriben junto al audio original a medida que llegan los segmentos
+# (ej: [".srt", ".jsonl"]). Vacío = desactivado.
+LIVE_EXPORT_FORMATS = []
+
+# --- Modo carpeta vigilada (python main.py watch <carpeta>) ---
+WATCH_EXTENSIONS = [".opus", ".ogg", ".m4a"] # Notas de voz de WhatsApp
+WATCH_POLL_INTERVAL_SEC = 2.0 # Cada cuánto se revisa la carpeta
+WATCH_STABLE_SEC = 3.0 # Segundos sin cambios de tamaño/fecha para dar un archivo por terminado
+WATCH_QUEUE_SIZE = 16 # Máximo de archivos esperando al transcriptor
+WATCH_EXPORT_FORMATS = [".txt"] # Resultados junto al audio (o en --output): .txt .srt .vtt .jsonl
+
+# --- Cola de varios archivos (ventana "Cola de archivos...") ---
+# Mientras un archivo está en inferencia se convierte el siguiente y se exportan los
+# resultados del anterior. Archivos ya convertidos esperando al modelo (cada uno es un WAV temporal).
+BATCH_PREFETCH_FILES = 1
+BATCH_EXPORT_FORMATS = [".txt", ".srt"] # Resultados junto a cada audio: .txt .srt .vtt .jsonl
+
+# --- Métricas de funcionamiento (metrics.py) ---
+# Para modos desatendidos: profundidad de las colas, RTF por modelo, aciertos de caché,
+# latencia de conversión, fallos por tipo y RSS. Desactivadas por defecto; también con
+# --metrics-port / --metrics-json en watch y whatsapp.
+METRICS_PORT = None # Puerto en 127.0.0.1 con formato de Prometheus (/metrics) y JSON (/metrics.json), ej. 9464
+METRICS_SNAPSHOT_FILE = None # Archivo donde añadir instantáneas JSON (una por línea), ej. "metrics.jsonl"
+METRICS_SNAPSHOT_INTERVAL_SEC = 60.0
+
+# --- Importación de exportaciones de WhatsApp (.zip) ---
+WHATSAPP_DECODE_WORKERS = 2 # Procesos ffmpeg decodificando notas en paralelo con la inferencia
+
 # --- Mensajes específicos para la UI ---
 MODEL_MEDIUM_WARNING = "¡Atención! El modelo 'medium' (y 'large') requiere muchos recursos y puede ser MUY lento en CPU. Úsalo solo para audios cortos."
 MODEL_LARGE_WARNING = "¡Atención! El modelo 'large' es extremadamente lento en CPU y puede consumir mucha memoria. No recomendado sin GPU potente."
@@ -27,6 +183,22 @@ MODEL_LARGE_WARNING = "¡Atención! El modelo 'large' es extremadamente lento en
 # --- NUEVO: Configuración Depuración ---
 HIGHLIGHT_COLOR = "yellow" # Color para resaltar texto durante reproducción
 PLAYBACK_UPDATE_INTERVAL_MS = 100 # Cada cuántos ms actualizar el resaltado
+UI_EVENT_POLL_MS = 30 # Cada cuántos ms el hilo de Tk vacía la cola de eventos de los hilos de trabajo
+UI_EVENT_BATCH_MS = 20 # Tiempo máximo ejecutando eventos por sondeo
+TEXT_RENDER_BATCH_MS = 12 # Tiempo máximo por lote al insertar transcripciones largas (luego se cede a Tk)
+TEXT_RENDER_CHUNK_CHARS = 20000 # Trozos en que se parte un texto sin segmentos al insertarlo
+
+# --- Vista de forma de onda (modo Depurar) ---
+WAVEFORM_HEIGHT = 80 # Alto del canvas en píxeles
+WAVEFORM_BASE_BLOCK = 256 # Muestras por pico en el nivel más detallado de la pirámide
+WAVEFORM_MIN_LEVEL_ROWS = 2048 # La pirámide deja de reducirse al llegar a este número de picos
+WAVEFORM_MIN_VIEW_SEC = 1.0 # Zoom máximo (segundos visibles)
+WAVEFORM_ZOOM_STEP = 1.5 # Factor de zoom por paso de la rueda del ratón
+WAVEFORM_BG_COLOR = "#1e1e1e"
+WAVEFORM_COLOR = "#4CAF50"
+WAVEFORM_CURSOR_COLOR = "red"
+WAVEFORM_SEGMENT_COLOR = "#5a5a5a" # Líneas de inicio de cada segmento
+WAVEFORM_SELECTION_COLOR = "#2f4f6f" # Tramo seleccionado con el botón derecho
 
 # Colores UI (Opcional, pero bueno tenerlos centralizados)
 BG_COLOR = '#f0f0f0'
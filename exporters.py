@@ -0,0 +1,116 @@
+# exporters.py
+"""
+Exportadores de segmentos con marcas de tiempo (SRT, WebVTT y JSONL).
+
+Los escritores consumen los segmentos de uno en uno y vuelcan cada uno a disco en
+cuanto llega, así que sirven tanto para exportar en vivo mientras el transcriptor
+produce segmentos como para exportar de forma perezosa un resultado ya terminado.
+La memoria usada no depende de la duración del audio y el archivo parcial es
+válido (y legible) aunque la transcripción no haya terminado.
+"""
+
+import json
+import pathlib
+
+# Campos de cada segmento que se conservan en JSONL (se omiten 'tokens', 'seek'...)
+JSONL_SEGMENT_FIELDS = ("id", "start", "end", "text", "avg_logprob", "no_speech_prob", "compression_ratio")
+
+
+def format_timestamp(seconds: float, decimal_marker: str = ",") -> str:
+    """Formatea segundos como HH:MM:SS,mmm (SRT) o HH:MM:SS.mmm (WebVTT)."""
+    total_ms = max(0, int(round(seconds * 1000)))
+    hours, remainder = divmod(total_ms, 3_600_000)
+    minutes, remainder = divmod(remainder, 60_000)
+    secs, millis = divmod(remainder, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_marker}{millis:03d}"
+
+
+class SegmentWriter:
+    """Escritor incremental de segmentos. Se usa como context manager o con close()."""
+
+    extension = ""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.segments_written = 0
+        self._write_header()
+
+    def _write_header(self):
+        pass
+
+    def _format_segment(self, segment: dict) -> str:
+        raise NotImplementedError
+
+    def write_segment(self, segment: dict):
+        """Escribe un segmento y lo vuelca a disco inmediatamente."""
+        self._file.write(self._format_segment(segment))
+        self._file.flush()
+        self.segments_written += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SrtWriter(SegmentWriter):
+    extension = ".srt"
+
+    def _format_segment(self, segment: dict) -> str:
+        start = format_timestamp(segment.get("start", 0.0), ",")
+        end = format_timestamp(segment.get("end", 0.0), ",")
+        text = segment.get("text", "").strip()
+        return f"{self.segments_written + 1}\n{start} --> {end}\n{text}\n\n"
+
+
+class VttWriter(SegmentWriter):
+    extension = ".vtt"
+
+    def _write_header(self):
+        self._file.write("WEBVTT\n\n")
+        self._file.flush()
+
+    def _format_segment(self, segment: dict) -> str:
+        start = format_timestamp(segment.get("start", 0.0), ".")
+        end = format_timestamp(segment.get("end", 0.0), ".")
+        text = segment.get("text", "").strip()
+        return f"{start} --> {end}\n{text}\n\n"
+
+
+class JsonlWriter(SegmentWriter):
+    extension = ".jsonl"
+
+    def _format_segment(self, segment: dict) -> str:
+        record = {field: segment[field] for field in JSONL_SEGMENT_FIELDS if field in segment}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+# Formatos disponibles: extensión -> clase escritora
+WRITERS = {writer.extension: writer for writer in (SrtWriter, VttWriter, JsonlWriter)}
+
+EXPORT_FILE_TYPES = [("Subtítulos SRT", "*.srt"), ("Subtítulos WebVTT", "*.vtt"), ("Segmentos JSONL", "*.jsonl")]
+
+
+def create_writer(path: pathlib.Path) -> SegmentWriter:
+    """Crea el escritor adecuado según la extensión del archivo. ValueError si no está soportada."""
+    path = pathlib.Path(path)
+    writer_cls = WRITERS.get(path.suffix.lower())
+    if writer_cls is None:
+        raise ValueError(f"Formato de exportación no soportado: '{path.suffix}'.")
+    return writer_cls(path)
+
+def export_segments(segments, path: pathlib.Path) -> int:
+    """
+    Exporta un iterable de segmentos (lista o generador) a 'path' sin materializarlo.
+    Devuelve el número de segmentos escritos.
+    """
+    with create_writer(path) as writer:
+        for segment in segments:
+            writer.write_segment(segment)
+        return writer.segments_written
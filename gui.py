@@ -7,16 +7,26 @@ import tkinter.font as tkFont
 import pathlib
 import threading
 import time # Necesario para formato de tiempo y timers
-from pydub import AudioSegment, exceptions as pydub_exceptions # Para obtener duración
 
 # Importar módulos locales
 import config
 import utils
 from utils import check_nvidia_smi, check_pytorch_cuda
 import audio_handler
+import audio_stream
+import batch_queue
+import metrics
 import playback
+import time_compression
+import transcript_index
+import waveform
+from segment_store import SegmentStore
+from session_journal import SessionJournal
+from task_scheduler import DependencyScheduler
+from ui_events import UIEventQueue
 # from google_transcriber import GoogleTranscriber # Eliminado
-from whisper_transcriber import WhisperTranscriber, WHISPER_AVAILABLE
+import whisper_transcriber
+from whisper_transcriber import WhisperTranscriber, WHISPER_AVAILABLE, get_loaded_engine_name, get_loaded_precision
 from whisper_transcriber import _model_load_thread, _model_load_stop_event # Para cancelación
 
 class AudioTranscriptorPro:
@@ -39,6 +49,14 @@ class AudioTranscriptorPro:
         self.ventana.geometry("800x600")
         self.ventana.protocol("WM_DELETE_WINDOW", self._on_closing)
 
+        # Los hilos de trabajo no tocan Tk: publican en esta cola, que se vacía desde el bucle de Tk
+        self.ui_events = UIEventQueue()
+        self.ui_events.start(self.ventana)
+        metrics.register_callback("queue_depth", lambda: self.ui_events.stats()["depth"], queue="ui_events")
+        metrics.register_callback("ui_event_latency_ms", lambda: self.ui_events.stats()["avg_latency_ms"], stat="avg")
+        metrics.register_callback("ui_event_latency_ms", lambda: self.ui_events.stats()["max_latency_ms"], stat="max")
+        self.metrics_exporters = metrics.start_exporters() # Solo si config.METRICS_PORT / METRICS_SNAPSHOT_FILE
+
         # --- Comprobación inicial del entorno ---
         print("--- Comprobación inicial del entorno ---")
         self.nvidia_drivers_detected = check_nvidia_smi()
@@ -53,11 +71,40 @@ class AudioTranscriptorPro:
         # --- Estado de la Aplicación ---
         self.ruta_audio_original: pathlib.Path | None = None
         self.ruta_audio_wav: pathlib.Path | None = None
+        self.audio_generation = 0 # Se incrementa con cada audio elegido: descarta conversiones de audios anteriores
         self.selected_whisper_model: str | None = None
+        self.loaded_whisper_precision: str | None = None # Precisión con la que se cargó el modelo actual
         self.whisper_model_loaded = False
         self.is_loading_model = False
         self.whisper_transcription_complete = False
         self.transcription_result: dict | None = None # Almacena resultado Whisper con {text, segments, language}
+        self.batch_pipeline: batch_queue.BatchPipeline | None = None # Cola de varios archivos (se crea al abrirla)
+        self.queue_panel: batch_queue.QueuePanel | None = None
+
+        # --- Dependencias para transcribir: "model" (modelo cargado) y "audio" (WAV listo) ---
+        # La carga del modelo y la conversión del audio corren en paralelo; el planificador
+        # lanza la transcripción automática cuando ambas han terminado.
+        self.scheduler = DependencyScheduler()
+        self.audio_selected_at: float | None = None # perf_counter al seleccionar el audio (para medir latencia)
+
+        # --- Estado de Transcripción Progresiva (borrador + refinado) ---
+        self.progressive_active = False # Hay un refinado en curso sobre un borrador
+        self.draft_ready = False # El borrador ya se muestra en el área de texto
+        self.progressive_job = 0 # Se incrementa por transcripción para descartar refinados de una anterior
+        self.pending_refines = 0 # Refinados recibidos antes de que el borrador terminase de insertarse
+        self._segment_tag_texts: dict[str, str] = {} # Tag del segmento -> texto insertado (para detectar ediciones)
+
+        # --- Inserción por lotes de transcripciones largas ---
+        self._render_generation = 0 # Se incrementa para abandonar una inserción en curso
+        self.text_render_pending = False # Aún quedan lotes de texto por insertar
+        self._segment_marks: list[str] = [] # Marca al inicio de cada segmento (índice = posición en segments)
+        self._segment_store_cache = (None, None) # (lista de segmentos, SegmentStore) para buscar por tiempo vectorizado
+        self._mark_counter = 0 # Para nombres únicos de las marcas de segmentos re-transcritos
+
+        # --- Autoguardado de la sesión (diario de ediciones por audio) ---
+        self.session_journal: SessionJournal | None = None
+        self._journal_after_id = None # Anotación de la ráfaga de ediciones pendiente (debounce)
+        self._pending_jump: dict | None = None # Resultado de búsqueda a abrir en Depurar cuando el audio esté listo
 
         # --- Estado de Depuración ---
         self.is_depurating = False
@@ -65,6 +112,8 @@ class AudioTranscriptorPro:
         self.current_highlighted_segment_index = -1
         self.is_paused = False # Flag para estado de pausa de Pygame
         self.audio_duration_sec: float | None = None # Duración del archivo cargado
+        self.playback_offset_sec = 0.0 # Posición desde la que se lanzó play() (get_pos() cuenta desde ahí)
+        self.waveform_pyramid = None # waveform.PeakPyramid del WAV actual (se calcula tras la conversión)
 
         # --- Estado de Animación (para carga/transcripción) ---
         self.animacion_whisper_activa = False
@@ -76,10 +125,13 @@ class AudioTranscriptorPro:
         self.whisper_transcriber = None
         if WHISPER_AVAILABLE:
             self.whisper_transcriber = WhisperTranscriber(
-                update_callback=lambda result: self.ventana.after(0, self._update_texto_whisper, result),
-                status_callback=lambda status: self.ventana.after(0, self.set_status, status),
-                completion_callback=lambda success, result: self.ventana.after(0, self._on_whisper_transcription_complete, success, result),
-                error_callback=lambda error: self.ventana.after(0, self._show_error, "Whisper Error", error)
+                update_callback=self.ui_events.wrap(self._update_texto_whisper),
+                status_callback=self.ui_events.wrap(self.set_status, coalesce_key="status"), # Solo importa el último
+                completion_callback=self.ui_events.wrap(self._on_whisper_transcription_complete),
+                error_callback=lambda error: self.ui_events.post(self._show_error, "Whisper Error", error),
+                draft_callback=self.ui_events.wrap(self._on_progressive_draft),
+                refine_callback=self.ui_events.wrap(self._on_progressive_refine),
+                span_callback=self.ui_events.wrap(self._on_span_transcribed)
             )
         else:
             print("INFO: WhisperTranscriber no se inicializará (librería no encontrada).")
@@ -151,13 +203,70 @@ class AudioTranscriptorPro:
             self.model_combobox.bind("<<ComboboxSelected>>", self._on_model_select)
         self.model_combobox.pack(anchor='w', pady=(0, 5))
 
+        tk.Label(frame_controles, text="Precisión CPU:", font=self.instruction_font, bg=config.BG_COLOR).pack(anchor='w')
+        self.precision_var = tk.StringVar(value=config.DEFAULT_WHISPER_PRECISION)
+        self.precision_combobox = ttk.Combobox(
+            frame_controles, textvariable=self.precision_var, width=15,
+            values=config.WHISPER_PRECISION_MODES,
+            state="readonly" if WHISPER_AVAILABLE else "disabled"
+        )
+        if WHISPER_AVAILABLE:
+            self.precision_combobox.bind("<<ComboboxSelected>>", self._on_precision_select)
+        self.precision_combobox.pack(anchor='w', pady=(0, 5))
+
+        tk.Label(frame_controles, text="Velocidad (modo acelerado):", font=self.instruction_font, bg=config.BG_COLOR).pack(anchor='w')
+        self.speed_var = tk.StringVar(value=time_compression.format_factor(config.DEFAULT_SPEED_FACTOR))
+        self.speed_combobox = ttk.Combobox(
+            frame_controles, textvariable=self.speed_var, width=15,
+            values=[time_compression.format_factor(factor) for factor in config.SPEED_FACTORS],
+            state="readonly" if WHISPER_AVAILABLE else "disabled"
+        )
+        self.speed_combobox.pack(anchor='w', pady=(0, 5))
+
+        tk.Label(frame_controles, text="Decodificación:", font=self.instruction_font, bg=config.BG_COLOR).pack(anchor='w')
+        self.preset_var = tk.StringVar(value=config.DEFAULT_DECODING_PRESET)
+        self.preset_combobox = ttk.Combobox(
+            frame_controles, textvariable=self.preset_var, width=15,
+            values=list(config.DECODING_PRESETS),
+            state="readonly" if WHISPER_AVAILABLE else "disabled"
+        )
+        self.preset_combobox.pack(anchor='w', pady=(0, 5))
+
+        self.progressive_var = tk.BooleanVar(value=False)
+        self.progressive_checkbox = tk.Checkbutton(
+            frame_controles, text=f"Borrador rápido ({config.PROGRESSIVE_DRAFT_MODEL}) + refinado",
+            variable=self.progressive_var, bg=config.BG_COLOR, font=self.instruction_font,
+            wraplength=180, justify=tk.LEFT
+        )
+        self.progressive_checkbox.pack(anchor='w', pady=(0, 5))
+        self.detect_language_var = tk.BooleanVar(value=config.LANGUAGE_DETECTION_ENABLED)
+        self.detect_language_checkbox = tk.Checkbutton(
+            frame_controles, text="Detectar idioma de cada audio", variable=self.detect_language_var,
+            bg=config.BG_COLOR, font=self.instruction_font, wraplength=180, justify=tk.LEFT
+        )
+        self.detect_language_checkbox.pack(anchor='w', pady=(0, 5))
+        self.recheck_var = tk.BooleanVar(value=False)
+        self.recheck_checkbox = tk.Checkbutton(
+            frame_controles, text=f"Revisar partes dudosas con '{config.RECHECK_MODEL}'", variable=self.recheck_var,
+            bg=config.BG_COLOR, font=self.instruction_font, wraplength=180, justify=tk.LEFT
+        )
+        self.recheck_checkbox.pack(anchor='w', pady=(0, 5))
+
         self.model_warning_label = tk.Label(frame_controles, text="", font=self.warning_font, fg="orange", bg=config.BG_COLOR, wraplength=180, justify=tk.LEFT)
         self.model_warning_label.pack(anchor='w', pady=(0,5))
         if WHISPER_AVAILABLE: self._update_model_warning(config.DEFAULT_WHISPER_MODEL)
 
         self.boton_seleccionar = tk.Button(frame_controles, text="Seleccionar Audio", command=self._seleccionar_audio_action, padx=10, pady=5)
         self.boton_seleccionar.pack(anchor='w', pady=(10, 5))
-        self.boton_transcribir = tk.Button(frame_controles, text="Transcribir", command=self._transcribir_action, padx=10, pady=5)
+        self.boton_cola = tk.Button(frame_controles, text="Cola de archivos...", command=self._abrir_cola_action, padx=10, pady=2)
+        self.boton_cola.pack(anchor='w', pady=(0, 5))
+        self.auto_transcribe_var = tk.BooleanVar(value=config.AUTO_TRANSCRIBE_DEFAULT)
+        self.auto_transcribe_checkbox = tk.Checkbutton(
+            frame_controles, text="Transcribir al estar listo", variable=self.auto_transcribe_var,
+            bg=config.BG_COLOR, font=self.instruction_font
+        )
+        self.auto_transcribe_checkbox.pack(anchor='w')
+        self.boton_transcribir = tk.Button(frame_controles, text="Transcribir", command=self._boton_transcribir_action, padx=10, pady=5)
         self.boton_transcribir.pack(anchor='w', pady=(5, 5))
         self.boton_depurar = tk.Button(frame_controles, text="Depurar", command=self._toggle_depuration_mode, padx=10, pady=5, state=tk.DISABLED)
         self.boton_depurar.pack(anchor='w', pady=(15, 5))
@@ -183,6 +292,12 @@ class AudioTranscriptorPro:
         self.boton_stop_playback.pack(side=tk.LEFT, padx=5, pady=5)
         self.playback_time_label = tk.Label(self.frame_playback_controls, text="--:-- / --:--", bg=config.BG_COLOR, font=self.instruction_font)
         self.playback_time_label.pack(side=tk.LEFT, padx=10, pady=5)
+        self.boton_retranscribir = tk.Button(self.frame_playback_controls, text="Re-transcribir selección", command=self._retranscribe_selection_action, padx=5, pady=2)
+        self.boton_retranscribir.pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Forma de onda (Modo Depuración): rueda = zoom, Mayús+rueda = desplazar, clic = saltar
+        self.waveform_view = waveform.WaveformView(frame_estado_progreso, seek_callback=self._seek_playback)
+        # Se muestra/oculta dinámicamente junto a los controles de playback
 
         # Frame Animación Puntos (Transcripción)
         self.whisper_dots_frame = tk.Frame(frame_estado_progreso, bg=config.BG_COLOR)
@@ -202,6 +317,7 @@ class AudioTranscriptorPro:
         self.area_texto_whisper = scrolledtext.ScrolledText(frame_whisper, wrap=tk.WORD, font=self.text_font, height=15, padx=10, pady=10, borderwidth=1, relief=tk.SOLID, state=tk.DISABLED)
         self.area_texto_whisper.pack(fill=tk.BOTH, expand=True)
         self.area_texto_whisper.tag_configure("highlight", background=config.HIGHLIGHT_COLOR)
+        self.area_texto_whisper.bind("<<Modified>>", self._on_text_modified)
         self.whisper_status_canvas_circle = tk.Canvas(frame_whisper, width=10, height=10, bg=config.BG_COLOR, highlightthickness=0)
         self.whisper_status_canvas_circle.place(relx=1.0, rely=0.0, x=-5, y=5, anchor=tk.NE)
         utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_GRAY)
@@ -215,6 +331,8 @@ class AudioTranscriptorPro:
         self.boton_copiar_whisper.pack(side=tk.LEFT, padx=5)
         self.boton_exportar_whisper = tk.Button(center_frame_botones, text="Exportar Texto", command=self._exportar_whisper_action, state=tk.DISABLED, padx=10, pady=5)
         self.boton_exportar_whisper.pack(side=tk.LEFT, padx=5)
+        self.boton_buscar = tk.Button(center_frame_botones, text="Buscar en Transcripciones", command=self._buscar_action, padx=10, pady=5)
+        self.boton_buscar.pack(side=tk.LEFT, padx=5)
 
 
     # --- Métodos de Acción (Callbacks de Widgets) ---
@@ -225,7 +343,8 @@ class AudioTranscriptorPro:
              self.set_status("Error: Whisper no está disponible.")
              return
         selected = self.model_var.get()
-        if not selected or (selected == self.selected_whisper_model and self.whisper_model_loaded):
+        precision = self.precision_var.get()
+        if not selected or (selected == self.selected_whisper_model and self.whisper_model_loaded and precision == self.loaded_whisper_precision):
              return
 
         print(f"Acción: Selección de modelo Whisper -> {selected}")
@@ -233,6 +352,7 @@ class AudioTranscriptorPro:
 
         self.selected_whisper_model = selected
         self.whisper_model_loaded = False
+        self.scheduler.clear("model")
         self.is_loading_model = True
         self._update_model_warning(selected)
         self._reset_transcription_state()
@@ -241,14 +361,22 @@ class AudioTranscriptorPro:
         self.progress_var.set(0)
         # Simplemente empaqueta la barra sin referencia 'before' (CORREGIDO)
         self.progress_bar.pack(fill=tk.X, pady=(2,5))
-        self.set_status(f"Iniciando carga del modelo '{selected}'...")
+        self.set_status(f"Iniciando carga del modelo '{selected}' ({precision})...")
 
         self.whisper_transcriber.load_model(
             model_name=selected,
-            progress_callback=lambda msg, perc: self.ventana.after(0, self._update_model_load_progress, msg, perc),
-            model_completion_callback=lambda success, name: self.ventana.after(0, self._on_model_load_complete, success, name)
+            progress_callback=self.ui_events.wrap(self._update_model_load_progress, coalesce_key="model_progress"),
+            model_completion_callback=self.ui_events.wrap(self._on_model_load_complete),
+            precision=precision
         )
 
+    def _on_precision_select(self, event=None):
+        """Manejador para el cambio de precisión: recarga el modelo actual si ya hay uno elegido."""
+        if not self.selected_whisper_model:
+            return # Se aplicará al seleccionar el primer modelo
+        print(f"Acción: Cambio de precisión -> {self.precision_var.get()}")
+        self._on_model_select()
+
     def _update_model_warning(self, model_name):
         """Actualiza la etiqueta de advertencia según el modelo seleccionado (CPU vs GPU)."""
         warning_text = ""
@@ -261,10 +389,10 @@ class AudioTranscriptorPro:
         except tk.TclError: pass
 
     def _seleccionar_audio_action(self):
-        """Manejador para el botón 'Seleccionar Audio'."""
-        if not self.whisper_model_loaded:
-             self._show_error("Error", "Debes seleccionar y cargar un modelo Whisper primero.")
-             return
+        """
+        Manejador para el botón 'Seleccionar Audio'.
+        No espera a que el modelo esté cargado: la conversión corre en paralelo con la carga.
+        """
         if self.is_depurating: self._toggle_depuration_mode(force_exit=True)
 
         print("Acción: Seleccionar audio iniciada.")
@@ -274,37 +402,74 @@ class AudioTranscriptorPro:
             if self.selected_whisper_model: status_msg += f" Modelo cargado: {self.selected_whisper_model}"
             self.set_status(status_msg)
             return
+        self._load_audio_file(selected_path)
 
+    def _load_audio_file(self, selected_path: pathlib.Path):
+        """Prepara un audio (conversión a WAV en segundo plano) como archivo actual."""
+        self._close_session_journal()
+        self._pending_jump = None
+        self.scheduler.cancel("search_jump")
         self.ruta_audio_original = selected_path
         self.ruta_audio_wav = None
+        self.audio_generation += 1
         self.audio_duration_sec = None
+        self.waveform_pyramid = None
+        self.waveform_view.set_pyramid(None)
+        self.scheduler.clear("audio")
+        self.audio_selected_at = time.perf_counter()
         self.set_status(f"Archivo: {self.ruta_audio_original.name}. Convirtiendo a WAV...")
         self._reset_transcription_state()
         self._update_ui_state()
+        self.scheduler.when_ready("auto_transcribe", ("model", "audio"), self._on_model_and_audio_ready)
 
-        threading.Thread(target=self._convert_and_prepare_audio, args=(selected_path,), daemon=True).start()
+        threading.Thread(target=self._convert_and_prepare_audio, args=(selected_path, self.audio_generation), daemon=True).start()
 
-    def _convert_and_prepare_audio(self, audio_path: pathlib.Path):
+    def _convert_and_prepare_audio(self, audio_path: pathlib.Path, generation: int):
         """
         Hilo trabajador: Intenta convertir audio a WAV y obtener su duración.
         Luego llama a _update_gui_after_conversion para actualizar la UI.
         """
+        if config.SESSION_JOURNAL_ENABLED:
+            # La sesión guardada se lee antes de convertir (y fuera del hilo de Tk) para ofrecer
+            # restaurarla antes de que arranque la transcripción automática
+            try:
+                journal = SessionJournal(audio_path)
+                session = journal.load()
+            except OSError as e:
+                print(f"Advertencia: No se pudo abrir la sesión guardada de {audio_path.name}: {e}")
+                journal, session = None, None
+            self.ui_events.post(self._on_session_journal_ready, audio_path, journal, session)
         wav_path = audio_handler.convert_to_wav_if_needed(audio_path)
         duration_sec = None
         if wav_path:
+            # Solo se lee la cabecera del WAV, no el audio completo
+            duration_sec = audio_stream.wav_duration(wav_path)
+        self.ui_events.post(self._update_gui_after_conversion, generation, wav_path, duration_sec)
+        if wav_path and generation == self.audio_generation:
+            # La pirámide de picos se calcula después para no retrasar la transcripción
             try:
-                audio = AudioSegment.from_wav(str(wav_path))
-                duration_sec = len(audio) / 1000.0
-            except pydub_exceptions.CouldntDecodeError:
-                 print(f"Advertencia: Pydub no pudo decodificar {wav_path.name} para obtener duración.")
-            except FileNotFoundError:
-                 print("Error: No se encontró el archivo WAV temporal para obtener duración.")
+                pyramid = waveform.build_peak_pyramid(wav_path)
             except Exception as e:
-                print(f"Advertencia: No se pudo obtener la duración del archivo WAV ({wav_path.name}): {e}")
-        self.ventana.after(0, self._update_gui_after_conversion, wav_path, duration_sec)
-
-    def _update_gui_after_conversion(self, wav_path: pathlib.Path | None, duration_sec: float | None):
+                print(f"Advertencia: No se pudo calcular la forma de onda de {wav_path.name}: {e}")
+                pyramid = None
+            self.ui_events.post(self._on_waveform_ready, wav_path, pyramid)
+
+    def _on_waveform_ready(self, wav_path: pathlib.Path, pyramid):
+        """Asigna la forma de onda si sigue correspondiendo al audio actual."""
+        if wav_path != self.ruta_audio_wav:
+            return # El usuario ya eligió otro archivo
+        self.waveform_pyramid = pyramid
+        self.waveform_view.set_pyramid(pyramid)
+
+    def _update_gui_after_conversion(self, generation: int, wav_path: pathlib.Path | None, duration_sec: float | None):
         """Actualiza la interfaz gráfica después de intentar la conversión de audio."""
+        if generation != self.audio_generation:
+            # Conversión de un audio anterior que terminó tarde: no debe tocar el estado del actual
+            print(f"Conversión descartada (el usuario ya eligió otro archivo): {wav_path.name if wav_path else 'error'}")
+            current_target = audio_handler.temp_wav_path_for(self.ruta_audio_original) if self.ruta_audio_original else None
+            if wav_path and wav_path not in (self.ruta_audio_wav, current_target): # Mismo archivo elegido otra vez: es el WAV del actual
+                audio_handler.discard_temp_wav(wav_path)
+            return
         if wav_path:
             self.ruta_audio_wav = wav_path
             self.audio_duration_sec = duration_sec
@@ -312,8 +477,12 @@ class AudioTranscriptorPro:
             self.ventana.title(f"Audio a Texto Pro - {self.ruta_audio_original.name} ({config.__version__})")
             duration_str = self._format_time(self.audio_duration_sec)
             status_msg = f"Audio listo ({self.ruta_audio_wav.name} [{duration_str}])."
-            if self.selected_whisper_model: status_msg += f" Modelo: {self.selected_whisper_model}."
-            status_msg += " Pulsa 'Transcribir'."
+            if self.whisper_model_loaded:
+                status_msg += f" Modelo: {self.selected_whisper_model}. Pulsa 'Transcribir'."
+            elif self.is_loading_model:
+                status_msg += f" Esperando a que termine la carga del modelo '{self.selected_whisper_model}'..."
+            else:
+                status_msg += " Selecciona un modelo Whisper."
             self.set_status(status_msg)
             print(f"Audio preparado. WAV path: {self.ruta_audio_wav}, Duración: {duration_str}")
             try:
@@ -324,12 +493,78 @@ class AudioTranscriptorPro:
             self.ruta_audio_original = None
             self.ruta_audio_wav = None
             self.audio_duration_sec = None
+            self._pending_jump = None
+            self.scheduler.cancel("auto_transcribe")
+            self.scheduler.cancel("search_jump")
             self.set_status("Error en conversión. Selecciona otro archivo.")
             self.ventana.title(f"Audio a Texto Pro ({config.__version__}) - Whisper")
             try:
                  if self.playback_time_label.winfo_exists(): self.playback_time_label.config(text="--:-- / --:--")
             except tk.TclError: pass
         self._update_ui_state()
+        if wav_path: self.scheduler.set_ready("audio")
+
+    def _on_model_and_audio_ready(self):
+        """Planificador: modelo cargado y audio convertido. Transcribe si la opción automática está activa."""
+        if self.audio_selected_at is not None:
+            waited = time.perf_counter() - self.audio_selected_at
+            print(f"Modelo y audio listos {waited:.2f} s después de seleccionar el archivo (carga y conversión en paralelo).")
+        if not self.auto_transcribe_var.get():
+            return
+        if self.is_depurating or (self.whisper_transcriber and self.whisper_transcriber.is_running()):
+            return
+        print("Acción: Transcripción automática (modelo y audio listos).")
+        self._transcribir_action()
+
+    def _boton_transcribir_action(self):
+        """Botón 'Transcribir' / 'Detener' según haya una transcripción en curso."""
+        if self.whisper_transcriber and self.whisper_transcriber.is_running():
+            self._detener_action()
+        else:
+            self._transcribir_action()
+
+    def _detener_action(self):
+        """Detiene la transcripción en curso (el resultado parcial se conserva)."""
+        print("Acción: Detener transcripción.")
+        self.set_status("Deteniendo la transcripción...")
+        self.boton_transcribir.config(state=tk.DISABLED)
+        self.whisper_transcriber.stop()
+
+    # --- Cola de varios archivos ---
+
+    def _abrir_cola_action(self):
+        """Manejador para el botón 'Cola de archivos...': muestra la ventana de la cola (la crea la primera vez)."""
+        if self.batch_pipeline is None:
+            self.batch_pipeline = batch_queue.BatchPipeline(
+                on_change=self.ui_events.wrap(self._on_batch_change, coalesce_key="batch_queue"),
+                can_transcribe=self._batch_can_transcribe)
+        if self.queue_panel is None or not self.queue_panel.winfo_exists():
+            self.queue_panel = batch_queue.QueuePanel(self.ventana, self.batch_pipeline, self._batch_settings)
+        else:
+            self.queue_panel.deiconify()
+            self.queue_panel.lift()
+
+    def _batch_settings(self) -> dict:
+        """Ajustes de la ventana principal que se aplican a los archivos añadidos a la cola."""
+        return {
+            "speed_factor": time_compression.parse_factor(self.speed_var.get()),
+            "decoding_preset": self.preset_var.get(),
+            "detect_language": self.detect_language_var.get(),
+            "recheck_low_confidence": self.recheck_var.get(),
+        }
+
+    def _batch_can_transcribe(self) -> bool:
+        """La cola espera a que el modelo esté cargado y libre (lo consulta desde su hilo)."""
+        gui_transcribing = self.whisper_transcriber is not None and self.whisper_transcriber.is_running()
+        return self.whisper_model_loaded and not self.is_loading_model and not gui_transcribing
+
+    def _on_batch_change(self):
+        """Un archivo de la cola cambió de estado (en el hilo de Tk)."""
+        if self.queue_panel is not None:
+            try:
+                if self.queue_panel.winfo_exists(): self.queue_panel.refresh()
+            except tk.TclError: pass
+        self._update_ui_state()
 
     def _transcribir_action(self):
         """Manejador para el botón 'Transcribir'."""
@@ -342,6 +577,9 @@ class AudioTranscriptorPro:
         if self.whisper_transcriber and self.whisper_transcriber.is_running():
             self._show_error("Información", "Ya hay una transcripción en curso.")
             return
+        if self.batch_pipeline and self.batch_pipeline.is_transcribing():
+            self._show_error("Información", "La cola de archivos está usando el modelo. Espera o detén la cola.")
+            return
         if self.is_depurating:
              self._show_error("Información", "Sal del modo 'Depurar' antes de transcribir de nuevo.")
              return
@@ -352,7 +590,19 @@ class AudioTranscriptorPro:
         self._update_ui_state()
         utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_YELLOW)
         self._start_whisper_animation()
-        if self.whisper_transcriber: self.whisper_transcriber.start()
+        if self.whisper_transcriber:
+            if self.ruta_audio_original:
+                self.whisper_transcriber.set_live_export_paths(
+                    [self.ruta_audio_original.with_suffix(ext) for ext in config.LIVE_EXPORT_FORMATS])
+            # El modo progresivo solo tiene sentido si el modelo elegido es mayor que el del borrador
+            self.progressive_active = self.progressive_var.get() and self.selected_whisper_model != config.PROGRESSIVE_DRAFT_MODEL
+            if self.session_journal: self.session_journal.deactivate() # Hasta la instantánea del nuevo resultado
+            self.whisper_transcriber.detect_language = self.detect_language_var.get()
+            self.whisper_transcriber.recheck_low_confidence = self.recheck_var.get()
+            # El modo progresivo ya tiene su borrador rápido: la aceleración solo se aplica a la transcripción normal
+            self.whisper_transcriber.speed_factor = time_compression.parse_factor(self.speed_var.get())
+            self.whisper_transcriber.decoding_preset = self.preset_var.get()
+            self.whisper_transcriber.start(progressive=self.progressive_active)
 
     def _copiar_whisper_action(self):
         """Manejador para el botón 'Copiar Texto'."""
@@ -372,7 +622,8 @@ class AudioTranscriptorPro:
                 if self.selected_whisper_model: default_filename += f"_{self.selected_whisper_model}"
                 if self.ruta_audio_original: default_filename += f"_{self.ruta_audio_original.stem}"
                 else: default_filename += "_audio"
-                utils.export_text_to_file(texto, default_filename)
+                segments = self._displayed_segments() if self.transcription_result else None # Con las ediciones de Depurar
+                utils.export_text_to_file(texto, default_filename, segments=segments)
             else: print("Error al exportar: El área de texto no está disponible.")
         except tk.TclError: print("Error TclError al intentar exportar texto.")
 
@@ -392,44 +643,245 @@ class AudioTranscriptorPro:
         if success:
             self.whisper_model_loaded = True
             self.selected_whisper_model = model_name
+            self.loaded_whisper_precision = get_loaded_precision()
+            self.precision_var.set(self.loaded_whisper_precision) # La pedida puede no estar disponible (bf16 -> fp32)
             self.model_var.set(model_name)
-            self.set_status(f"Modelo '{model_name}' cargado ({self.device_to_use}). Selecciona audio o transcribe.")
+            self.set_status(f"Modelo '{model_name}' cargado ({self.device_to_use}, {self.loaded_whisper_precision}, motor: {get_loaded_engine_name()}). Selecciona audio o transcribe.")
         else:
             self.whisper_model_loaded = False
             self.selected_whisper_model = None
+            self.loaded_whisper_precision = None
             self.set_status(f"Error al cargar modelo '{model_name}'. Intenta de nuevo o elige otro.")
         self._update_ui_state()
+        if success: self.scheduler.set_ready("model") # Puede lanzar la transcripción automática
 
     def _update_texto_whisper(self, result_data: dict):
         """Callback para actualizar el área de texto con el resultado de Whisper."""
         if not self.area_texto_whisper or not self.area_texto_whisper.winfo_exists(): return
 
         self.transcription_result = result_data
-        texto_completo = result_data.get("text", "Error: No se encontró texto en el resultado.")
-        try:
-            self.area_texto_whisper.config(state=tk.NORMAL)
-            self.area_texto_whisper.delete("1.0", tk.END)
-            self.area_texto_whisper.insert("1.0", texto_completo)
-            self.area_texto_whisper.see("1.0")
-            if not self.is_depurating: self.area_texto_whisper.config(state=tk.DISABLED)
-        except tk.TclError: print("Error TclError al actualizar área de texto.")
+        self._clear_segment_tags()
+        segments = result_data.get("segments") or []
+        if segments:
+            # Una marca (no un tag) por segmento: resaltar no necesita buscar el texto y no ralentiza el widget
+            pieces = [(segment.get("text", ""), (), f"segmark_{index}") for index, segment in enumerate(segments)]
+        else:
+            texto_completo = result_data.get("text", "Error: No se encontró texto en el resultado.")
+            chunk = config.TEXT_RENDER_CHUNK_CHARS
+            pieces = [(texto_completo[i:i + chunk], (), None) for i in range(0, len(texto_completo), chunk)]
+        self._render_text_pieces(pieces)
         self._update_ui_state()
 
+    def _insert_tagged_segments(self, segments: list[dict], on_complete=None):
+        """Reemplaza el área de texto por los segmentos, cada uno con su tag 'seg_<id>' (por lotes)."""
+        self._clear_segment_tags()
+        pieces = []
+        for segment in segments:
+            tag = f"seg_{segment['id']}"
+            text = segment.get("text", "")
+            pieces.append((text, (tag,), None))
+            self._segment_tag_texts[tag] = text
+        self._render_text_pieces(pieces, on_complete)
+
+    def _clear_segment_tags(self):
+        try:
+            for tag in self._segment_tag_texts: self.area_texto_whisper.tag_delete(tag)
+        except tk.TclError: pass
+        self._segment_tag_texts = {}
+
+    def _unset_segment_marks(self):
+        try:
+            if self._segment_marks: self.area_texto_whisper.mark_unset(*self._segment_marks)
+        except tk.TclError: pass
+        self._segment_marks = []
+
+    def _render_text_pieces(self, pieces: list[tuple], on_complete=None):
+        """
+        Reemplaza el área de texto por 'pieces' [(texto, tags, marca | None)] insertando lotes de
+        como mucho config.TEXT_RENDER_BATCH_MS y devolviendo el control a Tk entre lotes: con
+        transcripciones de horas la ventana sigue respondiendo mientras se rellena.
+        """
+        self._render_generation += 1
+        generation = self._render_generation
+        widget = self.area_texto_whisper
+        self._unset_segment_marks()
+        try:
+            widget.config(state=tk.NORMAL)
+            widget.delete("1.0", tk.END)
+            if not self.is_depurating: widget.config(state=tk.DISABLED)
+        except tk.TclError:
+            print("Error TclError al limpiar el área de texto.")
+            return
+        self.text_render_pending = True
+        position = 0
+
+        def insert_batch():
+            nonlocal position
+            if generation != self._render_generation: return # Sustituida por otra inserción o limpieza
+            try:
+                if not widget.winfo_exists(): return
+                previous_state = widget.cget("state")
+                widget.config(state=tk.NORMAL)
+                deadline = time.perf_counter() + config.TEXT_RENDER_BATCH_MS / 1000.0
+                while position < len(pieces):
+                    text, tags, mark = pieces[position]
+                    if mark:
+                        widget.mark_set(mark, "end-1c")
+                        widget.mark_gravity(mark, tk.LEFT) # El texto insertado en la marca queda a su derecha
+                        self._segment_marks.append(mark)
+                    widget.insert(tk.END, text, tags)
+                    position += 1
+                    if position % 32 == 0 and time.perf_counter() >= deadline: break
+                widget.config(state=previous_state)
+            except tk.TclError:
+                print("Error TclError al insertar texto en el área de texto.")
+                self.text_render_pending = False
+                return
+            if position < len(pieces):
+                self.ventana.after(1, insert_batch)
+                return
+            self.text_render_pending = False
+            if on_complete: on_complete()
+            self._update_ui_state()
+
+        insert_batch()
+        try: widget.see("1.0")
+        except tk.TclError: pass
+
+    def _on_progressive_draft(self, result: dict, first_text_sec: float):
+        """Callback: el borrador rápido está listo, se muestra de inmediato."""
+        if not self.progressive_active: return
+        print(f"Callback: Borrador listo en {first_text_sec:.2f} s ({len(result.get('segments', []))} segmentos).")
+        self.transcription_result = result
+
+        def on_draft_inserted():
+            self.draft_ready = True
+            utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_YELLOW)
+            self.set_status(f"Borrador listo en {first_text_sec:.1f} s. Refinando en segundo plano (puedes 'Depurar' ya)...")
+
+        self._insert_tagged_segments(result.get("segments", []), on_draft_inserted)
+
+    def _on_progressive_refine(self, replaced_ids: list[int], new_segments: list[dict]):
+        """
+        Callback: sustituye en el sitio los segmentos del borrador de una ventana por los refinados.
+        Si el usuario ha editado esa parte del texto (modo Depurar), se conservan sus ediciones.
+        """
+        if not self.progressive_active: return
+        if not self.draft_ready: # El borrador aún se está insertando por lotes: aplicarlo después
+            self.pending_refines += 1
+            self.ventana.after(50, self._apply_deferred_refine, self.progressive_job, replaced_ids, new_segments)
+            return
+        self._apply_refine(replaced_ids, new_segments)
+
+    def _apply_deferred_refine(self, job: int, replaced_ids: list[int], new_segments: list[dict]):
+        """
+        Aplica un refinado que llegó antes de que el borrador estuviera en pantalla.
+        No depende de progressive_active (la finalización puede haberlo borrado ya), solo de que la transcripción sea la misma.
+        """
+        if job != self.progressive_job: return # Transcripción reiniciada o cancelada: refinado obsoleto
+        if not self.draft_ready:
+            self.ventana.after(50, self._apply_deferred_refine, job, replaced_ids, new_segments)
+            return
+        self.pending_refines -= 1
+        self._apply_refine(replaced_ids, new_segments)
+
+    def _apply_refine(self, replaced_ids: list[int], new_segments: list[dict]):
+        """Sustituye en el área de texto y en transcription_result los segmentos refinados de una ventana."""
+        widget = self.area_texto_whisper
+        old_tags = [f"seg_{segment_id}" for segment_id in replaced_ids]
+        try:
+            first_range = widget.tag_ranges(old_tags[0])
+            last_range = widget.tag_ranges(old_tags[-1])
+            expected_text = "".join(self._segment_tag_texts.get(tag, "") for tag in old_tags)
+            if not first_range or not last_range or widget.get(first_range[0], last_range[-1]) != expected_text:
+                print(f"Refinado: se conservan las ediciones del usuario en segmentos {replaced_ids[0]}-{replaced_ids[-1]}.")
+                return
+            previous_state = widget.cget("state")
+            widget.config(state=tk.NORMAL)
+            widget.mark_set("refine_insert", first_range[0])
+            widget.delete(first_range[0], last_range[-1])
+            for segment in new_segments:
+                tag = f"seg_{segment['id']}"
+                widget.insert("refine_insert", segment.get("text", ""), (tag,))
+                self._segment_tag_texts[tag] = segment.get("text", "")
+            widget.mark_unset("refine_insert")
+            for tag in old_tags:
+                widget.tag_delete(tag)
+                self._segment_tag_texts.pop(tag, None)
+            widget.config(state=previous_state)
+        except tk.TclError as e:
+            print(f"Error TclError al aplicar refinado: {e}")
+            return
+
+        # Mantener la lista de segmentos (usada para resaltar y exportar) sincronizada con el texto
+        segments = self.transcription_result.get("segments", []) if self.transcription_result else []
+        replaced = set(replaced_ids)
+        insert_at = next((i for i, segment in enumerate(segments) if segment.get("id") in replaced), len(segments))
+        kept = [segment for segment in segments if segment.get("id") not in replaced]
+        kept[insert_at:insert_at] = new_segments
+        self.transcription_result["segments"] = kept
+        self._remove_highlight() # Los índices de segmento han cambiado
+        if self.is_depurating:
+            self.waveform_view.set_segments(kept)
+
+    @staticmethod
+    def _result_status_suffix(result: dict | None) -> str:
+        """Texto con el idioma detectado y la revisión selectiva para la barra de estado (vacío si no hubo)."""
+        suffix = ""
+        if (result or {}).get("decoding_preset") and result["decoding_preset"] != config.DEFAULT_DECODING_PRESET:
+            suffix += f" Decodificación: {result['decoding_preset']}."
+        if (result or {}).get("speed_factor"):
+            suffix += f" Acelerado {time_compression.format_factor(result['speed_factor'])}."
+        routing = (result or {}).get("language_detection")
+        if routing and routing.get("detected_language") is not None:
+            suffix += f" Idioma: {routing['language']} (detección {routing['detect_sec']:.1f} s)."
+        recheck = (result or {}).get("recheck")
+        if recheck:
+            suffix += (f" Revisado con '{recheck['model']}': {recheck['redone_sec']:.0f} s de "
+                       f"{recheck['audio_sec']:.0f} s ({recheck['redone_ratio']:.0%}).")
+        return suffix
+
     def _on_whisper_transcription_complete(self, success: bool, result: dict | None):
         """Callback ejecutado cuando la transcripción de Whisper finaliza."""
+        # Esperar a que el texto termine de insertarse y a que se apliquen los refinados aplazados
+        if self.text_render_pending or (self.pending_refines and self.draft_ready):
+            self.ventana.after(50, self._on_whisper_transcription_complete, success, result)
+            return
         print(f"Callback: Transcripción Whisper completada (Éxito: {success})")
         self.whisper_transcription_complete = True
         self._stop_whisper_animation()
         utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_GREEN if success else config.STATUS_COLOR_RED)
+        if self.progressive_active and self.draft_ready:
+            # El texto en pantalla (con posibles ediciones) y sus segmentos ya están al día
+            self.progressive_active = False
+            timing = (result or {}).get("progressive", {})
+            if self.transcription_result is not None:
+                self.transcription_result["progressive"] = timing
+            if timing.get("total_sec") is not None:
+                self.set_status(f"Transcripción progresiva completada. Primer texto: {timing['first_text_sec']:.1f} s, "
+                                f"total: {timing['total_sec']:.1f} s.{self._result_status_suffix(result)}")
+            else:
+                self.set_status("Refinado interrumpido. Se conserva el borrador (y tus ediciones).")
+            self._journal_snapshot()
+            self._index_current_result()
+            self._update_ui_state()
+            return
+        self.progressive_active = False
+        self.progressive_job += 1 # El borrador no llegó a mostrarse: descartar los refinados aplazados
+        self.pending_refines = 0
         self.transcription_result = result # Guardar incluso si falla
 
         # Comprobar si se puede entrar en modo depuración ahora
         can_depurate_now = success and result and isinstance(result.get("segments"), list) and len(result["segments"]) > 0 and self.ruta_audio_wav and playback._mixer_initialized
         if can_depurate_now:
-            self.set_status("Transcripción completada. Puedes 'Depurar' o exportar.")
+            self._journal_snapshot()
+            self._index_current_result()
+            self.set_status(f"Transcripción completada. Puedes 'Depurar' o exportar.{self._result_status_suffix(result)}")
             # _update_ui_state habilitará el botón
         elif success:
-            self.set_status("Transcripción completada (sin info de segmentos para depurar).")
+            self.set_status(f"Transcripción completada (sin info de segmentos para depurar).{self._result_status_suffix(result)}")
+        elif (result or {}).get("cancelled"):
+            self.set_status(f"Transcripción detenida. Se muestran los {len(result['segments'])} segmentos ya transcritos.")
         else:
             self.set_status("Error durante la transcripción Whisper.")
         self._update_ui_state() # Actualizar estado de botones (incluyendo Depurar)
@@ -460,8 +912,11 @@ class AudioTranscriptorPro:
 
     def _clear_text_area(self):
         """Limpia el contenido del área de texto de Whisper."""
+        self._render_generation += 1 # Abandona cualquier inserción por lotes en curso
+        self.text_render_pending = False
         try:
             if self.area_texto_whisper and self.area_texto_whisper.winfo_exists():
+                self._unset_segment_marks()
                 self.area_texto_whisper.config(state=tk.NORMAL)
                 self.area_texto_whisper.delete("1.0", tk.END)
                 self.area_texto_whisper.config(state=tk.DISABLED)
@@ -471,6 +926,10 @@ class AudioTranscriptorPro:
         """Resetea el estado relacionado con una transcripción específica."""
         self.whisper_transcription_complete = False
         self.transcription_result = None
+        self.progressive_active = False
+        self.draft_ready = False
+        self.progressive_job += 1
+        self.pending_refines = 0
         self._clear_text_area()
         utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_GRAY)
         if self.is_depurating: self._toggle_depuration_mode(force_exit=True)
@@ -481,36 +940,47 @@ class AudioTranscriptorPro:
         try:
             is_transcribing = self.whisper_transcriber is not None and self.whisper_transcriber.is_running()
             is_busy_process = self.is_loading_model or is_transcribing
+            is_batch_transcribing = self.batch_pipeline is not None and self.batch_pipeline.is_transcribing()
 
-            # Combobox Modelo
-            model_combo_state = tk.NORMAL if WHISPER_AVAILABLE and not is_busy_process and not self.is_depurating else tk.DISABLED
+            # Combobox Modelo (la cola también usa el modelo cargado)
+            model_combo_state = tk.NORMAL if WHISPER_AVAILABLE and not is_busy_process and not is_batch_transcribing and not self.is_depurating else tk.DISABLED
             if self.model_combobox: self.model_combobox.config(state=model_combo_state)
+            if self.precision_combobox: self.precision_combobox.config(state=model_combo_state)
+            if self.speed_combobox: self.speed_combobox.config(state="readonly" if model_combo_state == tk.NORMAL else tk.DISABLED)
+            if self.preset_combobox: self.preset_combobox.config(state="readonly" if model_combo_state == tk.NORMAL else tk.DISABLED)
 
-            # Botón Seleccionar Audio
-            select_audio_state = tk.NORMAL if WHISPER_AVAILABLE and self.whisper_model_loaded and not is_busy_process and not self.is_depurating else tk.DISABLED
+            # Botón Seleccionar Audio (no espera al modelo: la conversión va en paralelo con la carga)
+            select_audio_state = tk.NORMAL if WHISPER_AVAILABLE and not is_transcribing and not self.is_depurating else tk.DISABLED
             self.boton_seleccionar.config(state=select_audio_state)
 
-            # Botón Transcribir
-            can_transcribe = self.ruta_audio_wav and self.whisper_model_loaded and not is_busy_process and not self.is_depurating
-            transcribe_state = tk.NORMAL if can_transcribe else tk.DISABLED
+            # Botón Transcribir (durante la transcripción, "Detener")
+            can_transcribe = self.ruta_audio_wav and self.whisper_model_loaded and not is_busy_process and not is_batch_transcribing and not self.is_depurating
+            transcribe_state = tk.NORMAL if can_transcribe or is_transcribing else tk.DISABLED
             self.boton_transcribir.config(state=transcribe_state)
-            self.boton_transcribir.config(text="Transcribir" if not is_transcribing else "Procesando...")
+            self.boton_transcribir.config(text="Transcribir" if not is_transcribing else "Detener")
 
             # Botón Depurar
             # Verificación más explícita de segments como lista no vacía
             has_valid_segments = self.transcription_result and isinstance(self.transcription_result.get("segments"), list) and len(self.transcription_result["segments"]) > 0
+            # Durante el refinado progresivo se puede depurar el borrador (las ediciones se respetan)
+            refining_draft = self.progressive_active and self.draft_ready
             can_enter_depurate = (
-                self.whisper_transcription_complete and
+                (self.whisper_transcription_complete or refining_draft) and
+                not self.text_render_pending and
                 has_valid_segments and
                 self.ruta_audio_wav and
                 playback._mixer_initialized and
-                not is_busy_process
+                (not is_busy_process or refining_draft)
             )
             if self.is_depurating:
                 self.boton_depurar.config(text="Salir Depurar", state=tk.NORMAL)
             else:
                 self.boton_depurar.config(text="Depurar", state=tk.NORMAL if can_enter_depurate else tk.DISABLED)
 
+            # Botón Re-transcribir selección (solo en Modo Depuración, con la transcripción terminada)
+            can_retranscribe = self.is_depurating and self.whisper_transcription_complete and not is_busy_process
+            self.boton_retranscribir.config(state=tk.NORMAL if can_retranscribe else tk.DISABLED)
+
             # Área de texto Whisper
             text_area_state = tk.NORMAL if self.is_depurating else tk.DISABLED
             if self.area_texto_whisper: self.area_texto_whisper.config(state=text_area_state)
@@ -523,12 +993,19 @@ class AudioTranscriptorPro:
                     self.frame_playback_controls.pack(pady=5, anchor='w', after=self.status_label) # Usar referencia estable
                 elif not should_be_visible and is_visible:
                     self.frame_playback_controls.pack_forget()
+            if self.waveform_view.winfo_exists():
+                should_be_visible = self.is_depurating and self.waveform_pyramid is not None
+                is_visible = self.waveform_view.winfo_ismapped()
+                if should_be_visible and not is_visible:
+                    self.waveform_view.pack(fill=tk.X, pady=(0, 5), after=self.frame_playback_controls)
+                elif not should_be_visible and is_visible:
+                    self.waveform_view.pack_forget()
 
             # Botones Copiar/Exportar
             whisper_results_text = ""
             if self.area_texto_whisper and self.area_texto_whisper.winfo_exists():
                  whisper_results_text = self.area_texto_whisper.get("1.0", tk.END).strip()
-            can_copy_export = whisper_results_text and not whisper_results_text.lower().startswith("error") and not is_busy_process and not self.is_depurating
+            can_copy_export = whisper_results_text and not whisper_results_text.lower().startswith("error") and not is_busy_process and not self.is_depurating and not self.text_render_pending
             results_state = tk.NORMAL if can_copy_export else tk.DISABLED
             if self.boton_copiar_whisper: self.boton_copiar_whisper.config(state=results_state)
             if self.boton_exportar_whisper: self.boton_exportar_whisper.config(state=results_state)
@@ -614,6 +1091,9 @@ class AudioTranscriptorPro:
                  self._show_error("Error Playback", f"No se pudo cargar {self.ruta_audio_wav.name}.")
                  self.is_depurating = False; self._update_ui_state(); return
 
+            self.playback_offset_sec = 0.0
+            self.waveform_view.set_segments(self.transcription_result["segments"])
+            self.waveform_view.set_cursor(0.0)
             self._update_ui_state() # Actualiza UI (botones, area texto editable, controles visibles)
             self.boton_play_pause.config(text="▶ Play")
             total_duration_str = self._format_time(self.audio_duration_sec)
@@ -623,6 +1103,9 @@ class AudioTranscriptorPro:
         else:
             # --- Salir ---
             print("Saliendo de modo depuración...")
+            self._journal_flush_edits()
+            if self.session_journal: self.session_journal.compact()
+            self._index_current_result() # Con las ediciones hechas al depurar
             self.is_depurating = False
             self._stop_playback_action()
             playback.unload_audio()
@@ -645,6 +1128,7 @@ class AudioTranscriptorPro:
                 else: self.boton_play_pause.config(text="▶ Play"); self._stop_highlight_update_timer() # Falló reanudar?
             else: # Empezar de 0
                 if playback.play_audio(start_seconds=0.0):
+                    self.playback_offset_sec = 0.0
                     self.is_paused = False; self.boton_play_pause.config(text="❚❚ Pause"); self._start_highlight_update_timer()
                 else: self._show_error("Playback Error", "No se pudo iniciar la reproducción.")
         else: # Pausar
@@ -662,12 +1146,25 @@ class AudioTranscriptorPro:
         self._stop_highlight_update_timer()
         self._remove_highlight()
         self.is_paused = False
+        self.playback_offset_sec = 0.0
+        if self.waveform_view.winfo_exists(): self.waveform_view.set_cursor(0.0)
         if self.boton_play_pause.winfo_exists(): self.boton_play_pause.config(text="▶ Play")
         total_duration_str = self._format_time(self.audio_duration_sec)
         try:
              if self.playback_time_label.winfo_exists(): self.playback_time_label.config(text=f"00:00 / {total_duration_str}")
         except tk.TclError: pass
 
+    def _seek_playback(self, position_sec: float):
+        """Clic en la forma de onda: reproduce desde esa posición."""
+        if not self.is_depurating: return
+        if playback.play_audio(start_seconds=position_sec):
+            self.playback_offset_sec = position_sec
+            self.is_paused = False
+            self.boton_play_pause.config(text="❚❚ Pause")
+            self.waveform_view.set_cursor(position_sec)
+            self._start_highlight_update_timer()
+        else: self._show_error("Playback Error", "No se pudo saltar a esa posición.")
+
     def _start_highlight_update_timer(self):
         """Inicia el temporizador periódico para actualizar highlight y tiempo."""
         if self.playback_update_timer_id:
@@ -702,7 +1199,12 @@ class AudioTranscriptorPro:
             return
 
         current_time_ms = playback.get_current_pos_ms()
-        current_time_sec = current_time_ms / 1000.0 if current_time_ms != -1 else 0
+        # get_pos() cuenta desde el último play(); se suma la posición de inicio (saltos desde la forma de onda)
+        current_time_sec = self.playback_offset_sec + current_time_ms / 1000.0 if current_time_ms != -1 else 0
+        if current_time_ms != -1:
+            try:
+                if self.waveform_view.winfo_exists(): self.waveform_view.set_cursor(current_time_sec)
+            except tk.TclError: pass
         current_time_str = self._format_time(current_time_sec)
         total_duration_str = self._format_time(self.audio_duration_sec)
         try:
@@ -720,11 +1222,7 @@ class AudioTranscriptorPro:
             if current_time_ms == -1: return
             segments = self.transcription_result.get("segments", []) if self.transcription_result else []
             if not segments: return
-            found_segment_index = -1
-            for i, segment in enumerate(segments):
-                start = segment.get('start'); end = segment.get('end')
-                if isinstance(start, (int, float)) and isinstance(end, (int, float)) and start <= current_time_sec < end:
-                    found_segment_index = i; break
+            found_segment_index = self._find_segment_at(segments, current_time_sec)
             if found_segment_index != self.current_highlighted_segment_index:
                 self._remove_highlight()
                 if found_segment_index != -1:
@@ -733,17 +1231,448 @@ class AudioTranscriptorPro:
                     if segment_text:
                         try:
                             if self.area_texto_whisper.winfo_exists():
-                                start_index = self.area_texto_whisper.search(segment_text, "1.0", tk.END, exact=True)
-                                if start_index:
-                                    end_index = f"{start_index}+{len(segment_text)}c"
-                                    self.area_texto_whisper.tag_add("highlight", start_index, end_index)
-                                    self.area_texto_whisper.see(start_index)
+                                text_range = self._segment_text_range(segments, found_segment_index)
+                                if text_range:
+                                    self.area_texto_whisper.tag_add("highlight", *text_range)
+                                    self.area_texto_whisper.see(text_range[0])
                                 else: self.current_highlighted_segment_index = -1 # Resetear si no se encuentra texto
                         except tk.TclError: pass
                         except Exception as e: print(f"Error al resaltar: {e}"); self.current_highlighted_segment_index = -1
                     else: self.current_highlighted_segment_index = -1 # Segmento sin texto
                 else: self.current_highlighted_segment_index = -1 # Ningún segmento en este tiempo
 
+    def _segment_store(self, segments: list[dict]) -> SegmentStore | None:
+        """Columnas (SegmentStore) de 'segments'; solo se reconstruye si cambia la lista. None sin numpy."""
+        cached_segments, store = self._segment_store_cache
+        if cached_segments is not segments or store is None or len(store) != len(segments):
+            try:
+                store = SegmentStore.from_segments(segments)
+            except ImportError:
+                store = None
+            self._segment_store_cache = (segments, store)
+        return store
+
+    def _find_segment_at(self, segments: list[dict], time_sec: float) -> int:
+        """Índice del segmento que contiene 'time_sec' (búsqueda binaria sobre las columnas), o -1."""
+        store = self._segment_store(segments)
+        if store is not None:
+            return store.find_at(time_sec)
+        return next((index for index, segment in enumerate(segments) if segment["start"] <= time_sec < segment["end"]), -1)
+
+    def _segment_text_range(self, segments: list[dict], index: int) -> tuple[str, str] | None:
+        """Rango (inicio, fin) del texto del segmento en el área de texto, por su tag o su marca."""
+        widget = self.area_texto_whisper
+        tag = f"seg_{segments[index].get('id')}"
+        if tag in self._segment_tag_texts: # Modo progresivo: cada segmento tiene su tag
+            ranges = widget.tag_ranges(tag)
+            return (str(ranges[0]), str(ranges[-1])) if ranges else None
+        if index < len(self._segment_marks):
+            end = self._segment_marks[index + 1] if index + 1 < len(self._segment_marks) else "end-1c"
+            return (self._segment_marks[index], end)
+        # Sin marcas (texto de otra procedencia): búsqueda del texto como último recurso
+        segment_text = segments[index].get('text', '').strip()
+        start_index = widget.search(segment_text, "1.0", tk.END, exact=True) if segment_text else ""
+        return (start_index, f"{start_index}+{len(segment_text)}c") if start_index else None
+
+    # --- Re-transcripción de un fragmento (Modo Depuración) ---
+
+    def _selected_span(self) -> tuple[float, float] | None:
+        """
+        Tramo a re-transcribir: el seleccionado en la forma de onda o, si no hay, el de los
+        segmentos que abarca el texto seleccionado. None si no hay selección.
+        """
+        if self.waveform_view.selection:
+            return self.waveform_view.selection
+        widget = self.area_texto_whisper
+        try:
+            sel_first, sel_last = widget.index("sel.first"), widget.index("sel.last")
+        except tk.TclError:
+            return None # Sin texto seleccionado
+        segments = self.transcription_result.get("segments", []) if self.transcription_result else []
+        covered = []
+        for index in range(len(segments)):
+            text_range = self._segment_text_range(segments, index)
+            if text_range and widget.compare(text_range[1], ">", sel_first) and widget.compare(text_range[0], "<", sel_last):
+                covered.append(index)
+        if not covered:
+            return None
+        return segments[covered[0]]["start"], segments[covered[-1]]["end"]
+
+    def _ask_span_options(self, start_sec: float, end_sec: float) -> tuple[str, str] | None:
+        """Diálogo modal: modelo y prompt para el fragmento. Devuelve (modelo, prompt) o None si se cancela."""
+        dialog = tk.Toplevel(self.ventana)
+        dialog.title("Re-transcribir fragmento")
+        dialog.configure(bg=config.BG_COLOR)
+        dialog.transient(self.ventana)
+        dialog.resizable(False, False)
+        tk.Label(dialog, text=f"Fragmento {self._format_time(start_sec)} - {self._format_time(end_sec)} ({end_sec - start_sec:.1f} s)",
+                 bg=config.BG_COLOR, font=self.instruction_font).pack(anchor='w', padx=10, pady=(10, 5))
+        tk.Label(dialog, text="Modelo:", bg=config.BG_COLOR, font=self.instruction_font).pack(anchor='w', padx=10)
+        model_var = tk.StringVar(value=self.selected_whisper_model or config.DEFAULT_WHISPER_MODEL)
+        ttk.Combobox(dialog, textvariable=model_var, values=config.WHISPER_MODELS, state="readonly", width=15).pack(anchor='w', padx=10, pady=(0, 5))
+        tk.Label(dialog, text="Prompt (opcional: nombres, vocabulario...):", bg=config.BG_COLOR, font=self.instruction_font).pack(anchor='w', padx=10)
+        prompt_var = tk.StringVar()
+        tk.Entry(dialog, textvariable=prompt_var, width=50).pack(anchor='w', padx=10, pady=(0, 10))
+        answer = {}
+
+        def accept():
+            answer["options"] = (model_var.get(), prompt_var.get().strip())
+            dialog.destroy()
+
+        buttons = tk.Frame(dialog, bg=config.BG_COLOR)
+        buttons.pack(pady=(0, 10))
+        tk.Button(buttons, text="Re-transcribir", command=accept, padx=10).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Cancelar", command=dialog.destroy, padx=10).pack(side=tk.LEFT, padx=5)
+        dialog.grab_set()
+        self.ventana.wait_window(dialog)
+        return answer.get("options")
+
+    def _retranscribe_selection_action(self):
+        """Manejador del botón 'Re-transcribir selección' (solo en Modo Depuración)."""
+        if not self.is_depurating or not self.whisper_transcriber: return
+        if self.whisper_transcriber.is_running():
+            self._show_error("Información", "Espera a que termine la transcripción en curso.")
+            return
+        span = self._selected_span()
+        if not span:
+            self._show_error("Re-transcribir", "Selecciona texto, o arrastra con el botón derecho sobre la forma de onda, para elegir el fragmento.")
+            return
+        options = self._ask_span_options(*span)
+        if not options: return
+        model_name, prompt = options
+        language = self.transcription_result.get("language") if self.transcription_result else None
+        print(f"Acción: Re-transcribir {span[0]:.2f}-{span[1]:.2f} s con '{model_name}'.")
+        utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_YELLOW)
+        self.whisper_transcriber.decoding_preset = self.preset_var.get()
+        self.whisper_transcriber.start_span(span[0], span[1], model_name=model_name, initial_prompt=prompt or None, language=language)
+        self._update_ui_state()
+
+    def _on_span_transcribed(self, start_sec: float, end_sec: float, new_segments: list[dict] | None, info: dict):
+        """
+        Callback: sustituye solo la región del texto de los segmentos que solapan [start_sec, end_sec)
+        por los segmentos nuevos. El resto del texto (y sus ediciones) no se toca.
+        """
+        utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_GREEN if new_segments is not None else config.STATUS_COLOR_RED)
+        if new_segments is None or not self.transcription_result:
+            self._update_ui_state()
+            return
+        widget = self.area_texto_whisper
+        segments = self.transcription_result.get("segments", [])
+        store = self._segment_store(segments)
+        if store is not None:
+            first, last = store.overlapping(start_sec, end_sec)
+        else:
+            first = next((i for i, segment in enumerate(segments) if segment["end"] > start_sec), len(segments))
+            last = max((i for i, segment in enumerate(segments) if segment["start"] < end_sec), default=-1)
+            last = max(last, first - 1) # Sin solape: inserción pura antes de 'first'
+        marks_mode = bool(self._segment_marks)
+        try:
+            if last >= first:
+                first_range = self._segment_text_range(segments, first)
+                last_range = self._segment_text_range(segments, last)
+                if not first_range or not last_range:
+                    self._show_error("Re-transcribir", "No se encontró el texto del fragmento (¿se borró al editar?).")
+                    return
+                region_start, region_end = widget.index(first_range[0]), widget.index(last_range[1])
+            else:
+                next_range = self._segment_text_range(segments, first) if first < len(segments) else None
+                region_start = region_end = widget.index(next_range[0] if next_range else "end-1c")
+            previous_state = widget.cget("state")
+            widget.config(state=tk.NORMAL)
+            widget.mark_set("span_insert", region_start)
+            widget.mark_gravity("span_insert", tk.RIGHT) # Avanza con el texto insertado
+            widget.delete(region_start, region_end)
+            new_marks = []
+            next_id = max((segment.get("id", -1) for segment in segments), default=-1) + 1
+            for segment in new_segments:
+                text = segment.get("text", "")
+                if marks_mode:
+                    mark = f"segmark_r{self._mark_counter}"
+                    self._mark_counter += 1
+                    widget.mark_set(mark, "span_insert")
+                    widget.mark_gravity(mark, tk.LEFT)
+                    new_marks.append(mark)
+                    widget.insert("span_insert", text)
+                else:
+                    segment["id"] = next_id
+                    next_id += 1
+                    tag = f"seg_{segment['id']}"
+                    widget.insert("span_insert", text, (tag,))
+                    self._segment_tag_texts[tag] = text
+            if marks_mode:
+                old_marks = self._segment_marks[first:last + 1]
+                if old_marks: widget.mark_unset(*old_marks)
+                if last + 1 < len(self._segment_marks):
+                    # La marca del segmento siguiente quedó delante del texto nuevo: se recoloca detrás
+                    widget.mark_set(self._segment_marks[last + 1], "span_insert")
+                self._segment_marks[first:last + 1] = new_marks
+            else:
+                for segment in segments[first:last + 1]:
+                    tag = f"seg_{segment.get('id')}"
+                    widget.tag_delete(tag)
+                    self._segment_tag_texts.pop(tag, None)
+            widget.mark_unset("span_insert")
+            widget.config(state=previous_state)
+        except tk.TclError as e:
+            print(f"Error TclError al sustituir el fragmento: {e}")
+            return
+
+        updated = segments[:first] + new_segments + segments[last + 1:]
+        if marks_mode:
+            for new_id, segment in enumerate(updated): segment["id"] = new_id
+        self.transcription_result["segments"] = updated
+        self.transcription_result["text"] = "".join(segment.get("text", "") for segment in updated)
+        self._remove_highlight()
+        self.waveform_view.set_segments(updated)
+        self.waveform_view.clear_selection()
+        self._journal_snapshot() # Los segmentos han cambiado: nueva instantánea
+        self._index_current_result()
+        self.set_status(f"Fragmento {self._format_time(start_sec)}-{self._format_time(end_sec)} re-transcrito con "
+                        f"'{info['model']}' en {info['elapsed_sec']:.1f} s ({len(new_segments)} segmentos).")
+        self._update_ui_state()
+
+    # --- Autoguardado de la Sesión ---
+
+    def _segment_offsets(self, segments: list[dict]) -> list[int] | None:
+        """Inicio (en caracteres desde el principio del texto) de cada segmento en el área de texto."""
+        widget = self.area_texto_whisper
+        offsets = []
+        position, previous_index = 0, "1.0"
+        for index in range(len(segments)):
+            text_range = self._segment_text_range(segments, index)
+            if not text_range: return None
+            start_index = widget.index(text_range[0])
+            counted = widget.count(previous_index, start_index, "chars") # Solo el tramo desde el segmento anterior
+            if isinstance(counted, tuple): counted = counted[0]
+            position += counted or 0
+            offsets.append(position)
+            previous_index = start_index
+        return offsets
+
+    def _journal_snapshot(self):
+        """Guarda el texto y los segmentos actuales como nueva instantánea del diario del audio."""
+        if not self.session_journal or not self.transcription_result: return
+        segments = self.transcription_result.get("segments") or []
+        try:
+            offsets = self._segment_offsets(segments)
+            text = self.area_texto_whisper.get("1.0", "end-1c")
+        except tk.TclError:
+            return
+        if offsets is None:
+            print("Autoguardado: no se localizaron todos los segmentos en el texto; no se guarda la instantánea.")
+            return
+        self.session_journal.snapshot(text, segments, offsets, {"language": self.transcription_result.get("language"),
+                                                                "model": self.selected_whisper_model})
+
+    def _on_text_modified(self, event=None):
+        """<<Modified>> del área de texto: programa la anotación de la ráfaga de ediciones."""
+        widget = self.area_texto_whisper
+        try:
+            if not widget.edit_modified(): return # El propio reseteo del indicador también genera el evento
+            widget.edit_modified(False)
+        except tk.TclError: return
+        if not self.is_depurating or self.progressive_active or self.text_render_pending: return
+        if not self.session_journal or not self.session_journal.active: return
+        if self._journal_after_id: self.ventana.after_cancel(self._journal_after_id)
+        self._journal_after_id = self.ventana.after(config.SESSION_JOURNAL_DEBOUNCE_MS, self._journal_flush_edits)
+
+    def _journal_flush_edits(self):
+        """Anota en el diario las ediciones pendientes (una sustitución mínima)."""
+        if self._journal_after_id:
+            try: self.ventana.after_cancel(self._journal_after_id)
+            except tk.TclError: pass
+            self._journal_after_id = None
+        if not self.session_journal or not self.session_journal.active: return
+        try:
+            text = self.area_texto_whisper.get("1.0", "end-1c")
+        except tk.TclError:
+            return
+        self.session_journal.record_text(text)
+
+    def _close_session_journal(self):
+        """Anota lo pendiente y compacta el diario del audio actual antes de cambiar de audio o salir."""
+        if not self.session_journal: return
+        self._journal_flush_edits() # Siempre: puede quedar una ráfaga dentro del debounce aunque ya no se esté en Depurar
+        self.session_journal.compact()
+        self.session_journal = None
+
+    def _on_session_journal_ready(self, audio_path: pathlib.Path, journal: SessionJournal | None, session: dict | None):
+        """Callback: diario del audio leído. Si hay una sesión guardada, ofrece restaurarla."""
+        if audio_path != self.ruta_audio_original:
+            return # El usuario ya eligió otro archivo
+        self.session_journal = journal
+        if self._pending_jump is not None:
+            self._restore_for_search_jump(session)
+            return
+        if journal is None or not session:
+            return
+        if self.whisper_transcription_complete or (self.whisper_transcriber and self.whisper_transcriber.is_running()):
+            journal.deactivate() # Ya hay un resultado nuevo en marcha; su instantánea sustituirá a la guardada
+            return
+        self.scheduler.cancel("auto_transcribe") # No transcribir mientras se decide (el diálogo no bloquea la cola)
+        saved_at = time.strftime("%d/%m/%Y %H:%M", time.localtime(session["saved_at"])) if session.get("saved_at") else "?"
+        restore = messagebox.askyesno(
+            "Sesión guardada",
+            f"Hay una sesión guardada de {audio_path.name} ({len(session['segments'])} segmentos, "
+            f"{session['ops']} ediciones, {saved_at}).\n\n¿Restaurarla en lugar de transcribir de nuevo?")
+        if not restore:
+            journal.deactivate()
+            self.scheduler.when_ready("auto_transcribe", ("model", "audio"), self._on_model_and_audio_ready)
+            return
+        self._restore_session(session)
+
+    def _restore_session(self, session: dict, on_complete=None):
+        """Muestra el texto guardado (con sus ediciones) y recoloca las marcas de cada segmento."""
+        text, offsets = session["text"], session["offsets"]
+        self.transcription_result = {"text": text, "segments": session["segments"], "language": session["meta"].get("language")}
+        pieces = [(text[:offsets[0]], (), None)] if offsets and offsets[0] > 0 else []
+        for index, start in enumerate(offsets):
+            end = offsets[index + 1] if index + 1 < len(offsets) else len(text)
+            pieces.append((text[start:end], (), f"segmark_{index}"))
+        if not offsets:
+            pieces.append((text, (), None))
+
+        def on_restored():
+            self.whisper_transcription_complete = True
+            utils.draw_status_circle(self.whisper_status_canvas_circle, config.STATUS_COLOR_GREEN)
+            self.set_status(f"Sesión restaurada ({len(offsets)} segmentos, {session['ops']} ediciones, "
+                            f"leída en {session['load_ms']:.0f} ms). Puedes 'Depurar' o exportar.")
+            if self.session_journal and not self.session_journal.active:
+                self._journal_snapshot() # Restaurada desde el índice: pasa a ser la base del diario
+            if on_complete: on_complete()
+
+        print(f"Restaurando sesión guardada ({len(text)} caracteres, {session['ops']} ediciones, {session['load_ms']:.1f} ms).")
+        self._render_text_pieces(pieces, on_restored)
+        self._update_ui_state()
+
+    # --- Índice y Búsqueda de Transcripciones ---
+
+    def _displayed_segments(self) -> list[dict]:
+        """
+        Copia de los segmentos del resultado actual con el texto tal como está en pantalla
+        (con las ediciones de Depurar). Puede lanzar tk.TclError.
+        """
+        segments = (self.transcription_result.get("segments") or []) if self.transcription_result else []
+        displayed = []
+        for index, segment in enumerate(segments):
+            text_range = self._segment_text_range(segments, index)
+            text = self.area_texto_whisper.get(*text_range) if text_range else segment.get("text", "")
+            displayed.append(dict(segment, text=text))
+        return displayed
+
+    def _index_current_result(self):
+        """Indexa (en segundo plano) el resultado actual, con el texto tal como está en pantalla."""
+        if not self.ruta_audio_original or not self.transcription_result: return
+        try:
+            indexed_segments = [{"start": segment.get("start", 0.0), "end": segment.get("end", 0.0), "text": segment["text"]}
+                                for segment in self._displayed_segments()]
+        except tk.TclError:
+            return
+        result = {"segments": indexed_segments, "language": self.transcription_result.get("language")}
+        model_name = (self.transcription_result.get("language_detection") or {}).get("model_name") or self.selected_whisper_model
+        threading.Thread(target=transcript_index.index_result, args=(self.ruta_audio_original, result, model_name), daemon=True).start()
+
+    def _buscar_action(self):
+        """Manejador del botón 'Buscar en Transcripciones': busca en todos los resultados indexados."""
+        index = transcript_index.get_index()
+        if index is None:
+            self._show_error("Búsqueda", "No se pudo abrir el índice de transcripciones.")
+            return
+        dialog = tk.Toplevel(self.ventana)
+        dialog.title("Buscar en transcripciones")
+        dialog.configure(bg=config.BG_COLOR)
+        dialog.transient(self.ventana)
+        search_frame = tk.Frame(dialog, bg=config.BG_COLOR)
+        search_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        query_var = tk.StringVar()
+        query_entry = tk.Entry(search_frame, textvariable=query_var, width=60)
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        results_frame = tk.Frame(dialog, bg=config.BG_COLOR)
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        scrollbar = tk.Scrollbar(results_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        results_list = tk.Listbox(results_frame, width=100, height=15, font=self.instruction_font, yscrollcommand=scrollbar.set)
+        results_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=results_list.yview)
+        info_label = tk.Label(dialog, text="Escribe y pulsa Intro. Doble clic en un resultado para abrirlo en Depurar.",
+                              bg=config.BG_COLOR, font=self.instruction_font, anchor='w')
+        info_label.pack(fill=tk.X, padx=10, pady=(5, 10))
+        hits = []
+
+        def run_search(event=None):
+            start_time = time.perf_counter()
+            hits[:] = index.search(query_var.get())
+            elapsed_ms = 1000.0 * (time.perf_counter() - start_time)
+            results_list.delete(0, tk.END)
+            for hit in hits:
+                results_list.insert(tk.END, f"{pathlib.Path(hit['path']).name}  [{self._format_time(hit['start'])}]  {hit['snippet']}")
+            info_label.config(text=f"{len(hits)} resultados en {elapsed_ms:.1f} ms. Doble clic para abrir en Depurar.")
+
+        def open_hit(event=None):
+            selection = results_list.curselection()
+            if not selection: return
+            hit = hits[selection[0]]
+            dialog.destroy()
+            self._open_search_hit(hit)
+
+        tk.Button(search_frame, text="Buscar", command=run_search, padx=10).pack(side=tk.LEFT, padx=(5, 0))
+        query_entry.bind("<Return>", run_search)
+        results_list.bind("<Double-Button-1>", open_hit)
+        results_list.bind("<Return>", open_hit)
+        query_entry.focus_set()
+
+    def _open_search_hit(self, hit: dict):
+        """Abre el audio de un resultado de búsqueda en Depurar, situado en el segmento encontrado."""
+        audio_path = pathlib.Path(hit["path"])
+        if not audio_path.is_file():
+            self._show_error("Búsqueda", f"El archivo {audio_path} ya no existe.")
+            return
+        if self.whisper_transcriber and self.whisper_transcriber.is_running():
+            self._show_error("Información", "Espera a que termine la transcripción en curso.")
+            return
+        print(f"Acción: Abrir resultado de búsqueda {audio_path.name} en {hit['start']:.1f} s.")
+        already_loaded = (self.ruta_audio_original is not None and self.ruta_audio_original.resolve() == audio_path
+                          and self.ruta_audio_wav and self.whisper_transcription_complete and not self.text_render_pending)
+        if already_loaded:
+            self._jump_to_time(hit["start"])
+            return
+        if self.is_depurating: self._toggle_depuration_mode(force_exit=True)
+        self._load_audio_file(audio_path)
+        self._pending_jump = hit # Se completa en _on_session_journal_ready y al estar listo el audio
+
+    def _restore_for_search_jump(self, session: dict | None):
+        """Muestra el texto del audio buscado (la sesión guardada si existe, si no el índice) sin transcribir."""
+        self.scheduler.cancel("auto_transcribe")
+        if not session:
+            start_time = time.perf_counter()
+            index = transcript_index.get_index()
+            indexed = index.file_segments(self.ruta_audio_original) if index else None
+            if not indexed or not indexed["segments"]:
+                self._pending_jump = None
+                self.set_status("El audio ya no está en el índice. Transcríbelo de nuevo.")
+                self.scheduler.when_ready("auto_transcribe", ("model", "audio"), self._on_model_and_audio_ready)
+                return
+            offsets, position = [], 0
+            for segment in indexed["segments"]:
+                offsets.append(position)
+                position += len(segment["text"])
+            session = {"text": indexed["text"], "segments": indexed["segments"], "offsets": offsets,
+                       "meta": {"language": indexed["language"]}, "ops": 0,
+                       "load_ms": 1000.0 * (time.perf_counter() - start_time)}
+        self._restore_session(session, on_complete=lambda: self.scheduler.when_ready("search_jump", ("audio",), self._complete_search_jump))
+
+    def _complete_search_jump(self):
+        """Planificador: texto restaurado y audio convertido. Entra en Depurar en el segmento buscado."""
+        hit, self._pending_jump = self._pending_jump, None
+        if hit is None: return
+        self._jump_to_time(hit["start"])
+
+    def _jump_to_time(self, position_sec: float):
+        if not self.is_depurating:
+            self._toggle_depuration_mode()
+            if not self.is_depurating: return
+        self._seek_playback(position_sec) # El temporizador de resaltado marca el segmento y lo hace visible
+
     # --- Gestión de Cierre y Limpieza ---
     _stop_event_global = threading.Event()
 
@@ -756,28 +1685,34 @@ class AudioTranscriptorPro:
              self.is_depurating = False
          else: playback.stop_audio()
          self._stop_whisper_animation(); self._stop_highlight_update_timer()
+         if self.whisper_transcriber and self.whisper_transcriber.is_running(): self.whisper_transcriber.stop()
          global _model_load_thread, _model_load_stop_event
          if _model_load_thread and _model_load_thread.is_alive():
              print("INFO: Intentando cancelar carga de modelo..."); _model_load_stop_event.set()
          if clear_audio:
              self.ruta_audio_original = None; self.ruta_audio_wav = None
+             self.audio_generation += 1 # Una conversión en curso ya no corresponde a nada
              audio_handler.cleanup_temp_wav()
 
     def _on_closing(self):
         """Manejador para el evento de cierre de la ventana principal."""
         print("Cerrando aplicación...")
-        is_busy = self.is_loading_model or (self.whisper_transcriber and self.whisper_transcriber.is_running()) or self.is_depurating
+        batch_active = self.batch_pipeline is not None and self.batch_pipeline.is_active()
+        is_busy = self.is_loading_model or (self.whisper_transcriber and self.whisper_transcriber.is_running()) or self.is_depurating or batch_active
         user_wants_to_exit = True
         if is_busy:
              prompt_message = "¿Estás seguro de que quieres salir?"
              if self.is_depurating: prompt_message = "Estás en modo Depuración. Cambios no exportados se perderán.\n" + prompt_message
              elif self.is_loading_model: prompt_message = "Se está cargando un modelo.\n" + prompt_message
-             elif self.whisper_transcriber and self.whisper_transcriber.is_running(): prompt_message = "Hay una transcripción en curso (no se puede detener).\n" + prompt_message
+             elif self.whisper_transcriber and self.whisper_transcriber.is_running(): prompt_message = "Hay una transcripción en curso (se detendrá).\n" + prompt_message
+             elif batch_active: prompt_message = "La cola de archivos tiene trabajo pendiente (se detendrá).\n" + prompt_message
              user_wants_to_exit = messagebox.askokcancel("Salir", prompt_message)
 
         if user_wants_to_exit:
              self.set_status("Cerrando, intentando detener procesos...")
+             self._journal_flush_edits() # Antes de salir de Depurar y de destruir el área de texto
              self._stop_all_processes(clear_audio=True)
+             if self.batch_pipeline: self.batch_pipeline.stop()
              print("Esperando finalización de hilos...")
              global _model_load_thread
              if _model_load_thread and _model_load_thread.is_alive(): _model_load_thread.join(timeout=2.0)
@@ -788,6 +1723,15 @@ class AudioTranscriptorPro:
     def cleanup_on_exit(self):
          """Limpieza final llamada desde main.py después de cerrar la ventana."""
          print("Ejecutando limpieza final...")
+         self._close_session_journal()
+         self.ui_events.stop()
+         queue_stats = self.ui_events.stats()
+         print(f"Cola de eventos de la interfaz: {queue_stats['dispatched']} entregados, {queue_stats['coalesced']} fusionados, "
+               f"profundidad máx. {queue_stats['max_depth']}, latencia media {queue_stats['avg_latency_ms']:.1f} ms "
+               f"(máx. {queue_stats['max_latency_ms']:.1f} ms).")
          playback.quit_playback()
+         if self.batch_pipeline: self.batch_pipeline.shutdown()
+         metrics.stop_exporters(self.metrics_exporters)
+         whisper_transcriber.shutdown_worker()
          audio_handler.cleanup_temp_wav()
          print("Limpieza final completada.")
\ No newline at end of file
@@ -0,0 +1,437 @@
+# gui_benchmark.py
+"""
+Benchmark de latencia de la interfaz (AudioTranscriptorPro) sin pantalla ni modelo.
+
+Arranca la clase real de la GUI (en un display virtual Xvfb si no hay DISPLAY) con dos
+sustitutos: un transcriptor simulado que emite ráfagas de mensajes de estado y un
+resultado (o borrador + refinados) con miles de segmentos realistas, y una reproducción
+simulada cuya posición avanza sola para que el resaltado de Depurar trabaje como con
+audio real. Mientras tanto mide:
+  - el retraso del bucle de eventos de Tk (una sonda con after() cada pocos ms: lo que
+    llega tarde es tiempo en que la ventana no respondía), en percentiles por fase;
+  - el coste de cada callback de la GUI (actualizar texto, estado, resaltado...);
+  - las métricas de la cola de eventos de los hilos (ui_events).
+
+Uso:
+    python gui_benchmark.py --segments 20000
+    python gui_benchmark.py --segments 20000 --progressive --playback-sec 20 --json resultados.json
+"""
+
+import argparse
+import collections
+import functools
+import json
+import os
+import pathlib
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import types
+
+import config
+
+# Callbacks de la GUI cuyo coste se mide (métodos de AudioTranscriptorPro)
+TIMED_CALLBACKS = (
+    "_update_texto_whisper", "_render_text_pieces", "set_status", "_on_whisper_transcription_complete",
+    "_on_progressive_draft", "_on_progressive_refine", "_update_playback_highlight", "_update_ui_state",
+    "_toggle_depuration_mode",
+)
+
+_WORDS = ("el", "la", "de", "que", "en", "un", "una", "reunión", "proyecto", "cliente", "factura", "semana", "equipo",
+          "presupuesto", "entonces", "vale", "mañana", "revisar", "enviar", "correo", "datos", "informe", "pues", "bueno")
+
+
+def synthetic_segments(count: int, seed: int = 0) -> list[dict]:
+    """Segmentos con la forma de los de Whisper (ya reducidos): 1.5-6 s y 4-30 palabras cada uno."""
+    rng = random.Random(seed)
+    segments = []
+    start = 0.0
+    for index in range(count):
+        duration = rng.uniform(1.5, 6.0)
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 30)))
+        segments.append({"id": index, "start": start, "end": start + duration, "text": f" {words.capitalize()}.",
+                         "avg_logprob": rng.uniform(-1.2, -0.1), "compression_ratio": rng.uniform(1.0, 2.6),
+                         "no_speech_prob": rng.uniform(0.0, 0.5)})
+        start += duration + rng.uniform(0.0, 0.4)
+    return segments
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Percentil por rango más cercano (0.0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+# --- Sustitutos del transcriptor y de la reproducción ---
+
+class SimulatedTranscriber:
+    """
+    Misma interfaz que whisper_transcriber.WhisperTranscriber, sin modelo: desde un hilo
+    emite una ráfaga de estados y después el resultado completo (o, en modo progresivo,
+    el borrador y un refinado por ventana), con los ritmos de una transcripción real.
+    """
+
+    def __init__(self, update_callback, status_callback, completion_callback, error_callback, segment_callback=None,
+                 draft_callback=None, refine_callback=None, span_callback=None, segments: list[dict] | None = None,
+                 status_burst: int = 500, refine_window_sec: float | None = None, refine_interval_sec: float = 0.05):
+        self.update_callback = update_callback
+        self.status_callback = status_callback
+        self.completion_callback = completion_callback
+        self.error_callback = error_callback
+        self.segment_callback = segment_callback
+        self.draft_callback = draft_callback
+        self.refine_callback = refine_callback
+        self.span_callback = span_callback
+        self.segments = segments or []
+        self.status_burst = status_burst
+        self.refine_window_sec = refine_window_sec or config.PROGRESSIVE_WINDOW_SEC
+        self.refine_interval_sec = refine_interval_sec
+        self.audio_path = None
+        self.live_export_paths = []
+        self.detect_language = False
+        self.recheck_low_confidence = False
+        self.speed_factor = 1.0
+        self._is_running = False
+        self._thread = None
+
+    def load_model(self, model_name: str, progress_callback, model_completion_callback, precision=None, engine=None):
+        progress_callback(f"Modelo '{model_name}' simulado.", 100)
+        model_completion_callback(True, model_name)
+
+    def set_audio_file(self, audio_path):
+        self.audio_path = audio_path
+
+    def set_live_export_paths(self, paths):
+        self.live_export_paths = list(paths)
+
+    def is_running(self) -> bool:
+        return self._is_running
+
+    def start(self, progressive: bool = False):
+        self._is_running = True
+        self._thread = threading.Thread(target=self._run, args=(progressive,), daemon=True)
+        self._thread.start()
+
+    def start_span(self, start_sec, end_sec, model_name=None, initial_prompt=None, language=None):
+        self._is_running = False
+        if self.span_callback:
+            self.span_callback(start_sec, end_sec, [], {"model": model_name, "audio_sec": end_sec - start_sec, "elapsed_sec": 0.0})
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _result(self, segments: list[dict]) -> dict:
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments, "language": config.TARGET_LANGUAGE}
+
+    def _run(self, progressive: bool):
+        start_time = time.perf_counter()
+        for index in range(self.status_burst): # Ráfaga de progreso (como la carga de un modelo o un motor verboso)
+            self.status_callback(f"Transcribiendo (simulado)... {100 * (index + 1) // self.status_burst}%")
+            if index % 50 == 0:
+                time.sleep(0.001)
+        if not progressive:
+            result = self._result([dict(segment) for segment in self.segments])
+            self._is_running = False
+            self.update_callback(result)
+            self.completion_callback(True, result)
+            return
+        draft = [dict(segment) for segment in self.segments]
+        self.draft_callback(self._result(draft), time.perf_counter() - start_time)
+        final_segments = []
+        next_id = len(draft)
+        window = []
+        for segment in draft + [None]:
+            if segment is not None and (not window or segment["end"] - window[0]["start"] <= self.refine_window_sec):
+                window.append(segment)
+                continue
+            if window: # Refinado de la ventana: mismo texto con otro id (el ritmo lo marca refine_interval_sec)
+                time.sleep(self.refine_interval_sec)
+                refined = [dict(item, id=next_id + offset) for offset, item in enumerate(window)]
+                next_id += len(refined)
+                final_segments.extend(refined)
+                self.refine_callback([item["id"] for item in window], refined)
+            window = [segment] if segment is not None else []
+        result = self._result(final_segments)
+        result["progressive"] = {"draft_model": config.PROGRESSIVE_DRAFT_MODEL, "first_text_sec": 0.0,
+                                 "total_sec": time.perf_counter() - start_time}
+        self._is_running = False
+        self.completion_callback(True, result)
+
+
+def simulated_playback_module(speed: float = 1.0) -> types.ModuleType:
+    """
+    Módulo con la interfaz de playback.py cuya posición avanza con el reloj ('speed' veces
+    más rápido que el tiempo real), para ejercitar el resaltado sin pygame ni tarjeta de sonido.
+    """
+    module = types.ModuleType("playback")
+    # Como pygame, la posición cuenta desde la última llamada a play (la GUI le suma el punto de inicio)
+    state = {"loaded": False, "playing": False, "paused_at": 0.0, "started": 0.0, "offset": 0.0}
+    module._is_initialized = True
+    module._mixer_initialized = True
+    module.duration_sec = None # Lo fija el benchmark: al llegar aquí la reproducción termina
+
+    def position_sec() -> float:
+        if state["playing"]:
+            return state["paused_at"] + (time.perf_counter() - state["started"]) * speed
+        return state["paused_at"]
+
+    def play_audio(start_seconds: float = 0.0):
+        state.update(playing=True, paused_at=0.0, started=time.perf_counter(), offset=start_seconds)
+        return state["loaded"]
+
+    def pause_audio():
+        state.update(paused_at=position_sec(), playing=False)
+
+    def unpause_audio():
+        state.update(playing=True, started=time.perf_counter())
+
+    def stop_audio():
+        state.update(playing=False, paused_at=0.0)
+
+    def is_playing() -> bool:
+        if state["playing"] and module.duration_sec is not None and state["offset"] + position_sec() >= module.duration_sec:
+            state["playing"] = False
+        return state["playing"]
+
+    def get_current_pos_ms() -> int:
+        return int(1000 * position_sec()) if state["loaded"] else -1
+
+    module.init_playback = lambda: True
+    module.load_audio_from_path = lambda wav_path: state.update(loaded=True) or True
+    module.load_audio_segment = lambda audio_segment: state.update(loaded=True) or True
+    module.unload_audio = lambda: state.update(loaded=False, playing=False, paused_at=0.0)
+    module.quit_playback = lambda: None
+    module.play_audio = play_audio
+    module.pause_audio = pause_audio
+    module.unpause_audio = unpause_audio
+    module.stop_audio = stop_audio
+    module.is_playing = is_playing
+    module.get_current_pos_ms = get_current_pos_ms
+    return module
+
+
+# --- Medición ---
+
+class EventLoopProbe:
+    """Programa un after() cada interval_ms y anota cuánto tarde se ejecuta (retraso del bucle de Tk) por fase."""
+
+    def __init__(self, root, interval_ms: int = 5):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.phase = "inicio"
+        self.lags_ms: dict[str, list[float]] = collections.defaultdict(list)
+        self._expected = None
+        self._after_id = None
+
+    def start(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000.0
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.lags_ms[self.phase].append(max(0.0, 1000.0 * (now - self._expected)))
+        self._expected = now + self.interval_ms / 1000.0
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+
+class CallbackTimer:
+    """Envuelve métodos de una clase para medir cuánto tarda cada llamada (en el hilo de Tk)."""
+
+    def __init__(self, probe: EventLoopProbe):
+        self.probe = probe
+        self.costs_ms: dict[tuple[str, str], list[float]] = collections.defaultdict(list)
+
+    def instrument(self, cls, names):
+        for name in names:
+            original = getattr(cls, name, None)
+            if original is None:
+                continue
+            setattr(cls, name, self._timed(name, original))
+
+    def _timed(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.costs_ms[(self.probe.phase, name)].append(1000.0 * (time.perf_counter() - start))
+        return wrapper
+
+
+def ensure_display():
+    """Devuelve un proceso Xvfb si hizo falta arrancarlo (Linux sin DISPLAY), o None si ya hay pantalla."""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        raise RuntimeError("No hay DISPLAY y Xvfb no está instalado (apt install xvfb).")
+    display = f":{random.randint(100, 900)}"
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5) # Margen para que el servidor acepte conexiones
+    if process.poll() is not None:
+        raise RuntimeError(f"Xvfb no pudo arrancar en {display}.")
+    os.environ["DISPLAY"] = display
+    return process
+
+
+# --- Escenario ---
+
+def run(segment_count: int, progressive: bool, status_burst: int, playback_sec: float, playback_speed: float,
+        probe_interval_ms: int, timeout_sec: float) -> dict:
+    """Ejecuta el escenario completo y devuelve las métricas."""
+    # Nada de escribir en la caché del usuario (índice, diarios) ni abrir diálogos modales
+    config.TRANSCRIPT_INDEX_ENABLED = False
+    config.SESSION_JOURNAL_ENABLED = False
+    fake_playback = simulated_playback_module(playback_speed)
+    sys.modules["playback"] = fake_playback # Antes de importar gui: la GUI usa el sustituto
+    import tkinter as tk
+    import gui
+
+    segments = synthetic_segments(segment_count)
+    audio_duration = segments[-1]["end"] if segments else 0.0
+    fake_playback.duration_sec = audio_duration
+    gui.WHISPER_AVAILABLE = True
+    gui.WhisperTranscriber = functools.partial(SimulatedTranscriber, segments=segments, status_burst=status_burst)
+    gui.AudioTranscriptorPro._show_error = lambda self, title, message: print(f"ERROR (simulado): {title} - {message}")
+
+    root = tk.Tk()
+    probe = EventLoopProbe(root, probe_interval_ms)
+    timer = CallbackTimer(probe)
+    timer.instrument(gui.AudioTranscriptorPro, TIMED_CALLBACKS)
+    app = gui.AudioTranscriptorPro(root)
+    app.ruta_audio_wav = pathlib.Path("simulado.wav")
+    app.audio_duration_sec = audio_duration
+    app.selected_whisper_model = config.WHISPER_MODELS[-1] # Distinto del del borrador: el modo progresivo se activa
+    app.whisper_model_loaded = True
+    app.progressive_var.set(progressive)
+    app._update_ui_state()
+
+    phase_times = {}
+    deadline = time.perf_counter() + timeout_sec
+
+    def enter_phase(name):
+        probe.phase = name
+        phase_times[name] = time.perf_counter()
+
+    def finish():
+        probe.stop()
+        root.quit()
+
+    def start_transcription():
+        enter_phase("transcripción")
+        app._transcribir_action()
+        root.after(50, wait_transcription)
+
+    def wait_transcription():
+        done = app.whisper_transcription_complete and not app.text_render_pending and not app.whisper_transcriber.is_running()
+        if time.perf_counter() > deadline:
+            print("ERROR: Tiempo agotado esperando a la transcripción simulada.")
+            finish()
+        elif done:
+            phase_times["transcripción_total"] = time.perf_counter() - phase_times["transcripción"]
+            start_playback()
+        else:
+            root.after(50, wait_transcription)
+
+    def start_playback():
+        enter_phase("depuración")
+        app._toggle_depuration_mode()
+        app._toggle_play_pause()
+        root.after(int(1000 * playback_sec), stop_playback)
+
+    def stop_playback():
+        app._stop_playback_action()
+        enter_phase("salida")
+        app._toggle_depuration_mode()
+        root.after(300, finish)
+
+    enter_phase("reposo")
+    probe.start()
+    root.after(1000, start_transcription)
+    root.mainloop()
+
+    queue_stats = app.ui_events.stats()
+    app.cleanup_on_exit()
+    root.destroy()
+
+    phases = {}
+    for phase, lags in probe.lags_ms.items():
+        phases[phase] = {"samples": len(lags), "p50_ms": percentile(lags, 0.50), "p95_ms": percentile(lags, 0.95),
+                         "p99_ms": percentile(lags, 0.99), "max_ms": max(lags, default=0.0)}
+    callbacks = []
+    for (phase, name), costs in sorted(timer.costs_ms.items(), key=lambda item: -sum(item[1])):
+        callbacks.append({"phase": phase, "callback": name, "calls": len(costs), "total_ms": sum(costs),
+                          "p50_ms": percentile(costs, 0.50), "p95_ms": percentile(costs, 0.95), "max_ms": max(costs)})
+    return {"segments": segment_count, "progressive": progressive, "status_burst": status_burst,
+            "transcription_to_idle_sec": phase_times.get("transcripción_total"), "phases": phases,
+            "callbacks": callbacks, "ui_events": queue_stats}
+
+def print_report(report: dict):
+    import benchmark # Solo para la tabla de texto
+    mode = "progresivo" if report["progressive"] else "normal"
+    print(f"\nSegmentos: {report['segments']} | Modo: {mode} | Ráfaga de estados: {report['status_burst']}")
+    if report["transcription_to_idle_sec"] is not None:
+        print(f"Desde 'Transcribir' hasta el texto completo en pantalla: {report['transcription_to_idle_sec']:.2f} s")
+    print("\nRetraso del bucle de eventos de Tk por fase:")
+    benchmark._print_table(["Fase", "Muestras", "p50", "p95", "p99", "Máx."],
+                           [[phase, stats["samples"], f"{stats['p50_ms']:.1f} ms", f"{stats['p95_ms']:.1f} ms",
+                             f"{stats['p99_ms']:.1f} ms", f"{stats['max_ms']:.1f} ms"]
+                            for phase, stats in report["phases"].items()])
+    print("\nCoste por callback (hilo de Tk):")
+    benchmark._print_table(["Fase", "Callback", "Llamadas", "Total", "p50", "p95", "Máx."],
+                           [[item["phase"], item["callback"], item["calls"], f"{item['total_ms']:.0f} ms",
+                             f"{item['p50_ms']:.2f} ms", f"{item['p95_ms']:.2f} ms", f"{item['max_ms']:.1f} ms"]
+                            for item in report["callbacks"]])
+    queue_stats = report["ui_events"]
+    print(f"\nCola de eventos: {queue_stats['posted']} publicados, {queue_stats['coalesced']} fusionados, "
+          f"profundidad máx. {queue_stats['max_depth']}, latencia media {queue_stats['avg_latency_ms']:.1f} ms "
+          f"(máx. {queue_stats['max_latency_ms']:.1f} ms).")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Latencia de la GUI con transcriptor y reproducción simulados.")
+    parser.add_argument("--segments", type=int, default=20000, help="Segmentos de la transcripción simulada.")
+    parser.add_argument("--progressive", action="store_true", help="Borrador + refinados por ventana en lugar de un único resultado.")
+    parser.add_argument("--status-burst", type=int, default=500, help="Mensajes de estado emitidos en ráfaga al empezar.")
+    parser.add_argument("--playback-sec", type=float, default=10.0, help="Segundos de reproducción simulada en Depurar.")
+    parser.add_argument("--playback-speed", type=float, default=20.0,
+                        help="Velocidad de la reproducción simulada (más rápida = más cambios de segmento resaltado).")
+    parser.add_argument("--probe-ms", type=int, default=5, help="Intervalo de la sonda del bucle de eventos.")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Tiempo máximo del escenario (s).")
+    parser.add_argument("--json", type=pathlib.Path, default=None, help="Guardar también las métricas en este archivo.")
+    args = parser.parse_args(argv)
+
+    try:
+        xvfb = ensure_display()
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        return 1
+    try:
+        report = run(args.segments, args.progressive, args.status_burst, args.playback_sec, args.playback_speed,
+                     args.probe_ms, args.timeout)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Métricas guardadas en {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# language_detection.py
+"""
+Detección del idioma de cada archivo antes de transcribir.
+
+Se analiza solo la primera ventana con voz (config.LANGUAGE_DETECTION_WINDOW_SEC) con un
+modelo pequeño, y el resultado se guarda en una caché en disco indexada por una huella
+del contenido del archivo: volver a transcribir el mismo audio no repite la detección.
+"""
+
+import json
+import os
+import pathlib
+import threading
+import time
+import audio_stream
+import config
+
+try:
+    import numpy as np # Dependencia de Whisper
+except ImportError:
+    np = None
+
+
+class LanguageCache:
+    """Caché persistente huella -> {"language", "probability"} en un JSON (escritura atómica)."""
+
+    def __init__(self, path: pathlib.Path, max_entries: int | None = None):
+        self.path = pathlib.Path(path)
+        self.max_entries = max_entries or config.LANGUAGE_CACHE_MAX_ENTRIES
+        self._entries: dict | None = None # Se lee del disco la primera vez que se usa
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            entries = self._load()
+            entries.pop(key, None)
+            entries[key] = value
+            while len(entries) > self.max_entries: # Se descartan las más antiguas (orden de inserción)
+                entries.pop(next(iter(entries)))
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Advertencia: No se pudo guardar la caché de idiomas: {e}")
+
+_cache = LanguageCache(config.LANGUAGE_CACHE_FILE)
+
+
+def first_speech_window(audio_path: pathlib.Path):
+    """
+    Devuelve la primera ventana de config.LANGUAGE_DETECTION_WINDOW_SEC que empieza con voz
+    (energía por encima de un umbral), buscando en los primeros LANGUAGE_DETECTION_SCAN_SEC.
+    Así los silencios o tonos iniciales no confunden la detección.
+    """
+    if np is None:
+        raise ImportError("numpy es necesario para la detección de idioma (se instala con openai-whisper).")
+    sample_rate = audio_stream.WHISPER_SAMPLE_RATE
+    window_samples = int(config.LANGUAGE_DETECTION_WINDOW_SEC * sample_rate)
+    samples = audio_stream.load_range(audio_path, 0.0, config.LANGUAGE_DETECTION_SCAN_SEC + config.LANGUAGE_DETECTION_WINDOW_SEC)
+    frame = sample_rate // 2 # Tramas de 0,5 s
+    frames = len(samples) // frame
+    if frames:
+        rms = np.sqrt(np.mean(samples[:frames * frame].reshape(frames, frame) ** 2, axis=1))
+        voiced = np.flatnonzero(rms >= config.LANGUAGE_DETECTION_SPEECH_RMS)
+        if len(voiced):
+            start = int(voiced[0]) * frame
+            return samples[start:start + window_samples]
+    return samples[:window_samples]
+
+def detect_file_language(audio_path: pathlib.Path, get_engine) -> dict:
+    """
+    Detecta el idioma del archivo. get_engine() devuelve el motor de detección y solo se
+    llama si el resultado no está en caché (así el modelo pequeño no se carga sin necesidad).
+    Devuelve {"language", "probability", "cached", "detect_sec"}.
+    """
+    start_time = time.time()
+    key = audio_stream.file_fingerprint(audio_path)
+    cached = _cache.get(key)
+    if cached:
+        return {"language": cached["language"], "probability": cached["probability"],
+                "cached": True, "detect_sec": time.time() - start_time}
+    engine = get_engine()
+    language, probability = engine.detect_language(first_speech_window(audio_path))
+    _cache.put(key, {"language": language, "probability": probability})
+    return {"language": language, "probability": probability, "cached": False, "detect_sec": time.time() - start_time}
@@ -6,13 +6,18 @@ import sys
 import os
 import config
 
+# Con argumentos se ejecutan los modos sin interfaz gráfica (ver cli.py)
+if __name__ == "__main__" and len(sys.argv) > 1:
+    import cli
+    sys.exit(cli.main(sys.argv[1:]))
+
 # Añadir directorio actual al path para asegurar importaciones locales
 # sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 try:
     # Comprobar si los módulos necesarios existen antes de importarlos puede ser útil
     # para dar mensajes más claros si falta alguno.
-    required_files = ['gui.py', 'config.py', 'utils.py', 'audio_handler.py', 'playback.py', 'whisper_transcriber.py']
+    required_files = ['gui.py', 'config.py', 'utils.py', 'audio_handler.py', 'playback.py', 'whisper_transcriber.py', 'transcription_engines.py']
     for fname in required_files:
         if not os.path.exists(fname):
             print(f"ERROR FATAL: Falta el archivo requerido '{fname}'. Asegúrate de que todos los archivos estén en el mismo directorio.")
@@ -0,0 +1,306 @@
+# metrics.py
+"""
+Métricas de funcionamiento para los modos desatendidos (cola, carpeta vigilada, WhatsApp).
+
+Un registro en memoria con contadores, medidores (gauges) e histogramas con etiquetas.
+Actualizarlo cuesta un lock y una suma sobre un dict, así que audio_handler,
+whisper_transcriber y las colas lo llaman sin preocuparse del coste. Los valores que
+ya existen en otra parte (profundidad de una cola, RSS del proceso, estadísticas de
+ui_events) no se copian: se registran como funciones que se leen al exportar.
+
+Exportación (desactivada por defecto, ver config.METRICS_PORT y config.METRICS_SNAPSHOT_FILE):
+  - MetricsServer: formato de texto de Prometheus en http://127.0.0.1:<puerto>/metrics
+    (y el mismo contenido en JSON en /metrics.json);
+  - SnapshotWriter: una línea JSON por instantánea cada config.METRICS_SNAPSHOT_INTERVAL_SEC.
+"""
+
+import bisect
+import http.server
+import json
+import pathlib
+import threading
+import time
+import config
+
+PREFIX = "audio_transcriptor_"
+
+# Límites superiores de los histogramas
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0) # Segundos de inferencia por segundo de audio
+CONVERSION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0) # Segundos de ffmpeg por archivo
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Registro de métricas thread-safe (un lock para todo: las actualizaciones son mínimas)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, dict] = {} # nombre -> {"type", "help", "buckets", "values": {etiquetas: valor}}
+        self._callbacks: dict[tuple, callable] = {} # (nombre, etiquetas) -> función que devuelve el valor o None
+
+    def _declare(self, name: str, kind: str, help_text: str, buckets=None):
+        with self._lock:
+            self._metrics.setdefault(name, {"type": kind, "help": help_text, "buckets": tuple(buckets or ()), "values": {}})
+
+    def counter(self, name: str, help_text: str):
+        self._declare(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str):
+        self._declare(name, "gauge", help_text)
+
+    def histogram(self, name: str, help_text: str, buckets):
+        self._declare(name, "histogram", help_text, buckets)
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            values = self._metrics[name]["values"]
+            values[key] = values.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._metrics[name]["values"][_label_key(labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            metric = self._metrics[name]
+            state = metric["values"].get(key)
+            if state is None:
+                state = metric["values"][key] = {"counts": [0] * (len(metric["buckets"]) + 1), "sum": 0.0, "count": 0}
+            state["counts"][bisect.bisect_left(metric["buckets"], value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def register_callback(self, name: str, function, **labels):
+        """Gauge calculado al exportar (sustituye a una función anterior con las mismas etiquetas)."""
+        with self._lock:
+            self._callbacks[(name, _label_key(labels))] = function
+
+    def unregister_callback(self, name: str, **labels):
+        with self._lock:
+            self._callbacks.pop((name, _label_key(labels)), None)
+
+    def _collect(self) -> dict:
+        """Copia de todas las métricas con los gauges calculados ya evaluados."""
+        with self._lock:
+            metrics = {name: dict(metric, values={key: (dict(value, counts=list(value["counts"])) if isinstance(value, dict) else value)
+                                                  for key, value in metric["values"].items()})
+                       for name, metric in self._metrics.items()}
+            callbacks = list(self._callbacks.items())
+        for (name, key), function in callbacks: # Fuera del lock: pueden tomar otros locks (colas, ui_events)
+            try:
+                value = function()
+            except Exception as e:
+                print(f"Advertencia: No se pudo leer la métrica {name}: {e}")
+                continue
+            if value is not None and name in metrics:
+                metrics[name]["values"][key] = float(value)
+        return metrics
+
+    def render_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+        lines = []
+        for name, metric in sorted(self._collect().items()):
+            full_name = PREFIX + name
+            lines.append(f"# HELP {full_name} {metric['help']}")
+            lines.append(f"# TYPE {full_name} {metric['type']}")
+            for key, value in sorted(metric["values"].items()):
+                if metric["type"] != "histogram":
+                    lines.append(f"{full_name}{_format_labels(key)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + (float("inf"),), value["counts"]):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{full_name}_sum{_format_labels(key)} {_format_value(value['sum'])}")
+                lines.append(f"{full_name}_count{_format_labels(key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Todas las métricas como dict serializable a JSON (los histogramas con cubetas acumuladas y media)."""
+        result = {"timestamp": time.time(), "metrics": {}}
+        for name, metric in sorted(self._collect().items()):
+            entries = []
+            for key, value in sorted(metric["values"].items()):
+                entry = {"labels": dict(key)}
+                if metric["type"] == "histogram":
+                    cumulative, buckets = 0, {}
+                    for bound, count in zip(metric["buckets"] + (float("inf"),), value["counts"]):
+                        cumulative += count
+                        buckets[_format_value(bound)] = cumulative
+                    entry.update(count=value["count"], sum=value["sum"],
+                                 mean=value["sum"] / value["count"] if value["count"] else None, buckets=buckets)
+                else:
+                    entry["value"] = value
+                entries.append(entry)
+            result["metrics"][name] = {"type": metric["type"], "help": metric["help"], "values": entries}
+        return result
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.gauge("queue_depth", "Elementos esperando en cada cola (watch, batch, whatsapp, ui_events).")
+REGISTRY.histogram("transcription_realtime_factor", "Segundos de inferencia por segundo de audio, por modelo.", RTF_BUCKETS)
+REGISTRY.counter("transcriptions_total", "Transcripciones terminadas por modelo y resultado (ok, cancelled, error).")
+REGISTRY.counter("transcribed_audio_seconds_total", "Segundos de audio transcritos por modelo.")
+REGISTRY.counter("model_cache_requests_total", "Consultas a las cachés de modelos e idioma por caché y resultado (hit, miss).")
+REGISTRY.histogram("conversion_seconds", "Duración de la decodificación/conversión de cada archivo con ffmpeg.", CONVERSION_BUCKETS)
+REGISTRY.counter("failures_total", "Fallos por etapa y tipo de excepción.")
+REGISTRY.gauge("process_resident_memory_bytes", "Memoria residente (RSS) del proceso.")
+REGISTRY.gauge("transcription_worker_restarts", "Reinicios del proceso de transcripción del modelo actual.")
+REGISTRY.gauge("ui_event_latency_ms", "Latencia de la cola de eventos de la interfaz (avg, max).")
+
+def _rss_bytes():
+    try:
+        import utils # Importación diferida: utils carga Tkinter y los modos sin interfaz no lo necesitan
+    except ImportError: # Python sin Tkinter (servidores)
+        return None
+    rss_mb = utils.get_process_rss_mb()
+    return rss_mb * 1024 * 1024 if rss_mb is not None else None
+
+REGISTRY.register_callback("process_resident_memory_bytes", _rss_bytes)
+
+
+# --- Atajos para el código instrumentado ---
+
+def inc(name: str, amount: float = 1.0, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+def observe(name: str, value: float, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+def register_callback(name: str, function, **labels):
+    REGISTRY.register_callback(name, function, **labels)
+
+def unregister_callback(name: str, **labels):
+    REGISTRY.unregister_callback(name, **labels)
+
+def record_failure(stage: str, error: BaseException):
+    """Cuenta un fallo de 'stage' (conversion, transcription, model_load...) por tipo de excepción."""
+    REGISTRY.inc("failures_total", stage=stage, type=type(error).__name__)
+
+def record_cache(cache: str, hit: bool):
+    REGISTRY.inc("model_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+def record_transcription(model_name: str, audio_sec: float | None, elapsed_sec: float, outcome: str = "ok"):
+    """Una transcripción terminada: resultado y, si se conoce la duración del audio, su RTF."""
+    REGISTRY.inc("transcriptions_total", model=model_name, outcome=outcome)
+    if outcome == "ok" and audio_sec:
+        REGISTRY.observe("transcription_realtime_factor", elapsed_sec / audio_sec, model=model_name)
+        REGISTRY.inc("transcribed_audio_seconds_total", audio_sec, model=model_name)
+
+
+# --- Exportación ---
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/metrics"):
+            body, content_type = self.registry.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # Sin una línea en consola por cada consulta de Prometheus
+        pass
+
+
+class MetricsServer:
+    """Servidor HTTP en un hilo que expone el registro (solo en localhost por defecto)."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self._server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1] # Puerto real (si se pidió el 0)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        print(f"Métricas en http://{self._server.server_address[0]}:{self.port}/metrics")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SnapshotWriter:
+    """Añade una instantánea JSON (una línea) al archivo cada 'interval_sec' y otra al detenerse."""
+
+    def __init__(self, path: pathlib.Path, interval_sec: float | None = None):
+        self.path = pathlib.Path(path)
+        self.interval_sec = interval_sec or config.METRICS_SNAPSHOT_INTERVAL_SEC
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        print(f"Instantáneas de métricas cada {self.interval_sec:g} s en {self.path}")
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval_sec):
+            self.write()
+
+    def write(self):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(REGISTRY.snapshot(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Advertencia: No se pudo escribir la instantánea de métricas en {self.path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self.write()
+
+
+def start_exporters(port: int | None = None, snapshot_path: pathlib.Path | None = None) -> list:
+    """
+    Arranca los exportadores indicados (None = los de config.py; sin ninguno configurado no
+    arranca nada). Devuelve la lista de exportadores para pasarla a stop_exporters().
+    """
+    port = port if port is not None else config.METRICS_PORT
+    snapshot_path = snapshot_path or config.METRICS_SNAPSHOT_FILE
+    exporters_started = []
+    if port is not None:
+        try:
+            server = MetricsServer(port)
+            server.start()
+            exporters_started.append(server)
+        except OSError as e:
+            print(f"Advertencia: No se pudo abrir el puerto de métricas {port}: {e}")
+    if snapshot_path:
+        writer = SnapshotWriter(snapshot_path)
+        writer.start()
+        exporters_started.append(writer)
+    return exporters_started
+
+def stop_exporters(exporters_started: list):
+    for exporter in exporters_started:
+        exporter.stop()
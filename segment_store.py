@@ -0,0 +1,110 @@
+# segment_store.py
+"""
+Representación compacta de los segmentos de una transcripción.
+
+Whisper devuelve cada segmento como un dict con listas de tokens, 'seek', 'temperature' y
+varios floats, todo como objetos de Python. slim_segment() deja solo los campos que usa la
+aplicación: es la forma en que se guardan los resultados (y lo que reduce su memoria).
+SegmentStore es un índice de solo lectura construido a partir de esos dicts: tiempos y
+métricas de confianza en columnas NumPy (y el texto en un único str con offsets), para que
+las búsquedas por tiempo o por confianza sean binarias o vectorizadas en lugar de recorrer
+dicts. Si la lista cambia se vuelve a construir.
+"""
+
+import sys
+import config
+
+try:
+    import numpy as np # Dependencia de Whisper
+except ImportError:
+    np = None
+
+# Campos de un segmento que usa la aplicación (el resto son datos internos del decodificador)
+SEGMENT_FIELDS = ("id", "start", "end", "text", "avg_logprob", "compression_ratio", "no_speech_prob")
+_CONFIDENCE_FIELDS = ("avg_logprob", "compression_ratio", "no_speech_prob")
+
+
+def slim_segment(segment: dict) -> dict:
+    """Copia del segmento solo con SEGMENT_FIELDS y tipos nativos (sin 'tokens', 'seek', 'temperature'...)."""
+    slim = {}
+    for key in SEGMENT_FIELDS:
+        value = segment.get(key)
+        if value is None: continue
+        slim[key] = value if key == "text" else int(value) if key == "id" else float(value)
+    return slim
+
+def slim_segments(segments: list[dict]) -> list[dict]:
+    return [slim_segment(segment) for segment in segments]
+
+
+class SegmentStore:
+    """Segmentos en columnas NumPy (tiempos y confianza) más un buffer de texto con offsets."""
+
+    __slots__ = ("ids", "starts", "ends", "avg_logprob", "compression_ratio", "no_speech_prob", "text", "offsets")
+
+    def __init__(self, ids, starts, ends, avg_logprob, compression_ratio, no_speech_prob, text: str, offsets):
+        self.ids = ids # int32
+        self.starts = starts # float64 (segundos)
+        self.ends = ends
+        self.avg_logprob = avg_logprob # float32, NaN si el motor no lo da
+        self.compression_ratio = compression_ratio
+        self.no_speech_prob = no_speech_prob
+        self.text = text # Texto completo: el de cada segmento es text[offsets[i]:offsets[i + 1]]
+        self.offsets = offsets # int64, len(segmentos) + 1
+
+    @classmethod
+    def from_segments(cls, segments: list[dict]) -> "SegmentStore":
+        """Construye el almacén a partir de segmentos con el formato de Whisper."""
+        if np is None:
+            raise ImportError("numpy es necesario para SegmentStore (se instala con openai-whisper).")
+        count = len(segments)
+
+        def column(key, dtype, missing):
+            return np.fromiter((missing if (value := segment.get(key)) is None else value for segment in segments),
+                               dtype=dtype, count=count)
+
+        texts = [segment.get("text", "") for segment in segments]
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(text) for text in texts), dtype=np.int64, count=count), out=offsets[1:])
+        ids = column("id", np.int32, -1)
+        if count and (ids < 0).any(): # Segmentos sin id: su posición
+            ids = np.arange(count, dtype=np.int32)
+        return cls(ids, column("start", np.float64, 0.0), column("end", np.float64, 0.0),
+                   *(column(key, np.float32, np.nan) for key in _CONFIDENCE_FIELDS), "".join(texts), offsets)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def find_at(self, time_sec: float) -> int:
+        """Índice del segmento que contiene 'time_sec' (búsqueda binaria), o -1."""
+        index = int(self.starts.searchsorted(time_sec, "right")) - 1 # El método evita el despacho de np.searchsorted
+        return index if index >= 0 and time_sec < self.ends.item(index) else -1
+
+    def find_many(self, times):
+        """find_at() vectorizado: índice (o -1) del segmento de cada instante de 'times'."""
+        times = np.asarray(times, dtype=np.float64)
+        indices = self.starts.searchsorted(times, "right") - 1
+        inside = (indices >= 0) & (times < self.ends[np.maximum(indices, 0)])
+        return np.where(inside, indices, -1)
+
+    def overlapping(self, start_sec: float, end_sec: float) -> tuple[int, int]:
+        """
+        (primero, último) de los segmentos que solapan [start_sec, end_sec). Si no solapa
+        ninguno, último = primero - 1 y 'primero' es donde se insertaría un segmento en ese tramo.
+        """
+        first = int(np.searchsorted(self.ends, start_sec, side="right"))
+        last = int(np.searchsorted(self.starts, end_sec, side="left")) - 1
+        return first, max(last, first - 1)
+
+    def low_confidence_mask(self):
+        """Máscara booleana de segmentos dudosos (mismos umbrales que la revisión selectiva)."""
+        with np.errstate(invalid="ignore"): # NaN (métrica ausente) no marca el segmento
+            return ((self.avg_logprob < config.RECHECK_AVG_LOGPROB_THRESHOLD)
+                    | (self.compression_ratio > config.RECHECK_COMPRESSION_RATIO_THRESHOLD)
+                    | (self.no_speech_prob > config.RECHECK_NO_SPEECH_THRESHOLD))
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria aproximada (arrays + texto)."""
+        arrays = sum(getattr(self, key).nbytes for key in ("ids", "starts", "ends", "offsets") + _CONFIDENCE_FIELDS)
+        return arrays + sys.getsizeof(self.text)
@@ -0,0 +1,204 @@
+# session_journal.py
+"""
+Autoguardado de la sesión de cada audio en un diario (journal) de solo-añadir.
+
+Por archivo de audio (indexado por la huella de su contenido) se guarda un .jsonl:
+la primera línea es una instantánea (texto, segmentos y posición de cada segmento en el
+texto) y cada ráfaga de ediciones añade una línea pequeña con la sustitución mínima
+(posición, caracteres borrados, texto insertado). Escribir una edición cuesta lo que
+ocupa la edición, no la transcripción entera. Cuando las ediciones acumuladas superan un
+umbral, el diario se compacta reescribiéndolo como una única instantánea (escritura
+atómica). Restaurar es leer la instantánea y reaplicar las ediciones en memoria.
+"""
+
+import json
+import os
+import pathlib
+import threading
+import time
+import audio_stream
+import config
+from segment_store import slim_segment
+
+JOURNAL_VERSION = 1
+
+
+def diff_replace(old: str, new: str) -> tuple[int, int, str] | None:
+    """
+    Sustitución mínima que convierte 'old' en 'new': (posición, caracteres borrados, texto
+    insertado), o None si son iguales. El prefijo y el sufijo comunes se buscan por
+    bisección comparando porciones, así que el coste es lineal en C y no carácter a carácter.
+    """
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    low, high = 0, limit
+    while low < high: # Prefijo común (lo ya comprobado no se vuelve a comparar)
+        mid = (low + high + 1) // 2
+        if old[low:mid] == new[low:mid]: low = mid
+        else: high = mid - 1
+    prefix = low
+    low, high = 0, limit - prefix
+    while low < high: # Sufijo común, sin solaparse con el prefijo
+        mid = (low + high + 1) // 2
+        if old[len(old) - mid:len(old) - low] == new[len(new) - mid:len(new) - low]: low = mid
+        else: high = mid - 1
+    suffix = low
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
+
+def shift_offsets(offsets: list[int], position: int, deleted: int, inserted: int) -> list[int]:
+    """
+    Ajusta los inicios de segmento a una sustitución. Igual que las marcas de Tk con gravedad
+    izquierda: un inicio en la posición de la inserción no se mueve y los que caen dentro del
+    texto borrado se quedan en su inicio.
+    """
+    end = position + deleted
+    delta = inserted - deleted
+    return [offset if offset <= position else position if offset < end else offset + delta for offset in offsets]
+
+
+class SessionJournal:
+    """Diario de la sesión (texto + segmentos + ediciones) de un archivo de audio."""
+
+    def __init__(self, audio_path: pathlib.Path, journal_dir: pathlib.Path | None = None):
+        self.audio_path = pathlib.Path(audio_path)
+        self.journal_dir = pathlib.Path(journal_dir or config.SESSION_JOURNAL_DIR)
+        self.path = self.journal_dir / f"{audio_stream.file_fingerprint(self.audio_path)}.jsonl"
+        # Estado actual (el que resulta de la instantánea + ediciones del diario)
+        self.text: str | None = None
+        self.segments: list[dict] = []
+        self.offsets: list[int] = []
+        self.meta: dict = {}
+        self.ops_since_snapshot = 0
+        self._ops_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """True si hay un estado base (instantánea o sesión restaurada) sobre el que anotar ediciones."""
+        return self.text is not None
+
+    def deactivate(self):
+        """Deja de anotar ediciones hasta la siguiente instantánea (el archivo no se toca)."""
+        with self._lock:
+            self.text = None
+
+    def load(self) -> dict | None:
+        """
+        Lee el diario y reaplica las ediciones sobre la instantánea. Devuelve {"text",
+        "segments", "offsets", "meta", "ops", "saved_at", "load_ms"} o None si no hay sesión.
+        Una última línea incompleta (cierre inesperado a mitad de escritura) se ignora.
+        """
+        start_time = time.perf_counter()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        text = None
+        segments, offsets, meta, saved_at = [], [], {}, None
+        ops = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record.get("op") == "snapshot" and record.get("version") == JOURNAL_VERSION:
+                text, segments, offsets = record["text"], record["segments"], record["offsets"]
+                meta, saved_at, ops = record.get("meta", {}), record.get("saved_at"), 0
+            elif record.get("op") == "replace" and text is not None:
+                position, deleted, inserted = record["pos"], record["del"], record["text"]
+                text = text[:position] + inserted + text[position + deleted:]
+                offsets = shift_offsets(offsets, position, deleted, len(inserted))
+                saved_at = record.get("saved_at", saved_at)
+                ops += 1
+        if text is None:
+            return None
+        with self._lock:
+            self.text, self.segments, self.offsets, self.meta = text, segments, offsets, meta
+            self.ops_since_snapshot, self._ops_bytes = ops, sum(len(line) for line in lines[1:])
+        return {"text": text, "segments": segments, "offsets": offsets, "meta": meta, "ops": ops,
+                "saved_at": saved_at, "load_ms": 1000.0 * (time.perf_counter() - start_time)}
+
+    def snapshot(self, text: str, segments: list[dict], offsets: list[int], meta: dict | None = None):
+        """Fija un nuevo estado base (transcripción nueva, segmentos sustituidos) y reescribe el diario."""
+        with self._lock:
+            self.text = text
+            self.segments = [slim_segment(segment) for segment in segments]
+            self.offsets = list(offsets)
+            self.meta = dict(meta or {})
+            self._write_snapshot()
+        prune_journals(self.journal_dir)
+
+    def record_text(self, text: str) -> bool:
+        """
+        Anota el texto actual como una sustitución respecto al último anotado. Devuelve True si
+        había cambios. Compacta el diario si las ediciones acumuladas ya pesan demasiado.
+        """
+        with self._lock:
+            if self.text is None:
+                return False
+            change = diff_replace(self.text, text)
+            if change is None:
+                return False
+            position, deleted, inserted = change
+            line = json.dumps({"op": "replace", "pos": position, "del": deleted, "text": inserted,
+                               "saved_at": time.time()}, ensure_ascii=False) + "\n"
+            self.text = text
+            self.offsets = shift_offsets(self.offsets, position, deleted, len(inserted))
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Advertencia: No se pudo anotar la edición en {self.path.name}: {e}")
+                return True
+            self.ops_since_snapshot += 1
+            self._ops_bytes += len(line)
+            if (self.ops_since_snapshot >= config.SESSION_JOURNAL_COMPACT_OPS
+                    or self._ops_bytes > max(len(self.text), config.SESSION_JOURNAL_COMPACT_MIN_BYTES)):
+                self._write_snapshot()
+            return True
+
+    def compact(self):
+        """Reescribe el diario como una única instantánea si tiene ediciones pendientes de compactar."""
+        with self._lock:
+            if self.text is not None and self.ops_since_snapshot:
+                self._write_snapshot()
+
+    def discard(self):
+        """Borra la sesión guardada."""
+        with self._lock:
+            self.text = None
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+    def _write_snapshot(self):
+        """Escribe la instantánea del estado actual (con el lock tomado) de forma atómica."""
+        record = {"op": "snapshot", "version": JOURNAL_VERSION, "audio": str(self.audio_path), "saved_at": time.time(),
+                  "text": self.text, "segments": self.segments, "offsets": self.offsets, "meta": self.meta}
+        try:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self.ops_since_snapshot = 0
+            self._ops_bytes = 0
+        except OSError as e:
+            print(f"Advertencia: No se pudo guardar la sesión en {self.path}: {e}")
+
+
+def prune_journals(journal_dir: pathlib.Path, max_files: int | None = None):
+    """Conserva solo las config.SESSION_JOURNAL_MAX_FILES sesiones modificadas más recientemente."""
+    max_files = max_files or config.SESSION_JOURNAL_MAX_FILES
+    try:
+        journals = sorted(pathlib.Path(journal_dir).glob("*.jsonl"), key=lambda path: path.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for path in journals[max_files:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,66 @@
+# task_scheduler.py
+"""
+Planificador mínimo de dependencias.
+
+Cada tarea previa (p. ej. "model" = modelo cargado, "audio" = audio convertido) se marca
+como lista o pendiente; las acciones registradas con when_ready() se ejecutan una sola
+vez en cuanto todas sus dependencias están listas. Permite lanzar la carga del modelo y
+la conversión del audio en paralelo y transcribir cuando terminan ambas.
+"""
+
+import threading
+import time
+
+
+class DependencyScheduler:
+    """Ejecuta callbacks cuando un conjunto de dependencias con nombre está listo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready: dict[str, float] = {} # Dependencia -> instante (time.perf_counter) en que quedó lista
+        self._waiters: dict[str, tuple[frozenset, callable]] = {} # Clave -> (dependencias, callback)
+
+    def set_ready(self, name: str):
+        """Marca una dependencia como lista y dispara las acciones que ya pueden ejecutarse."""
+        with self._lock:
+            self._ready[name] = time.perf_counter()
+        self._dispatch()
+
+    def clear(self, name: str):
+        """Marca una dependencia como pendiente (p. ej. al cambiar de modelo o de archivo)."""
+        with self._lock:
+            self._ready.pop(name, None)
+
+    def is_ready(self, *names: str) -> bool:
+        with self._lock:
+            return all(name in self._ready for name in names)
+
+    def ready_time(self, name: str) -> float | None:
+        """Instante (perf_counter) en que la dependencia quedó lista, o None si está pendiente."""
+        with self._lock:
+            return self._ready.get(name)
+
+    def when_ready(self, key: str, names, callback):
+        """
+        Registra 'callback' para cuando todas las dependencias 'names' estén listas.
+        Una nueva acción con la misma clave sustituye a la anterior. Si ya están listas,
+        se ejecuta inmediatamente.
+        """
+        with self._lock:
+            self._waiters[key] = (frozenset(names), callback)
+        self._dispatch()
+
+    def cancel(self, key: str):
+        with self._lock:
+            self._waiters.pop(key, None)
+
+    def cancel_all(self):
+        with self._lock:
+            self._waiters.clear()
+
+    def _dispatch(self):
+        with self._lock:
+            runnable = [key for key, (names, _callback) in self._waiters.items() if names <= self._ready.keys()]
+            callbacks = [self._waiters.pop(key)[1] for key in runnable]
+        for callback in callbacks: # Fuera del lock: el callback puede volver a usar el planificador
+            callback()
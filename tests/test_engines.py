@@ -0,0 +1,82 @@
+# tests/test_engines.py
+"""
+Prueba de humo de la selección de motores y de la transcripción completa con el motor
+simulado (transcription_engines.FakeEngine), sin Whisper, PyTorch ni ffmpeg.
+
+Uso (desde la raíz del proyecto):
+    python -m unittest discover tests
+"""
+
+import pathlib
+import sys
+import tempfile
+import unittest
+import wave
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import config
+import transcription_engines
+import whisper_transcriber
+
+
+def _write_silence_wav(path: pathlib.Path, seconds: float, sample_rate: int = 16000):
+    """Escribe un WAV mono de 16 bits en silencio."""
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+
+
+class EngineSelectionTest(unittest.TestCase):
+
+    def test_fake_engine_is_selectable_but_not_automatic(self):
+        self.assertEqual(transcription_engines.select_engine_name("fake"), "fake")
+        self.assertNotIn("fake", transcription_engines.available_engines())
+        self.assertIn("fake", transcription_engines.available_engines(include_fake=True))
+
+
+class FakeEngineTranscriptionTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = (whisper_transcriber.WHISPER_AVAILABLE, config.OUT_OF_PROCESS_TRANSCRIPTION,
+                       config.LANGUAGE_DETECTION_ENABLED)
+        whisper_transcriber.WHISPER_AVAILABLE = True # Basta con el motor simulado
+        config.LANGUAGE_DETECTION_ENABLED = False
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.audio_path = pathlib.Path(self._tmp_dir.name) / "audio.wav"
+        _write_silence_wav(self.audio_path, 7.0)
+
+    def tearDown(self):
+        whisper_transcriber.shutdown_worker()
+        (whisper_transcriber.WHISPER_AVAILABLE, config.OUT_OF_PROCESS_TRANSCRIPTION,
+         config.LANGUAGE_DETECTION_ENABLED) = self._saved
+        self._tmp_dir.cleanup()
+
+    def _transcribe(self, model_name: str, out_of_process: bool) -> dict:
+        # Cada prueba usa otro nombre de modelo para forzar una carga nueva
+        config.OUT_OF_PROCESS_TRANSCRIPTION = out_of_process
+        self.assertTrue(whisper_transcriber.load_model_blocking(model_name, engine="fake"))
+        self.assertEqual(whisper_transcriber.get_loaded_engine_name(), "fake")
+        self.assertEqual(whisper_transcriber._loaded_engine is None, out_of_process) # El modelo está en un solo sitio
+        result = whisper_transcriber.transcribe_file_blocking(self.audio_path)
+        self.assertIsNotNone(result)
+        return result
+
+    def _check_segments(self, result: dict):
+        segments = result["segments"]
+        self.assertEqual(len(segments), 4) # 7 s en segmentos de 2 s
+        self.assertEqual(segments[0]["start"], 0.0)
+        self.assertAlmostEqual(segments[-1]["end"], 7.0, places=2)
+        self.assertTrue(result["text"].strip())
+
+    def test_in_process(self):
+        self._check_segments(self._transcribe("tiny", out_of_process=False))
+
+    def test_worker_process(self):
+        self._check_segments(self._transcribe("base", out_of_process=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
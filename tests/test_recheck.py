@@ -0,0 +1,157 @@
+# tests/test_recheck.py
+"""
+Pruebas de la revisión de fragmentos de baja confianza (whisper_transcriber): agrupación y
+ampliación de los fragmentos dudosos y sustitución de sus segmentos con el motor simulado
+(transcription_engines.FakeEngine). audio_stream.load_range se sustituye por silencio para
+no necesitar ffmpeg.
+
+Uso (desde la raíz del proyecto):
+    python -m unittest discover tests
+"""
+
+import pathlib
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import config
+import transcription_engines
+import whisper_transcriber
+from whisper_transcriber import find_low_confidence_ranges, is_low_confidence, recheck_low_confidence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _segments(count: int, low_confidence=(), duration: float = 1.0) -> list[dict]:
+    """'count' segmentos consecutivos de 'duration' segundos; los de 'low_confidence' son dudosos."""
+    return [{"id": index, "start": index * duration, "end": (index + 1) * duration, "text": f" Original {index}.",
+             "avg_logprob": -2.0 if index in low_confidence else -0.2, "compression_ratio": 1.2, "no_speech_prob": 0.01}
+            for index in range(count)]
+
+
+class LowConfidenceTest(unittest.TestCase):
+
+    def test_each_metric_flags_a_segment(self):
+        segment = _segments(1)[0]
+        self.assertFalse(is_low_confidence(segment))
+        self.assertTrue(is_low_confidence(dict(segment, avg_logprob=config.RECHECK_AVG_LOGPROB_THRESHOLD - 0.1)))
+        self.assertTrue(is_low_confidence(dict(segment, compression_ratio=config.RECHECK_COMPRESSION_RATIO_THRESHOLD + 0.1)))
+        self.assertTrue(is_low_confidence(dict(segment, no_speech_prob=config.RECHECK_NO_SPEECH_THRESHOLD + 0.1)))
+        self.assertFalse(is_low_confidence({"start": 0.0, "end": 1.0, "text": " Sin métricas."}))
+
+
+class FindLowConfidenceRangesTest(unittest.TestCase):
+
+    def test_contiguous_segments_are_grouped(self):
+        segments = _segments(10, low_confidence={2, 3, 5})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=0.0), [[2, 3], [5]])
+
+    def test_short_range_is_widened_to_the_right(self):
+        segments = _segments(10, low_confidence={4})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[4, 5, 6]])
+
+    def test_short_range_at_the_start_is_widened_to_the_right(self):
+        segments = _segments(10, low_confidence={0})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[0, 1, 2]])
+
+    def test_short_range_at_the_end_is_widened_to_the_left(self):
+        segments = _segments(10, low_confidence={9})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[7, 8, 9]])
+
+    def test_widened_ranges_that_overlap_are_merged(self):
+        segments = _segments(10, low_confidence={4, 6})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[4, 5, 6, 7, 8]])
+
+    def test_widened_ranges_that_touch_are_merged(self):
+        segments = _segments(10, low_confidence={0, 3})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[0, 1, 2, 3, 4, 5]])
+
+    def test_range_at_the_end_merges_with_the_previous_one(self):
+        # El último se amplía hacia la izquierda hasta tocar el fragmento anterior
+        segments = _segments(10, low_confidence={5, 9})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[5, 6, 7, 8, 9]])
+
+    def test_file_shorter_than_min_range(self):
+        segments = _segments(2, low_confidence={1})
+        self.assertEqual(find_low_confidence_ranges(segments, min_range_sec=3.0), [[0, 1]])
+
+    def test_nothing_flagged(self):
+        self.assertEqual(find_low_confidence_ranges(_segments(5)), [])
+        self.assertEqual(find_low_confidence_ranges([]), [])
+
+
+@unittest.skipIf(np is None, "numpy no está instalado")
+class RecheckLowConfidenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = transcription_engines.FakeEngine(segment_duration=2.0)
+        self.engine.load("medium")
+        self.loaded_ranges = []
+        self.extra_sec = 0.0 # Audio de más devuelto por load_range (para probar el recorte)
+        patcher = mock.patch.object(whisper_transcriber.audio_stream, "load_range", side_effect=self._load_range)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._saved_min_range = config.RECHECK_MIN_RANGE_SEC
+        config.RECHECK_MIN_RANGE_SEC = 3.0
+        self.addCleanup(setattr, config, "RECHECK_MIN_RANGE_SEC", self._saved_min_range)
+
+    def _load_range(self, path, start_sec, end_sec):
+        self.loaded_ranges.append((start_sec, end_sec))
+        return np.zeros(int((end_sec - start_sec + self.extra_sec) * 16000), dtype=np.float32)
+
+    def test_range_is_spliced_into_the_timeline(self):
+        segments = _segments(10, low_confidence={4})
+        result, report = recheck_low_confidence(segments, self.engine, pathlib.Path("nota.ogg"), {})
+
+        self.assertEqual(self.loaded_ranges, [(4.0, 7.0)]) # Segmentos 4-6 tras la ampliación
+        # El motor simulado devuelve dos segmentos (2 s + 1 s) en lugar de los tres originales
+        self.assertEqual([(segment["start"], segment["end"]) for segment in result],
+                         [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0), (3.0, 4.0), (4.0, 6.0), (6.0, 7.0),
+                          (7.0, 8.0), (8.0, 9.0), (9.0, 10.0)])
+        self.assertEqual([segment["id"] for segment in result], list(range(9)))
+        self.assertEqual([index for index, segment in enumerate(result) if segment.get("rechecked")], [4, 5])
+        self.assertEqual(result[4]["text"], " Segmento 0 (medium).")
+        self.assertEqual(result[3]["text"], " Original 3.")
+        self.assertEqual(result[6]["text"], " Original 7.")
+
+        self.assertEqual(report["model"], "medium")
+        self.assertEqual((report["flagged_segments"], report["ranges"]), (1, 1))
+        self.assertAlmostEqual(report["redone_sec"], 3.0)
+        self.assertAlmostEqual(report["audio_sec"], 10.0)
+        self.assertAlmostEqual(report["redone_ratio"], 0.3)
+
+    def test_several_ranges_and_file_edges(self):
+        segments = _segments(10, low_confidence={0, 9})
+        result, report = recheck_low_confidence(segments, self.engine, pathlib.Path("nota.ogg"), {})
+
+        self.assertEqual(self.loaded_ranges, [(0.0, 3.0), (7.0, 10.0)])
+        self.assertEqual(report["ranges"], 2)
+        self.assertEqual([(segment["start"], segment["end"]) for segment in result],
+                         [(0.0, 2.0), (2.0, 3.0), (3.0, 4.0), (4.0, 5.0), (5.0, 6.0), (6.0, 7.0),
+                          (7.0, 9.0), (9.0, 10.0)])
+        self.assertEqual([segment["id"] for segment in result], list(range(8)))
+        self.assertEqual([bool(segment.get("rechecked")) for segment in result],
+                         [True, True, False, False, False, False, True, True])
+
+    def test_redone_segments_are_clamped_to_the_range(self):
+        self.extra_sec = 0.5 # El fragmento decodificado es algo más largo que lo pedido
+        segments = _segments(10, low_confidence={4})
+        result, _report = recheck_low_confidence(segments, self.engine, pathlib.Path("nota.ogg"), {})
+        self.assertEqual((result[5]["start"], result[5]["end"]), (6.0, 7.0))
+        self.assertEqual(result[6]["start"], 7.0)
+
+    def test_nothing_to_recheck(self):
+        segments = _segments(5)
+        result, report = recheck_low_confidence(segments, self.engine, pathlib.Path("nota.ogg"), {})
+        self.assertEqual(self.loaded_ranges, [])
+        self.assertEqual([segment["text"] for segment in result], [segment["text"] for segment in _segments(5)])
+        self.assertEqual((report["ranges"], report["redone_sec"], report["redone_ratio"]), (0, 0.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+# tests/test_session_journal.py
+"""
+Pruebas del diario de autoguardado (session_journal): sustitución mínima, ajuste de los
+inicios de segmento, reaplicación de las ediciones al cargar y compactación.
+
+Uso (desde la raíz del proyecto):
+    python -m unittest discover tests
+"""
+
+import json
+import pathlib
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import config
+from session_journal import SessionJournal, diff_replace, shift_offsets
+
+
+def _apply(old: str, change) -> str:
+    position, deleted, inserted = change
+    return old[:position] + inserted + old[position + deleted:]
+
+
+class DiffReplaceTest(unittest.TestCase):
+
+    def test_equal_texts(self):
+        self.assertIsNone(diff_replace("hola mundo", "hola mundo"))
+
+    def test_insertion_deletion_and_replacement(self):
+        self.assertEqual(diff_replace("hola mundo", "hola gran mundo"), (5, 0, "gran "))
+        self.assertEqual(diff_replace("hola gran mundo", "hola mundo"), (5, 5, ""))
+        self.assertEqual(diff_replace("el número de factura", "el número del pedido"), (12, 8, "l pedido"))
+        self.assertEqual(diff_replace("", "texto"), (0, 0, "texto"))
+        self.assertEqual(diff_replace("texto", ""), (0, 5, ""))
+
+    def test_prefix_and_suffix_do_not_overlap(self):
+        # Con caracteres repetidos el prefijo y el sufijo comunes podrían solaparse
+        change = diff_replace("aaa", "aaaa")
+        self.assertEqual(change[1:], (0, "a"))
+        self.assertEqual(_apply("aaa", change), "aaaa")
+        self.assertEqual(_apply("abab", diff_replace("abab", "ab")), "ab")
+
+    def test_random_edits_roundtrip(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            old = "".join(rng.choice("ab ñ") for _ in range(rng.randrange(0, 30)))
+            new = "".join(rng.choice("ab ñ") for _ in range(rng.randrange(0, 30)))
+            change = diff_replace(old, new)
+            if change is None:
+                self.assertEqual(old, new)
+                continue
+            self.assertEqual(_apply(old, change), new)
+            position, deleted, _inserted = change
+            self.assertLessEqual(position + deleted, len(old))
+
+
+class ShiftOffsetsTest(unittest.TestCase):
+
+    def test_insertion(self):
+        # Un inicio en la posición de la inserción no se mueve (gravedad izquierda); los siguientes sí
+        self.assertEqual(shift_offsets([0, 5, 10], 5, 0, 3), [0, 5, 13])
+
+    def test_deletion_collapses_starts_inside_the_deleted_text(self):
+        self.assertEqual(shift_offsets([0, 5, 7, 10, 15], 4, 6, 0), [0, 4, 4, 4, 9])
+
+    def test_replacement(self):
+        self.assertEqual(shift_offsets([0, 4, 8], 2, 4, 1), [0, 2, 5])
+
+
+class SessionJournalTest(unittest.TestCase):
+
+    TEXT = " Primer segmento. Segundo segmento. Tercero."
+    SEGMENTS = [{"id": 0, "start": 0.0, "end": 2.0, "text": " Primer segmento."},
+                {"id": 1, "start": 2.0, "end": 4.0, "text": " Segundo segmento."},
+                {"id": 2, "start": 4.0, "end": 5.0, "text": " Tercero."}]
+    OFFSETS = [0, 17, 35]
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        tmp = pathlib.Path(self._tmp_dir.name)
+        self.audio_path = tmp / "nota.ogg"
+        self.audio_path.write_bytes(b"contenido de audio")
+        self.journal_dir = tmp / "sessions"
+        self._saved_compact_ops = config.SESSION_JOURNAL_COMPACT_OPS
+
+    def tearDown(self):
+        config.SESSION_JOURNAL_COMPACT_OPS = self._saved_compact_ops
+        self._tmp_dir.cleanup()
+
+    def _journal(self) -> SessionJournal:
+        return SessionJournal(self.audio_path, self.journal_dir)
+
+    def _lines(self, journal: SessionJournal) -> list[dict]:
+        return [json.loads(line) for line in journal.path.read_text(encoding="utf-8").splitlines()]
+
+    def test_no_session(self):
+        journal = self._journal()
+        self.assertIsNone(journal.load())
+        self.assertFalse(journal.record_text("sin instantánea"))
+
+    def test_replay_edits(self):
+        journal = self._journal()
+        journal.snapshot(self.TEXT, self.SEGMENTS, self.OFFSETS, {"model": "small"})
+        first = " Primer segmento editado. Segundo segmento. Tercero."
+        second = " Primer segmento editado. Tercero."
+        self.assertTrue(journal.record_text(first))
+        self.assertFalse(journal.record_text(first)) # Sin cambios: no se anota nada
+        self.assertTrue(journal.record_text(second))
+        self.assertEqual([record["op"] for record in self._lines(journal)], ["snapshot", "replace", "replace"])
+
+        restored = self._journal().load()
+        self.assertEqual(restored["text"], second)
+        self.assertEqual(restored["offsets"], journal.offsets)
+        # La sustitución mínima borra "Segundo segmento. " desde 26: el inicio del tercero cae dentro y se queda en 26
+        self.assertEqual(restored["offsets"], [0, 25, 26])
+        self.assertEqual(restored["segments"], self.SEGMENTS)
+        self.assertEqual(restored["meta"], {"model": "small"})
+        self.assertEqual(restored["ops"], 2)
+
+    def test_truncated_last_line_is_ignored(self):
+        journal = self._journal()
+        journal.snapshot(self.TEXT, self.SEGMENTS, self.OFFSETS)
+        edited = self.TEXT.replace("Tercero", "Tercer segmento")
+        journal.record_text(edited)
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"op": "replace", "pos": 3, "del": 1') # Cierre a mitad de escritura
+
+        restored = self._journal().load()
+        self.assertEqual(restored["text"], edited)
+        self.assertEqual(restored["ops"], 1)
+
+    def test_compaction_after_many_edits(self):
+        config.SESSION_JOURNAL_COMPACT_OPS = 3
+        journal = self._journal()
+        journal.snapshot(self.TEXT, self.SEGMENTS, self.OFFSETS)
+        text = self.TEXT
+        for number in range(3):
+            text += f" Añadido {number}."
+            journal.record_text(text)
+        records = self._lines(journal)
+        self.assertEqual(len(records), 1) # Reescrito como una única instantánea
+        self.assertEqual(records[0]["op"], "snapshot")
+        self.assertEqual(records[0]["text"], text)
+        self.assertEqual(journal.ops_since_snapshot, 0)
+        self.assertEqual(self._journal().load()["text"], text)
+
+    def test_explicit_compact(self):
+        journal = self._journal()
+        journal.snapshot(self.TEXT, self.SEGMENTS, self.OFFSETS)
+        edited = "Otro texto." + self.TEXT
+        journal.record_text(edited)
+        journal.compact()
+        records = self._lines(journal)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["offsets"], [0, 28, 46])
+        restored = self._journal().load()
+        self.assertEqual((restored["text"], restored["ops"]), (edited, 0))
+
+    def test_discard(self):
+        journal = self._journal()
+        journal.snapshot(self.TEXT, self.SEGMENTS, self.OFFSETS)
+        journal.discard()
+        self.assertFalse(journal.path.exists())
+        self.assertIsNone(self._journal().load())
+
+
+if __name__ == "__main__":
+    unittest.main()
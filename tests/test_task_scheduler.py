@@ -0,0 +1,99 @@
+# tests/test_task_scheduler.py
+"""
+Pruebas del planificador de dependencias (task_scheduler): las acciones se ejecutan una
+sola vez cuando todas sus dependencias están listas, se sustituyen por clave y se cancelan.
+
+Uso (desde la raíz del proyecto):
+    python -m unittest discover tests
+"""
+
+import pathlib
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from task_scheduler import DependencyScheduler
+
+
+class DependencySchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = DependencyScheduler()
+        self.calls = []
+
+    def _action(self, name):
+        return lambda: self.calls.append(name)
+
+    def test_runs_once_when_all_dependencies_are_ready(self):
+        self.scheduler.when_ready("transcribe", ("model", "audio"), self._action("transcribe"))
+        self.scheduler.set_ready("audio")
+        self.assertEqual(self.calls, [])
+        self.scheduler.set_ready("model")
+        self.assertEqual(self.calls, ["transcribe"])
+        self.scheduler.set_ready("model") # Ya se ejecutó: no se repite
+        self.assertEqual(self.calls, ["transcribe"])
+
+    def test_runs_immediately_if_already_ready(self):
+        self.scheduler.set_ready("model")
+        self.scheduler.when_ready("transcribe", ["model"], self._action("transcribe"))
+        self.assertEqual(self.calls, ["transcribe"])
+
+    def test_same_key_replaces_the_previous_action(self):
+        self.scheduler.when_ready("transcribe", ["model"], self._action("primera"))
+        self.scheduler.when_ready("transcribe", ["model"], self._action("segunda"))
+        self.scheduler.set_ready("model")
+        self.assertEqual(self.calls, ["segunda"])
+
+    def test_clear_makes_a_dependency_pending_again(self):
+        self.scheduler.set_ready("audio")
+        self.assertIsNotNone(self.scheduler.ready_time("audio"))
+        self.scheduler.clear("audio") # Otro archivo
+        self.assertFalse(self.scheduler.is_ready("audio"))
+        self.assertIsNone(self.scheduler.ready_time("audio"))
+        self.scheduler.when_ready("transcribe", ["audio"], self._action("transcribe"))
+        self.assertEqual(self.calls, [])
+        self.scheduler.set_ready("audio")
+        self.assertEqual(self.calls, ["transcribe"])
+
+    def test_ready_times_follow_the_order(self):
+        self.scheduler.set_ready("model")
+        self.scheduler.set_ready("audio")
+        self.assertTrue(self.scheduler.is_ready("model", "audio"))
+        self.assertLessEqual(self.scheduler.ready_time("model"), self.scheduler.ready_time("audio"))
+
+    def test_cancel(self):
+        self.scheduler.when_ready("transcribe", ["model"], self._action("transcribe"))
+        self.scheduler.when_ready("draft", ["audio"], self._action("draft"))
+        self.scheduler.cancel("transcribe")
+        self.scheduler.set_ready("model")
+        self.assertEqual(self.calls, [])
+        self.scheduler.cancel_all()
+        self.scheduler.set_ready("audio")
+        self.assertEqual(self.calls, [])
+
+    def test_callback_can_use_the_scheduler(self):
+        # Los callbacks se ejecutan fuera del lock: pueden registrar otra acción o marcar dependencias
+        def transcribe():
+            self.calls.append("transcribe")
+            self.scheduler.when_ready("export", ["result"], self._action("export"))
+            self.scheduler.set_ready("result")
+
+        self.scheduler.when_ready("transcribe", ["model"], transcribe)
+        self.scheduler.set_ready("model")
+        self.assertEqual(self.calls, ["transcribe", "export"])
+
+    def test_dependencies_ready_from_several_threads_run_the_action_once(self):
+        for _ in range(50):
+            scheduler = DependencyScheduler()
+            calls = []
+            scheduler.when_ready("transcribe", ("model", "audio"), lambda: calls.append(1))
+            threads = [threading.Thread(target=scheduler.set_ready, args=(name,)) for name in ("model", "audio")]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+            self.assertEqual(calls, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# tests/test_time_compression.py
+"""
+Pruebas del modo acelerado (time_compression): vuelta de los tiempos de los segmentos a la
+línea temporal original, etiquetas del factor y duración del audio comprimido.
+
+Uso (desde la raíz del proyecto):
+    python -m unittest discover tests
+"""
+
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import time_compression
+from time_compression import format_factor, parse_factor, remap_segment
+
+
+class RemapSegmentTest(unittest.TestCase):
+
+    def test_times_are_scaled_by_the_factor(self):
+        segment = {"id": 3, "start": 4.0, "end": 6.0, "text": " Hola."}
+        remapped = remap_segment(segment, 1.5)
+        self.assertIs(remapped, segment) # In situ
+        self.assertEqual(remapped, {"id": 3, "start": 6.0, "end": 9.0, "text": " Hola."})
+
+    def test_times_are_clamped_to_the_original_duration(self):
+        # El redondeo de la compresión puede dejar el último segmento algo más allá del final
+        segment = remap_segment({"start": 7.9, "end": 8.1}, 1.25, duration_sec=10.0)
+        self.assertAlmostEqual(segment["start"], 9.875)
+        self.assertEqual(segment["end"], 10.0)
+
+    def test_missing_times_are_left_alone(self):
+        self.assertEqual(remap_segment({"text": " Sin tiempos."}, 2.0, duration_sec=5.0), {"text": " Sin tiempos."})
+        self.assertEqual(remap_segment({"start": 1.0, "text": ""}, 2.0), {"start": 2.0, "text": ""})
+
+    def test_factor_one_keeps_the_timeline(self):
+        self.assertEqual(remap_segment({"start": 1.0, "end": 2.5}, 1.0), {"start": 1.0, "end": 2.5})
+
+
+class FactorLabelTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        for factor in (1.0, 1.25, 1.5, 2.0):
+            self.assertEqual(parse_factor(format_factor(factor)), factor)
+        self.assertEqual(format_factor(1.0), "1x")
+        self.assertEqual(format_factor(1.25), "1.25x")
+
+    def test_invalid_or_slower_labels(self):
+        self.assertEqual(parse_factor("rápido"), 1.0)
+        self.assertEqual(parse_factor("0.5x"), 1.0)
+
+
+@unittest.skipIf(time_compression.np is None, "numpy no está instalado")
+class CompressTest(unittest.TestCase):
+
+    def test_duration_is_divided_by_the_factor(self):
+        np = time_compression.np
+        samples = np.sin(2 * np.pi * 220 * np.arange(16000 * 3) / 16000).astype(np.float32)
+        for factor in (1.25, 1.5, 2.0):
+            compressed = time_compression.compress(samples, factor)
+            self.assertEqual(compressed.dtype, np.float32)
+            self.assertEqual(len(compressed), int(len(samples) / factor))
+        self.assertIs(time_compression.compress(samples, 1.0), samples)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# tests/test_ui_events.py
+"""
+Pruebas de la cola de eventos entre hilos y Tkinter (ui_events): fusión por clave, orden
+FIFO de los eventos no fusionables y presupuesto de tiempo por lote. Sin Tk: se llama a
+drain() directamente o se usa una raíz simulada.
+
+Uso (desde la raíz del proyecto):
+    python -m unittest discover tests
+"""
+
+import pathlib
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from ui_events import UIEventQueue
+
+
+class _FakeRoot:
+    """Lo mínimo de un widget de Tk para start()/stop(): after() solo anota la llamada."""
+
+    def __init__(self):
+        self.scheduled = []
+        self.cancelled = []
+
+    def after(self, delay_ms, callback):
+        self.scheduled.append((delay_ms, callback))
+        return f"after#{len(self.scheduled)}"
+
+    def after_cancel(self, poll_id):
+        self.cancelled.append(poll_id)
+
+
+class UIEventQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = UIEventQueue(poll_interval_ms=10, batch_budget_ms=1000)
+        self.delivered = []
+
+    def _record(self, *args):
+        self.delivered.append(args)
+
+    def test_only_latest_event_per_key_is_delivered(self):
+        for percentage in (10, 20, 30):
+            self.queue.post(self._record, "progreso", percentage, coalesce_key="progress")
+        self.queue.drain()
+        self.assertEqual(self.delivered, [("progreso", 30)])
+        stats = self.queue.stats()
+        self.assertEqual((stats["posted"], stats["coalesced"], stats["dispatched"], stats["depth"]), (3, 2, 1, 0))
+
+    def test_keys_are_independent_and_reusable_after_delivery(self):
+        self.queue.post(self._record, "estado 1", coalesce_key="status")
+        self.queue.post(self._record, "progreso 1", coalesce_key="progress")
+        self.queue.post(self._record, "estado 2", coalesce_key="status")
+        self.queue.drain()
+        self.assertEqual(self.delivered, [("progreso 1",), ("estado 2",)])
+        self.queue.post(self._record, "estado 3", coalesce_key="status")
+        self.queue.drain()
+        self.assertEqual(self.delivered[-1], ("estado 3",))
+
+    def test_completion_events_keep_fifo_order_around_coalesced_ones(self):
+        self.queue.post(self._record, "segmento A")
+        self.queue.post(self._record, "estado 1", coalesce_key="status")
+        self.queue.post(self._record, "segmento B")
+        self.queue.post(self._record, "estado 2", coalesce_key="status")
+        self.queue.post(self._record, "completado")
+        self.queue.drain()
+        # El estado fusionado ocupa el sitio del último publicado: no se adelanta a "segmento B"
+        self.assertEqual(self.delivered, [("segmento A",), ("segmento B",), ("estado 2",), ("completado",)])
+
+    def test_order_is_kept_per_thread(self):
+        def producer(name):
+            post = self.queue.wrap(self._record)
+            for number in range(200):
+                post(name, number)
+                self.queue.post(self._record, name, "estado", coalesce_key=f"status-{name}")
+
+        threads = [threading.Thread(target=producer, args=(name,)) for name in ("conversión", "transcripción")]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.queue.drain()
+        for name in ("conversión", "transcripción"):
+            numbers = [args[1] for args in self.delivered if args[0] == name and args[1] != "estado"]
+            self.assertEqual(numbers, list(range(200)))
+            self.assertEqual(self.delivered.count((name, "estado")), 1)
+
+    def test_batch_stops_at_time_budget(self):
+        queue = UIEventQueue(poll_interval_ms=10, batch_budget_ms=5)
+
+        def slow(number):
+            time.sleep(0.003)
+            self.delivered.append(number)
+
+        for number in range(10):
+            queue.post(slow, number)
+        queue.drain()
+        first_batch = len(self.delivered)
+        self.assertGreaterEqual(first_batch, 1)
+        self.assertLess(first_batch, 10) # El resto espera al siguiente sondeo
+        self.assertEqual(queue.depth(), 10 - first_batch)
+        while queue.depth():
+            queue.drain()
+        self.assertEqual(self.delivered, list(range(10)))
+
+    def test_failing_callback_does_not_stop_delivery(self):
+        def failing():
+            raise ValueError("fallo simulado")
+
+        self.queue.post(failing)
+        self.queue.post(self._record, "siguiente")
+        self.queue.drain()
+        self.assertEqual(self.delivered, [("siguiente",)])
+
+    def test_start_polls_from_the_root_loop(self):
+        root = _FakeRoot()
+        self.queue.post(self._record, "evento")
+        self.queue.start(root)
+        delay_ms, poll = root.scheduled[-1]
+        self.assertEqual(delay_ms, 10)
+        poll()
+        self.assertEqual(self.delivered, [("evento",)])
+        self.assertEqual(len(root.scheduled), 2) # Se vuelve a programar tras cada sondeo
+        self.queue.stop()
+        self.assertEqual(root.cancelled, ["after#2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
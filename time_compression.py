@@ -0,0 +1,101 @@
+# time_compression.py
+"""
+Modo acelerado: comprime el audio en el tiempo (conservando el tono) antes de transcribir.
+
+Whisper tarda en proporción a la duración del audio, así que hablar 1.25x o 1.5x más
+rápido ahorra ese tiempo a cambio de algo de precisión. La compresión es WSOLA: tramas
+de 25 ms con ventana de Hann tomadas del original cada 'factor' veces el salto de síntesis
+(cada una desplazada unos milisegundos para quedar en fase con la anterior) y sumadas al
+50 % de solapamiento, de modo que la duración se divide por 'factor' sin cambiar la
+frecuencia de la voz (a diferencia de remuestrear). La alineación y el solapamiento se
+calculan con operaciones de NumPy sobre el buffer decodificado, sin bucles muestra a muestra. Los tiempos de los segmentos se devuelven a la línea temporal original
+multiplicándolos por el factor, así la reproducción sincronizada de Depurar sigue funcionando.
+"""
+
+import audio_stream
+
+try:
+    import numpy as np # Dependencia de Whisper
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:
+    np = None
+
+FRAME_SEC = 0.025 # Duración de cada trama (voz: 20-40 ms)
+SEARCH_SEC = 0.010 # Desplazamiento máximo de cada trama para alinearla (≥ medio periodo de la voz más grave)
+_SEARCH_DECIMATION = 4 # La búsqueda gruesa se hace sobre una de cada 4 muestras
+_FRAMES_PER_BLOCK = 8192 # Tramas procesadas a la vez (acota la memoria temporal)
+
+
+def _aligned_starts(samples, frame_count: int, analysis_hop: float, synthesis_hop: int, tolerance: int):
+    """
+    Inicio de cada trama en el original (WSOLA): cerca de k * analysis_hop, desplazado hasta
+    ±tolerance para que su primera mitad continúe en fase la trama anterior (máxima correlación
+    con lo que seguía a esa trama en el original). La búsqueda es una correlación de NumPy,
+    primero sobre la señal diezmada y luego afinada a resolución completa.
+    """
+    decimation = _SEARCH_DECIMATION
+    decimated = samples[::decimation]
+    limit = len(samples) - synthesis_hop
+    starts = np.zeros(frame_count, dtype=np.int64)
+    for k in range(1, frame_count):
+        natural = starts[k - 1] + synthesis_hop # Continuación natural de la trama anterior
+        nominal = int(round(k * analysis_hop))
+        low, high = max(0, nominal - tolerance), min(limit, nominal + tolerance)
+        if high <= low or natural >= limit:
+            starts[k] = min(max(nominal, 0), len(samples))
+            continue
+        reference = decimated[natural // decimation:(natural + synthesis_hop) // decimation]
+        region = decimated[low // decimation:(high + synthesis_hop) // decimation]
+        coarse = low // decimation * decimation + decimation * int(np.argmax(np.correlate(region, reference, "valid")))
+        low, high = max(0, coarse - decimation), min(limit, coarse + decimation)
+        correlation = np.correlate(samples[low:high + synthesis_hop], samples[natural:natural + synthesis_hop], "valid")
+        starts[k] = low + int(np.argmax(correlation))
+    return starts
+
+def compress(samples, factor: float, sample_rate: int = audio_stream.WHISPER_SAMPLE_RATE):
+    """
+    Devuelve 'samples' (mono float32) acelerado 'factor' veces conservando el tono.
+    factor <= 1 devuelve el audio sin cambios.
+    """
+    if np is None:
+        raise ImportError("numpy es necesario para la compresión temporal (se instala con openai-whisper).")
+    samples = np.asarray(samples, dtype=np.float32)
+    if factor <= 1.0 or len(samples) == 0:
+        return samples
+    frame_length = 2 * max(1, int(FRAME_SEC * sample_rate) // 2)
+    synthesis_hop = frame_length // 2 # 50 %: las ventanas de Hann periódicas suman exactamente 1
+    analysis_hop = synthesis_hop * factor
+    output_length = int(len(samples) / factor)
+    frame_count = output_length // synthesis_hop + 1
+    window = np.hanning(frame_length + 1)[:-1].astype(np.float32)
+    starts = _aligned_starts(samples, frame_count, analysis_hop, synthesis_hop, int(SEARCH_SEC * sample_rate))
+
+    padded = np.concatenate((samples, np.zeros(frame_length, dtype=np.float32)))
+    frames = sliding_window_view(padded, frame_length) # Vista: no copia
+    # La salida en filas de 'synthesis_hop': la trama k suma su primera mitad en la fila k y la segunda en la k + 1
+    output = np.zeros((frame_count + 1, synthesis_hop), dtype=np.float32)
+    for block_start in range(0, frame_count, _FRAMES_PER_BLOCK):
+        block_end = min(frame_count, block_start + _FRAMES_PER_BLOCK)
+        windowed = frames[starts[block_start:block_end]] * window
+        output[block_start:block_end] += windowed[:, :synthesis_hop]
+        output[block_start + 1:block_end + 1] += windowed[:, synthesis_hop:]
+    return output.reshape(-1)[:output_length]
+
+def format_factor(factor: float) -> str:
+    """'1.25x', '1x'... (etiqueta para la interfaz y los informes)."""
+    return f"{factor:g}x"
+
+def parse_factor(label: str) -> float:
+    """Inverso de format_factor(); 1.0 si la etiqueta no es válida."""
+    try:
+        return max(1.0, float(label.strip().rstrip("x")))
+    except ValueError:
+        return 1.0
+
+def remap_segment(segment: dict, factor: float, duration_sec: float | None = None) -> dict:
+    """Lleva los tiempos de un segmento del audio acelerado a la línea temporal original (in situ)."""
+    for key in ("start", "end"):
+        if key in segment:
+            value = segment[key] * factor
+            segment[key] = min(value, duration_sec) if duration_sec is not None else value
+    return segment
@@ -0,0 +1,204 @@
+# transcript_index.py
+"""
+Índice de búsqueda de texto completo sobre todas las transcripciones terminadas.
+
+Cada resultado se guarda, segmento a segmento, en una base SQLite local: una tabla normal
+(archivo de origen, inicio, fin y texto, con índice por archivo) y sobre ella una tabla
+FTS5 de contenido externo que solo guarda el índice invertido. La búsqueda usa ese índice
+ordenado por relevancia (bm25) y reindexar o restaurar un archivo va por el índice de
+file_id, así que todo tarda milisegundos aunque haya años de notas de voz. Si la versión
+de SQLite no trae FTS5 se busca con LIKE sobre la tabla normal (más lento, pero funciona igual).
+"""
+
+import pathlib
+import sqlite3
+import threading
+import time
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    model TEXT,
+    language TEXT,
+    duration REAL,
+    indexed_at REAL NOT NULL
+);
+"""
+_SEGMENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    start_sec REAL,
+    end_sec REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS segments_file ON segments (file_id);
+"""
+# Índice FTS5 de contenido externo sobre 'segments' (el texto no se duplica), sincronizado con triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content = 'segments', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_au AFTER UPDATE ON segments BEGIN
+    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+
+def build_match_query(query: str) -> str:
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura: cada palabra entre
+    comillas (sin operadores ni sintaxis especial) y como prefijo, para que "núm factu"
+    encuentre "número de factura".
+    """
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in query.split())
+
+
+class TranscriptIndex:
+    """Índice SQLite (tabla de segmentos + FTS5 de contenido externo) de todas las transcripciones."""
+
+    def __init__(self, db_path: pathlib.Path | None = None):
+        self.db_path = pathlib.Path(db_path or config.TRANSCRIPT_INDEX_FILE)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Una sola conexión compartida entre hilos (GUI, vigilante), serializada con el lock
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+            legacy_rows = self._take_legacy_segments()
+            self._connection.executescript(_SEGMENTS_SCHEMA)
+            try:
+                self._connection.executescript(_FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError: # SQLite compilado sin FTS5
+                self.full_text = False
+            if legacy_rows:
+                self._connection.executemany("INSERT INTO segments (text, file_id, start_sec, end_sec) VALUES (?, ?, ?, ?)",
+                                             legacy_rows)
+                print(f"Índice de búsqueda: {len(legacy_rows)} segmentos migrados al formato con índice por archivo.")
+
+    def _take_legacy_segments(self) -> list[tuple]:
+        """
+        Índices creados por versiones anteriores: 'segments' era la propia tabla FTS5 (filtrar
+        por file_id la recorría entera). Devuelve sus filas y la elimina para crear el formato nuevo.
+        """
+        row = self._connection.execute("SELECT sql FROM sqlite_master WHERE name = 'segments'").fetchone()
+        if row is None or "VIRTUAL TABLE" not in (row["sql"] or "").upper():
+            return []
+        rows = [tuple(legacy) for legacy in
+                self._connection.execute("SELECT text, file_id, start_sec, end_sec FROM segments").fetchall()]
+        self._connection.execute("DROP TABLE segments")
+        return rows
+
+    def add_result(self, audio_path: pathlib.Path, result: dict, model_name: str | None = None) -> int:
+        """Indexa (o reindexa) los segmentos de un resultado. Devuelve el número de segmentos indexados."""
+        segments = [segment for segment in result.get("segments") or [] if segment.get("text", "").strip()]
+        path = str(pathlib.Path(audio_path).resolve())
+        duration = max((segment.get("end", 0.0) for segment in segments), default=None)
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                file_id = row["id"]
+                self._connection.execute("DELETE FROM segments WHERE file_id = ?", (file_id,))
+                self._connection.execute("UPDATE files SET model = ?, language = ?, duration = ?, indexed_at = ? WHERE id = ?",
+                                         (model_name, result.get("language"), duration, time.time(), file_id))
+            else:
+                file_id = self._connection.execute(
+                    "INSERT INTO files (path, model, language, duration, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                    (path, model_name, result.get("language"), duration, time.time())).lastrowid
+            self._connection.executemany(
+                "INSERT INTO segments (text, file_id, start_sec, end_sec) VALUES (?, ?, ?, ?)",
+                [(segment["text"].strip(), file_id, float(segment.get("start", 0.0)), float(segment.get("end", 0.0)))
+                 for segment in segments])
+        return len(segments)
+
+    def search(self, query: str, limit: int | None = None) -> list[dict]:
+        """
+        Busca 'query' en todos los segmentos indexados. Devuelve, de más a menos relevante,
+        [{"path", "model", "language", "start", "end", "text", "snippet"}].
+        """
+        limit = limit or config.TRANSCRIPT_SEARCH_LIMIT
+        if not query.strip():
+            return []
+        with self._lock:
+            if self.full_text:
+                rows = self._connection.execute(
+                    "SELECT files.path, files.model, files.language, segments.start_sec AS start, segments.end_sec AS \"end\", segments.text, "
+                    "snippet(segments_fts, 0, '[', ']', '…', 12) AS snippet "
+                    "FROM segments_fts JOIN segments ON segments.id = segments_fts.rowid "
+                    "JOIN files ON files.id = segments.file_id "
+                    "WHERE segments_fts MATCH ? ORDER BY bm25(segments_fts) LIMIT ?",
+                    (build_match_query(query), limit)).fetchall()
+            else:
+                rows = self._connection.execute(
+                    "SELECT files.path, files.model, files.language, segments.start_sec AS start, segments.end_sec AS \"end\", segments.text, "
+                    "segments.text AS snippet FROM segments JOIN files ON files.id = segments.file_id "
+                    "WHERE segments.text LIKE ? ORDER BY files.indexed_at DESC, segments.start_sec LIMIT ?",
+                    (f"%{query.strip()}%", limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def file_segments(self, audio_path: pathlib.Path) -> dict | None:
+        """Resultado indexado de un archivo ({"text", "segments", "language", "model"}), o None."""
+        path = str(pathlib.Path(audio_path).resolve())
+        with self._lock:
+            file_row = self._connection.execute("SELECT id, model, language FROM files WHERE path = ?", (path,)).fetchone()
+            if file_row is None:
+                return None
+            rows = self._connection.execute("SELECT text, start_sec, end_sec FROM segments WHERE file_id = ? ORDER BY start_sec",
+                                            (file_row["id"],)).fetchall()
+        # Se restaura el espacio inicial con el que Whisper separa los segmentos
+        segments = [{"id": index, "start": row["start_sec"], "end": row["end_sec"], "text": " " + row["text"]}
+                    for index, row in enumerate(rows)]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments,
+                "language": file_row["language"], "model": file_row["model"]}
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            segments = self._connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {"files": files, "segments": segments, "full_text": self.full_text}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_index: TranscriptIndex | None = None
+_index_lock = threading.Lock()
+
+def get_index() -> TranscriptIndex | None:
+    """Índice compartido del proceso (se abre la primera vez). None si no se puede abrir."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = TranscriptIndex()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Advertencia: No se pudo abrir el índice de búsqueda {config.TRANSCRIPT_INDEX_FILE}: {e}")
+                return None
+        return _index
+
+def index_result(audio_path: pathlib.Path, result: dict, model_name: str | None = None):
+    """Indexa un resultado terminado en el índice compartido (los errores solo se avisan)."""
+    if not config.TRANSCRIPT_INDEX_ENABLED:
+        return
+    index = get_index()
+    if index is None:
+        return
+    try:
+        count = index.add_result(audio_path, result, model_name)
+        print(f"Índice de búsqueda: {pathlib.Path(audio_path).name} ({count} segmentos).")
+    except sqlite3.Error as e:
+        print(f"Advertencia: No se pudo indexar {pathlib.Path(audio_path).name}: {e}")
@@ -0,0 +1,447 @@
+# transcription_engines.py
+"""
+Motores de transcripción intercambiables.
+
+Todos los motores exponen la misma interfaz (TranscriptionEngine) y devuelven
+resultados con el formato de openai-whisper: {"text", "segments", "language"}, donde
+cada segmento es un dict con al menos "start", "end" y "text".
+Una instancia de motor representa UN modelo cargado.
+"""
+
+import contextlib
+import os
+import pathlib
+import time
+import wave
+import config
+import metrics
+import windowed_transcription
+
+try:
+    import whisper
+    import torch # Whisper depende de PyTorch, si whisper se importa torch también está
+except ImportError:
+    print("ADVERTENCIA: La librería 'whisper' no está instalada. La funcionalidad de Whisper no estará disponible.")
+    print("Instálala con: pip install -U openai-whisper")
+    whisper = None # Placeholder
+    torch = None
+
+try:
+    import faster_whisper # Opcional: backend CTranslate2, más rápido en CPU
+except ImportError:
+    faster_whisper = None
+
+
+class TranscriptionEngine:
+    """Interfaz común de los motores de transcripción."""
+
+    name = "base"
+    # Capacidades del motor:
+    #   streaming: iter_segments() entrega segmentos a medida que se decodifican.
+    #   precisions: modos de precisión soportados (ver config.WHISPER_PRECISION_MODES).
+    #   speed_rank: mayor = más rápido en CPU; se usa para la selección automática.
+    capabilities = {"streaming": False, "precisions": ["fp32"], "speed_rank": 0}
+
+    def __init__(self):
+        self.model_name: str | None = None
+        self.precision: str | None = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """True si las dependencias del motor están instaladas."""
+        return False
+
+    @classmethod
+    def resolve_precision(cls, precision: str | None) -> str:
+        """Devuelve el modo de precisión que realmente se usará (con fallback a fp32)."""
+        precision = precision or config.DEFAULT_WHISPER_PRECISION
+        if precision not in cls.capabilities["precisions"]:
+            print(f"ADVERTENCIA: El motor '{cls.name}' no soporta la precisión '{precision}'. Se usará fp32.")
+            return "fp32"
+        return precision
+
+    def load(self, model_name: str, precision: str = "fp32"):
+        """Carga el modelo (bloqueante). La precisión debe venir ya resuelta."""
+        raise NotImplementedError
+
+    def transcribe(self, audio, **options) -> dict:
+        """Transcribe el audio completo y devuelve el dict de resultado estilo Whisper."""
+        segments = list(self.iter_segments(audio, **options))
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": options.get("language") or config.TARGET_LANGUAGE,
+        }
+
+    def iter_segments(self, audio, **options):
+        """Generador de segmentos (dicts). Los motores sin streaming los entregan al final."""
+        raise NotImplementedError
+
+    def detect_language(self, audio) -> tuple[str, float]:
+        """Idioma más probable de un fragmento (array float32 a 16 kHz). Devuelve (código, probabilidad)."""
+        raise NotImplementedError
+
+
+# --- Motor openai-whisper (PyTorch) ---
+
+def _bf16_supported() -> bool:
+    """Comprueba si la CPU soporta bfloat16 de forma nativa (AVX512-BF16, AMX o ARM BF16)."""
+    if torch is None:
+        return False
+    try:
+        # API interna de PyTorch (>= 1.13), la más fiable si existe
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        pass
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags or " bf16" in flags
+    except OSError:
+        return False
+
+def _quantized_cache_path(model_name: str, precision: str) -> pathlib.Path:
+    """Ruta del modelo cuantizado en disco (depende de la versión de torch, el formato no es portable)."""
+    torch_tag = torch.__version__.split("+")[0]
+    return pathlib.Path(config.QUANTIZED_MODELS_DIR) / f"{model_name}_{precision}_torch{torch_tag}.pt"
+
+def _replace_whisper_linear(module):
+    """
+    Sustituye recursivamente whisper.model.Linear por torch.nn.Linear.
+    quantize_dynamic solo reconoce el tipo exacto nn.Linear, no subclases.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, whisper.model.Linear):
+            plain_linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain_linear.weight = child.weight
+            plain_linear.bias = child.bias
+            setattr(module, name, plain_linear)
+        else:
+            _replace_whisper_linear(child)
+
+def _mmap_cache_path(model_name: str) -> pathlib.Path:
+    torch_tag = torch.__version__.split("+")[0]
+    return pathlib.Path(config.MMAP_MODELS_DIR) / f"{model_name}_fp32_torch{torch_tag}.pt"
+
+def _load_whisper_model_mmap(model_name: str):
+    """
+    Carga los pesos fp32 en CPU por memory-map. La primera vez se carga el checkpoint oficial
+    y se guarda solo el state_dict (formato zip de torch, cuyos tensores se pueden mapear);
+    después torch.load(mmap=True) no lee el archivo entero: las páginas se traen bajo demanda
+    y, al ser de un archivo, la caché de páginas la comparten todos los procesos que usan el
+    mismo modelo. El modelo se construye en el dispositivo "meta" (sin reservar memoria) y
+    los pesos mapeados se asignan directamente, sin copiarlos.
+    """
+    cache_path = _mmap_cache_path(model_name)
+    if cache_path.exists():
+        try:
+            checkpoint = torch.load(str(cache_path), map_location="cpu", mmap=True, weights_only=True)
+            with torch.device("meta"):
+                model = whisper.model.Whisper(whisper.model.ModelDimensions(**checkpoint["dims"]))
+            model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+            # Buffers no persistentes (no están en el state_dict): se crean como en whisper.load_model()
+            n_ctx = model.dims.n_text_ctx
+            model.decoder.register_buffer("mask", torch.empty(n_ctx, n_ctx).fill_(-float("inf")).triu_(1), persistent=False)
+            if model_name in whisper._ALIGNMENT_HEADS:
+                model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_name])
+            else:
+                all_heads = torch.zeros(model.dims.n_text_layer, model.dims.n_text_head, dtype=torch.bool)
+                all_heads[model.dims.n_text_layer // 2:] = True
+                model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+            leftover = [name for name, tensor in list(model.named_parameters()) + list(model.named_buffers()) if tensor.is_meta]
+            if leftover: # Versión de whisper con otros buffers: mejor la carga normal que un modelo incompleto
+                raise RuntimeError(f"tensores sin inicializar: {', '.join(leftover)}")
+            print(f"Pesos de '{model_name}' cargados por memory-map desde {cache_path.name}.")
+            metrics.record_cache("mmap_weights", hit=True)
+            return model
+        except Exception as e: # torch antiguo (sin mmap/assign) o archivo dañado
+            print(f"Advertencia: No se pudo cargar '{model_name}' por memory-map ({e}). Se usa la carga normal.")
+            metrics.record_cache("mmap_weights", hit=False)
+            return whisper.load_model(model_name, device="cpu")
+
+    metrics.record_cache("mmap_weights", hit=False)
+    model = whisper.load_model(model_name, device="cpu")
+    try:
+        print(f"Guardando '{model_name}' en formato memory-map (solo la primera vez)...")
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        torch.save({"dims": vars(model.dims), "model_state_dict": model.state_dict()}, str(tmp_path))
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Advertencia: No se pudo guardar el modelo en formato memory-map: {e}")
+    return model
+
+def _load_whisper_model(model_name: str, precision: str = "fp32"):
+    """
+    Carga el modelo Whisper en el modo de precisión indicado.
+    En CPU, fp32 y bf16 cargan los pesos por memory-map (config.MMAP_MODEL_WEIGHTS).
+    Para "int8" se reutiliza el modelo cuantizado guardado en disco; si no existe se cuantiza
+    y se guarda, de modo que el coste de la cuantización se paga una sola vez.
+    """
+    use_mmap = config.MMAP_MODEL_WEIGHTS and not torch.cuda.is_available() # En GPU los pesos se copian a la VRAM
+    if precision == "fp32":
+        return _load_whisper_model_mmap(model_name) if use_mmap else whisper.load_model(model_name)
+    if precision == "bf16":
+        # bf16 se aplica con autocast durante la transcripción, solo hay que forzar CPU
+        return _load_whisper_model_mmap(model_name) if config.MMAP_MODEL_WEIGHTS else whisper.load_model(model_name, device="cpu")
+
+    cache_path = _quantized_cache_path(model_name, precision)
+    if cache_path.exists():
+        try:
+            print(f"Cargando modelo cuantizado desde caché: {cache_path.name}")
+            model = torch.load(str(cache_path), map_location="cpu", weights_only=False)
+            metrics.record_cache("int8_weights", hit=True)
+            return model
+        except Exception as e:
+            print(f"Advertencia: No se pudo leer el modelo cuantizado en caché ({e}). Se regenerará.")
+    metrics.record_cache("int8_weights", hit=False)
+
+    print(f"Cuantizando modelo '{model_name}' a int8 (solo la primera vez)...")
+    model = whisper.load_model(model_name, device="cpu")
+    _replace_whisper_linear(model)
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        torch.save(model, str(tmp_path))
+        os.replace(tmp_path, cache_path) # Escritura atómica, evita cachés corruptas
+        print(f"Modelo cuantizado guardado en: {cache_path}")
+    except Exception as e:
+        print(f"Advertencia: No se pudo guardar el modelo cuantizado en disco: {e}")
+    return model
+
+def _precision_context(precision: str):
+    """Contexto de ejecución para el modo de precisión (autocast bf16 o nada)."""
+    if precision == "bf16":
+        return torch.autocast(device_type="cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
+class WhisperEngine(TranscriptionEngine):
+    """Motor original basado en openai-whisper."""
+
+    name = "whisper"
+    # Streaming por ventanas en los archivos largos (windowed_transcription); los cortos llegan al terminar
+    capabilities = {"streaming": True, "precisions": ["fp32", "int8", "bf16"], "speed_rank": 1}
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return whisper is not None
+
+    @classmethod
+    def resolve_precision(cls, precision: str | None) -> str:
+        precision = super().resolve_precision(precision)
+        if precision == "bf16" and not _bf16_supported():
+            print("ADVERTENCIA: La CPU no soporta bfloat16 de forma nativa. Se usará fp32.")
+            return "fp32"
+        return precision
+
+    def load(self, model_name: str, precision: str = "fp32"):
+        self.model = _load_whisper_model(model_name, precision)
+        self.model_name = model_name
+        self.precision = precision
+
+    def _windowed(self, audio, options: dict):
+        """Transcripción por ventanas en memoria constante (archivos largos), o None si no procede."""
+        if not windowed_transcription.should_use(audio, options):
+            return None
+        return windowed_transcription.WindowedTranscription(
+            self.model, audio, precision_context=lambda: _precision_context(self.precision), **options)
+
+    def transcribe(self, audio, **options) -> dict:
+        windowed = self._windowed(audio, options)
+        if windowed is not None:
+            segments = list(windowed)
+            return {"text": "".join(segment["text"] for segment in segments), "segments": segments,
+                    "language": windowed.language}
+        with _precision_context(self.precision):
+            return self.model.transcribe(audio, **options)
+
+    def iter_segments(self, audio, **options):
+        windowed = self._windowed(audio, options)
+        if windowed is not None: # Los segmentos salen a medida que se decodifica cada ventana
+            yield from windowed
+            return
+        # openai-whisper no expone un generador: los segmentos llegan al terminar
+        yield from self.transcribe(audio, **options).get("segments", [])
+
+    def detect_language(self, audio) -> tuple[str, float]:
+        # Una sola pasada del codificador sobre 30 s de audio (sin decodificar texto)
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels).to(self.model.device)
+        with torch.no_grad(), _precision_context(self.precision):
+            _tokens, probabilities = self.model.detect_language(mel)
+        language = max(probabilities, key=probabilities.get)
+        return language, float(probabilities[language])
+
+
+# --- Motor faster-whisper (CTranslate2) ---
+
+# Equivalencias de precisión -> compute_type de CTranslate2
+_CT2_COMPUTE_TYPES = {"fp32": "float32", "int8": "int8", "bf16": "bfloat16"}
+
+# Opciones de transcribe() de openai-whisper que faster-whisper llama de otra forma o no admite
+_FASTER_WHISPER_RENAMED_OPTIONS = {"logprob_threshold": "log_prob_threshold"}
+_FASTER_WHISPER_IGNORED_OPTIONS = {"fp16", "verbose"}
+# None en openai-whisper = greedy / una sola muestra; faster-whisper usaría sus valores por defecto (5)
+_FASTER_WHISPER_NONE_VALUES = {"beam_size": 1, "best_of": 1}
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """Motor opcional basado en faster-whisper (CTranslate2), con streaming real de segmentos."""
+
+    name = "faster-whisper"
+    capabilities = {"streaming": True, "precisions": ["fp32", "int8", "bf16"], "speed_rank": 2}
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return faster_whisper is not None
+
+    def load(self, model_name: str, precision: str = "fp32"):
+        self.model = faster_whisper.WhisperModel(
+            model_name, device="cpu", compute_type=_CT2_COMPUTE_TYPES[precision],
+            cpu_threads=os.cpu_count() or 0
+        )
+        self.model_name = model_name
+        self.precision = precision
+
+    def _translate_options(self, options: dict) -> dict:
+        translated = {}
+        for key, value in options.items():
+            if key in _FASTER_WHISPER_IGNORED_OPTIONS:
+                continue
+            if value is None and key in _FASTER_WHISPER_NONE_VALUES:
+                value = _FASTER_WHISPER_NONE_VALUES[key]
+            translated[_FASTER_WHISPER_RENAMED_OPTIONS.get(key, key)] = value
+        return translated
+
+    def transcribe(self, audio, **options) -> dict:
+        segments_iter, info = self.model.transcribe(audio, **self._translate_options(options))
+        segments = [self._segment_to_dict(segment) for segment in segments_iter]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+    def iter_segments(self, audio, **options):
+        segments_iter, _info = self.model.transcribe(audio, **self._translate_options(options))
+        for segment in segments_iter: # Generador perezoso: decodifica ventana a ventana
+            yield self._segment_to_dict(segment)
+
+    def detect_language(self, audio) -> tuple[str, float]:
+        # transcribe() detecta el idioma al llamarse; sin consumir el generador no se decodifica nada
+        _segments_iter, info = self.model.transcribe(audio, language=None)
+        return info.language, float(info.language_probability)
+
+    @staticmethod
+    def _segment_to_dict(segment) -> dict:
+        return {
+            "id": segment.id,
+            "seek": segment.seek,
+            "start": segment.start,
+            "end": segment.end,
+            "text": segment.text,
+            "tokens": list(segment.tokens),
+            "temperature": segment.temperature,
+            "avg_logprob": segment.avg_logprob,
+            "compression_ratio": segment.compression_ratio,
+            "no_speech_prob": segment.no_speech_prob,
+        }
+
+
+# --- Motor falso determinista (pruebas y benchmarks) ---
+
+class FakeEngine(TranscriptionEngine):
+    """
+    Motor determinista sin dependencias: genera segmentos sintéticos a partir de la
+    duración del audio. Pensado para pruebas y benchmarks de la GUI.
+    """
+
+    name = "fake"
+    capabilities = {"streaming": True, "precisions": ["fp32", "int8", "bf16"], "speed_rank": 0}
+    DEFAULT_DURATION_SEC = 30.0
+
+    def __init__(self, segment_duration: float = 2.0, delay_per_segment: float = 0.0):
+        super().__init__()
+        self.segment_duration = segment_duration
+        self.delay_per_segment = delay_per_segment # Para simular un motor lento
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    def load(self, model_name: str, precision: str = "fp32"):
+        self.model_name = model_name
+        self.precision = precision
+
+    def _audio_duration(self, audio) -> float:
+        if isinstance(audio, (str, pathlib.Path)) and str(audio).lower().endswith(".wav"):
+            try:
+                with wave.open(str(audio), "rb") as wav_file:
+                    return wav_file.getnframes() / float(wav_file.getframerate())
+            except (OSError, wave.Error):
+                pass
+        elif hasattr(audio, "__len__") and not isinstance(audio, (str, pathlib.Path)):
+            return len(audio) / 16000.0 # Array de muestras a 16 kHz, como en Whisper
+        return self.DEFAULT_DURATION_SEC
+
+    def iter_segments(self, audio, **options):
+        duration = self._audio_duration(audio)
+        index = 0
+        start = 0.0
+        while start < duration:
+            if self.delay_per_segment:
+                time.sleep(self.delay_per_segment)
+            end = min(start + self.segment_duration, duration)
+            yield {
+                "id": index, "seek": int(start * 100), "start": start, "end": end,
+                "text": f" Segmento {index} ({self.model_name}).",
+                "tokens": [], "temperature": 0.0, "avg_logprob": -0.1,
+                "compression_ratio": 1.0, "no_speech_prob": 0.0,
+            }
+            index += 1
+            start = end
+
+    def detect_language(self, audio) -> tuple[str, float]:
+        return config.TARGET_LANGUAGE, 1.0
+
+
+# --- Registro y selección de motores ---
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+    FakeEngine.name: FakeEngine,
+}
+
+def available_engines(include_fake: bool = False) -> list[str]:
+    """Nombres de los motores instalados, del más rápido al más lento."""
+    names = [name for name, engine_cls in ENGINES.items()
+             if engine_cls.is_available() and (include_fake or name != FakeEngine.name)]
+    return sorted(names, key=lambda name: ENGINES[name].capabilities["speed_rank"], reverse=True)
+
+def select_engine_name(preferred: str | None = None) -> str | None:
+    """
+    Devuelve el motor a usar: el preferido si está disponible; si es None o "auto",
+    el más rápido instalado. None si no hay ninguno.
+    """
+    preferred = preferred or config.TRANSCRIPTION_ENGINE
+    if preferred and preferred != "auto":
+        if preferred in ENGINES and ENGINES[preferred].is_available():
+            return preferred
+        print(f"ADVERTENCIA: Motor '{preferred}' no disponible. Se elegirá automáticamente.")
+    installed = available_engines()
+    return installed[0] if installed else None
+
+def create_engine(name: str | None = None) -> TranscriptionEngine | None:
+    """Crea una instancia (sin modelo cargado) del motor indicado o del más rápido disponible."""
+    engine_name = select_engine_name(name)
+    return ENGINES[engine_name]() if engine_name else None
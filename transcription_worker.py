@@ -0,0 +1,298 @@
+# transcription_worker.py
+"""
+Proceso de trabajo supervisado para la transcripción.
+
+La inferencia en un hilo de la propia aplicación compite por el GIL con Tkinter (la
+ventana se entrecorta) y no se puede interrumpir: transcribe() no tiene puntos de
+cancelación. Aquí el modelo se carga en un proceso hijo que recibe peticiones y devuelve
+los segmentos por una tubería (mensajes pickle sobre stdin/stdout del hijo). Así:
+  - detener es inmediato: se mata el proceso y se arranca otro que vuelve a cargar el
+    modelo en segundo plano (con los pesos por memory-map la recarga es casi instantánea);
+  - si el proceso muere (falta de memoria, fallo de una librería nativa) la aplicación
+    sigue viva y el siguiente trabajo usa un proceso nuevo;
+  - si la memoria privada del proceso crece más de config.WORKER_MAX_MEMORY_GROWTH_MB
+    sobre la que tenía tras cargar el modelo, se recicla al terminar el trabajo.
+El hilo de transcripción de la aplicación solo lee mensajes de la tubería.
+
+Los modelos solo se cargan aquí, nunca también en la aplicación: el principal al arrancar
+y los auxiliares (borrador del modo progresivo, detección de idioma, variantes .en, modelo
+de revisión) la primera vez que una petición los nombra. El proceso acepta rutas o arrays,
+así que todo lo que transcribe se detiene al instante: archivos completos (GUI, cola de
+archivos, carpeta vigilada), notas de WhatsApp, detección de idioma, borrador y refinado
+progresivo, fragmentos de Depurar y revisión de segmentos dudosos.
+"""
+
+import os
+import pathlib
+import pickle
+import subprocess
+import sys
+import threading
+import config
+
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class TranscriptionCancelled(Exception):
+    """La transcripción se detuvo a petición del usuario."""
+
+
+class WorkerCrashed(RuntimeError):
+    """El proceso de trabajo terminó a mitad de una tarea."""
+
+
+class TranscriptionWorker:
+    """
+    Supervisa un proceso hijo con el modelo cargado. Un trabajo a la vez: iter_segments()
+    envía la petición y entrega los segmentos según llegan; cancel() mata el proceso.
+    """
+
+    def __init__(self, model_name: str, precision: str, engine_name: str):
+        self.model_name = model_name
+        self.precision = precision
+        self.engine_name = engine_name
+        self.restarts = 0 # Procesos arrancados después del primero (cancelaciones, caídas, reciclados)
+        self.baseline_memory_mb = None # Memoria del proceso actual tras cargar el modelo
+        self._lock = threading.Lock()
+        self._process = None
+        self._loaded = False # El proceso actual ya confirmó la carga del modelo
+        self._cancelled = False
+        self._job_counter = 0
+        self._spawn()
+
+    def _spawn(self):
+        """Arranca un proceso nuevo (el modelo se carga en segundo plano; se espera al primer trabajo)."""
+        self._process = subprocess.Popen(
+            [sys.executable, str(pathlib.Path(__file__).resolve()), self.model_name, self.precision, self.engine_name],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=str(pathlib.Path(__file__).resolve().parent))
+        self._loaded = False
+        self.baseline_memory_mb = None
+        print(f"Proceso de transcripción arrancado (pid {self._process.pid}, modelo '{self.model_name}').")
+
+    def _kill(self, process):
+        """Termina un proceso sin esperar a que acabe lo que estuviera haciendo."""
+        if process.poll() is None:
+            process.kill()
+        try:
+            process.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            print(f"Advertencia: El proceso de transcripción {process.pid} no terminó tras kill().")
+        for stream in (process.stdin, process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _respawn(self, reason: str):
+        """Sustituye el proceso actual por uno nuevo (con el lock tomado)."""
+        print(f"Reiniciando el proceso de transcripción ({reason}).")
+        self._kill(self._process)
+        self.restarts += 1
+        self._spawn()
+
+    def _receive(self, process):
+        """Siguiente mensaje del hijo. EOF = el proceso murió (o se mató al cancelar)."""
+        try:
+            return pickle.load(process.stdout)
+        except (EOFError, OSError, ValueError, pickle.UnpicklingError):
+            process.wait()
+            with self._lock:
+                cancelled = self._cancelled
+                if not cancelled and process is self._process:
+                    self._respawn(f"terminó inesperadamente con código {process.returncode}")
+            if cancelled:
+                raise TranscriptionCancelled("Transcripción detenida.")
+            raise WorkerCrashed(f"El proceso de transcripción terminó inesperadamente (código {process.returncode}).")
+
+    def wait_ready(self, process=None, stop_event: threading.Event | None = None):
+        """
+        Espera a que el proceso confirme la carga del modelo. Lanza RuntimeError si no pudo
+        cargarlo y TranscriptionCancelled si stop_event se activa antes (se mata el proceso).
+        """
+        if process is None:
+            with self._lock:
+                process = self._process
+        if self._loaded:
+            return
+        waiting = threading.Event()
+        if stop_event is not None:
+            def watch_stop(): # La lectura de la tubería bloquea: se interrumpe matando el proceso
+                while not waiting.wait(0.1):
+                    if stop_event.is_set():
+                        with self._lock:
+                            self._cancelled = True
+                        self._kill(process)
+                        return
+            threading.Thread(target=watch_stop, daemon=True).start()
+        try:
+            kind, _job, payload = self._receive(process)
+        finally:
+            waiting.set()
+        if kind == "error":
+            with self._lock:
+                self._respawn("no pudo cargar el modelo")
+            raise RuntimeError(payload)
+        self._loaded = True
+        self.baseline_memory_mb = payload.get("memory_mb")
+
+    def iter_segments(self, audio, options: dict, speed_factor: float = 1.0, model_name: str | None = None):
+        """
+        Transcribe 'audio' (ruta, o array mono float32 a 16 kHz) en el proceso hijo y devuelve
+        sus segmentos según llegan (ya con los tiempos en la línea temporal original si
+        speed_factor > 1). model_name: modelo auxiliar (None = el principal). Lanza
+        TranscriptionCancelled si se llama a cancel() y WorkerCrashed si el proceso muere.
+        """
+        for _kind, segment in self._run_job("transcribe", audio, options, speed_factor, model_name):
+            yield segment
+
+    def detect_language(self, audio, model_name: str) -> tuple[str, float]:
+        """Idioma de 'audio' (array de la ventana a analizar) con el modelo indicado: (idioma, probabilidad)."""
+        detection = None
+        for _kind, payload in self._run_job("detect", audio, None, 1.0, model_name): # Hasta "done": no abandonar el trabajo
+            detection = payload
+        if detection is None:
+            raise RuntimeError("El proceso de transcripción no devolvió el idioma.")
+        return detection
+
+    def _run_job(self, job_kind: str, audio, options: dict | None, speed_factor: float, model_name: str | None):
+        """Envía una petición al hijo y entrega sus mensajes ("segment" o "result", payload) según llegan."""
+        with self._lock:
+            self._cancelled = False
+            self._job_counter += 1
+            job_id = self._job_counter
+            process = self._process
+        self.wait_ready(process)
+        if isinstance(audio, (str, pathlib.Path)):
+            # Ruta absoluta: el hijo se ejecuta con el directorio del paquete como cwd, no el del llamante
+            audio = str(pathlib.Path(audio).resolve())
+        try:
+            pickle.dump((job_id, job_kind, audio, options, speed_factor, model_name), process.stdin, protocol=_PROTOCOL)
+            process.stdin.flush()
+        except OSError:
+            self._receive(process) # El proceso ya no está: _receive() distingue cancelación y caída
+        finished = False
+        try:
+            while True:
+                kind, message_job, payload = self._receive(process)
+                if message_job != job_id:
+                    continue
+                if kind in ("segment", "result"):
+                    yield kind, payload
+                elif kind == "error":
+                    finished = True
+                    raise RuntimeError(payload)
+                elif kind == "done":
+                    finished = True
+                    if payload.get("baseline_mb") is not None: # Ha cargado un modelo auxiliar
+                        self.baseline_memory_mb = payload["baseline_mb"]
+                    self._check_memory(payload.get("memory_mb"))
+                    return
+        finally:
+            with self._lock: # Trabajo abandonado a medias: el proceso seguiría ocupado con él
+                if not finished and process is self._process and process.poll() is None:
+                    self._respawn("trabajo abandonado")
+
+    def _check_memory(self, memory_mb: float | None):
+        """Recicla el proceso si su memoria ha crecido demasiado desde que cargó el modelo."""
+        if memory_mb is None or self.baseline_memory_mb is None:
+            return
+        growth = memory_mb - self.baseline_memory_mb
+        if growth > config.WORKER_MAX_MEMORY_GROWTH_MB:
+            with self._lock:
+                self._respawn(f"la memoria creció {growth:.0f} MB desde la carga del modelo")
+
+    def cancel(self):
+        """Detiene el trabajo en curso matando el proceso y deja otro cargando el modelo."""
+        with self._lock:
+            self._cancelled = True
+            self._respawn("transcripción detenida")
+
+    def shutdown(self):
+        """Cierra el proceso (al salir de la aplicación o al cambiar de modelo)."""
+        with self._lock:
+            self._cancelled = True
+            process = self._process
+            try:
+                pickle.dump(None, process.stdin, protocol=_PROTOCOL) # Salida ordenada si está libre
+                process.stdin.flush()
+                process.wait(timeout=2.0)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            self._kill(process)
+
+
+# --- Proceso hijo ---
+
+def _memory_mb() -> float | None:
+    """Memoria privada del proceso (sin las páginas de los pesos mapeados); RSS si no se puede medir."""
+    import utils
+    return utils.get_process_anonymous_mb() or utils.get_process_rss_mb()
+
+def _worker_main(model_name: str, precision: str, engine_name: str) -> int:
+    """
+    Bucle del proceso hijo: carga el modelo principal una vez, los auxiliares cuando se piden,
+    y atiende peticiones hasta recibir None.
+    """
+    # stdout queda reservado para los mensajes: los print() de las librerías van a stderr
+    channel_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    channel_in = sys.stdin.buffer
+
+    def send(kind, job_id, payload):
+        pickle.dump((kind, job_id, payload), channel_out, protocol=_PROTOCOL)
+        channel_out.flush()
+
+    import audio_stream
+    import time_compression
+    import transcription_engines
+    from segment_store import slim_segment
+    try:
+        engine = transcription_engines.ENGINES[engine_name]()
+        engine.load(model_name, precision)
+    except Exception as e:
+        send("error", None, f"El proceso de transcripción no pudo cargar '{model_name}': {e}")
+        return 1
+    send("ready", None, {"pid": os.getpid(), "memory_mb": _memory_mb()})
+    engines = {model_name: engine}
+
+    def engine_for(name: str | None) -> tuple:
+        """Motor del modelo pedido y, si se acaba de cargar, la memoria de referencia nueva."""
+        name = name or model_name
+        if name in engines:
+            return engines[name], None
+        print(f"Cargando modelo auxiliar '{name}' ({precision}, {engine_name}) en el proceso de transcripción...")
+        auxiliary = transcription_engines.ENGINES[engine_name]()
+        auxiliary.load(name, precision)
+        engines[name] = auxiliary
+        return auxiliary, _memory_mb()
+
+    while True:
+        try:
+            request = pickle.load(channel_in)
+        except EOFError:
+            return 0
+        if request is None:
+            return 0
+        job_id, job_kind, audio_input, options, speed_factor, job_model = request
+        try:
+            job_engine, baseline_mb = engine_for(job_model)
+            if job_kind == "detect":
+                send("result", job_id, job_engine.detect_language(audio_input))
+                send("done", job_id, {"memory_mb": _memory_mb(), "baseline_mb": baseline_mb})
+                continue
+            if speed_factor > 1.0: # La compresión también fuera del proceso de la interfaz
+                samples = audio_stream.load_float32(pathlib.Path(audio_input)) if isinstance(audio_input, str) else audio_input
+                original_duration = len(samples) / audio_stream.WHISPER_SAMPLE_RATE
+                audio_input = time_compression.compress(samples, speed_factor)
+                del samples
+            for segment in job_engine.iter_segments(audio_input, **options):
+                if speed_factor > 1.0:
+                    segment = time_compression.remap_segment(dict(segment), speed_factor, original_duration)
+                send("segment", job_id, slim_segment(segment))
+            send("done", job_id, {"memory_mb": _memory_mb(), "baseline_mb": baseline_mb})
+        except Exception as e:
+            send("error", job_id, str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(_worker_main(*sys.argv[1:4]))
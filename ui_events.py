@@ -0,0 +1,136 @@
+# ui_events.py
+"""
+Cola de eventos entre los hilos de trabajo y Tkinter.
+
+Los hilos (conversión, carga del modelo, transcripción) no tocan Tk: publican eventos en
+una cola protegida por un lock y el hilo de Tk la vacía con un sondeo periódico (after).
+Los eventos con la misma clave de fusión (estado, progreso) que aún no se han entregado
+se sustituyen por el más reciente, así una ráfaga de mensajes no inunda el bucle de
+eventos. El resto de eventos (finalizaciones, resultados) se entregan siempre, en el
+orden en que se publicaron.
+"""
+
+import collections
+import threading
+import time
+import config
+
+
+class _Event:
+    __slots__ = ("callback", "args", "coalesce_key", "posted_at", "cancelled")
+
+    def __init__(self, callback, args: tuple, coalesce_key: str | None):
+        self.callback = callback
+        self.args = args
+        self.coalesce_key = coalesce_key
+        self.posted_at = time.perf_counter()
+        self.cancelled = False
+
+
+class UIEventQueue:
+    """Cola FIFO thread-safe de callbacks para ejecutar en el hilo de Tk, con fusión por clave."""
+
+    def __init__(self, poll_interval_ms: int | None = None, batch_budget_ms: int | None = None):
+        self.poll_interval_ms = poll_interval_ms or config.UI_EVENT_POLL_MS
+        self.batch_budget_ms = batch_budget_ms or config.UI_EVENT_BATCH_MS
+        self._lock = threading.Lock()
+        self._events: collections.deque[_Event] = collections.deque()
+        self._pending_by_key: dict[str, _Event] = {} # Clave de fusión -> evento pendiente
+        self._root = None
+        self._poll_id = None
+        # Métricas
+        self.posted = 0
+        self.coalesced = 0
+        self.dispatched = 0
+        self.max_depth = 0
+        self.total_latency_sec = 0.0
+        self.max_latency_sec = 0.0
+
+    def post(self, callback, *args, coalesce_key: str | None = None):
+        """
+        Encola callback(*args) para el hilo de Tk (se puede llamar desde cualquier hilo).
+        Si coalesce_key no es None, sustituye al evento pendiente con la misma clave; el nuevo
+        va al final de la cola para no adelantarse a eventos publicados antes que él.
+        """
+        event = _Event(callback, args, coalesce_key)
+        with self._lock:
+            if coalesce_key is not None:
+                previous = self._pending_by_key.get(coalesce_key)
+                if previous is not None:
+                    previous.cancelled = True
+                    self.coalesced += 1
+                self._pending_by_key[coalesce_key] = event
+            self._events.append(event)
+            self.posted += 1
+            self.max_depth = max(self.max_depth, len(self._events))
+
+    def wrap(self, callback, coalesce_key: str | None = None):
+        """Devuelve una función que, al llamarla desde un hilo, publica callback con sus argumentos."""
+        return lambda *args: self.post(callback, *args, coalesce_key=coalesce_key)
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+    def start(self, root):
+        """Empieza a vaciar la cola periódicamente desde el bucle de eventos de 'root'."""
+        self._root = root
+        self._schedule()
+
+    def stop(self):
+        if self._root is not None and self._poll_id is not None:
+            try:
+                self._root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+        self._poll_id = None
+        self._root = None
+
+    def _schedule(self):
+        if self._root is not None:
+            self._poll_id = self._root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self):
+        self.drain()
+        self._schedule()
+
+    def drain(self):
+        """
+        Ejecuta eventos pendientes (en el hilo de Tk) hasta agotar la cola o el presupuesto de
+        tiempo del lote; lo que quede se entrega en el siguiente sondeo.
+        """
+        deadline = time.perf_counter() + self.batch_budget_ms / 1000.0
+        while True:
+            with self._lock:
+                if not self._events:
+                    return
+                event = self._events.popleft()
+                if event.coalesce_key is not None and self._pending_by_key.get(event.coalesce_key) is event:
+                    del self._pending_by_key[event.coalesce_key]
+            if event.cancelled:
+                continue
+            latency = time.perf_counter() - event.posted_at
+            self.dispatched += 1
+            self.total_latency_sec += latency
+            self.max_latency_sec = max(self.max_latency_sec, latency)
+            try:
+                event.callback(*event.args)
+            except Exception as e:
+                # Un callback con error no debe detener la entrega del resto de eventos
+                print(f"Error en evento de la interfaz ({getattr(event.callback, '__name__', event.callback)}): {e}")
+            if time.perf_counter() >= deadline:
+                return
+
+    def stats(self) -> dict:
+        """Métricas de la cola: eventos publicados/fusionados/entregados, profundidad y latencia."""
+        with self._lock:
+            depth = len(self._events)
+        return {
+            "posted": self.posted,
+            "coalesced": self.coalesced,
+            "dispatched": self.dispatched,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "avg_latency_ms": 1000.0 * self.total_latency_sec / self.dispatched if self.dispatched else 0.0,
+            "max_latency_ms": 1000.0 * self.max_latency_sec,
+        }
@@ -4,9 +4,11 @@
 import subprocess
 import platform
 import os
+import pathlib
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import config
+import exporters
 
 try:
     import torch
@@ -36,21 +38,33 @@ def copy_to_clipboard(window: tk.Tk, text: str):
         messagebox.showwarning("Copiar Error", f"No se pudo copiar el texto:\n{e}")
 
 
-def export_text_to_file(text: str, title: str):
-    """Abre un diálogo para guardar el texto en un archivo .txt."""
+def export_text_to_file(text: str, title: str, segments: list | None = None):
+    """
+    Abre un diálogo para guardar el texto en un archivo .txt.
+    Si se pasan segmentos, también permite exportar con marcas de tiempo (.srt, .vtt, .jsonl);
+    su texto es el que se exporta, así que deben llevar las ediciones del usuario.
+    """
     if not text:
         messagebox.showwarning("Exportar Error", "No hay texto para exportar.")
         return
+    filetypes = [("Archivos de texto", "*.txt")]
+    if segments:
+        filetypes += exporters.EXPORT_FILE_TYPES
+    filetypes.append(("Todos los archivos", "*.*"))
     ruta_archivo = filedialog.asksaveasfilename(
         defaultextension=".txt",
         title=title,
-        filetypes=[("Archivos de texto", "*.txt"), ("Todos los archivos", "*.*")]
+        filetypes=filetypes
     )
     if ruta_archivo:
         try:
-            with open(ruta_archivo, "w", encoding='utf-8') as archivo:
-                archivo.write(text)
-            print(f"Texto exportado a {ruta_archivo}")
+            if segments and pathlib.Path(ruta_archivo).suffix.lower() in exporters.WRITERS:
+                count = exporters.export_segments(segments, pathlib.Path(ruta_archivo))
+                print(f"{count} segmentos exportados a {ruta_archivo}")
+            else:
+                with open(ruta_archivo, "w", encoding='utf-8') as archivo:
+                    archivo.write(text)
+                print(f"Texto exportado a {ruta_archivo}")
             messagebox.showinfo("Exportación Exitosa", f"Archivo guardado en:\n{ruta_archivo}")
         except Exception as e:
             print(f"Error al exportar a TXT: {e}")
@@ -124,3 +138,48 @@ def check_pytorch_cuda():
         # Capturar otros posibles errores durante la comprobación de CUDA
         print(f"ERROR: Ocurrió un error inesperado al verificar PyTorch CUDA: {e}")
         return False
+
+def get_process_rss_mb() -> float | None:
+    """
+    Devuelve la memoria residente (RSS) del proceso actual en MB.
+    Usa psutil si está instalado; si no, /proc/self/statm (Linux). None si no se puede medir.
+    """
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"Advertencia: psutil no pudo medir la memoria: {e}")
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def get_process_anonymous_mb() -> float | None:
+    """
+    Memoria anónima (privada, no respaldada por archivos) del proceso en MB, de
+    /proc/self/smaps_rollup (Linux). A diferencia del RSS no cuenta las páginas de archivos
+    mapeados, que el sistema comparte entre procesos. None si no se puede medir.
+    """
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Anonymous:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def get_process_peak_rss_mb() -> float | None:
+    """Pico de memoria residente del proceso en MB (VmHWM de /proc/self/status, Linux). None si no se puede medir."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
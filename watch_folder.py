@@ -0,0 +1,201 @@
+# watch_folder.py
+"""
+Modo carpeta vigilada: transcribe automáticamente las notas de voz nuevas.
+
+FolderWatcher sondea el directorio cada pocos segundos (sin bucle activo) y solo da
+un archivo por completo cuando su tamaño y fecha de modificación no cambian durante
+config.WATCH_STABLE_SEC (así se ignoran archivos a medio copiar/sincronizar).
+WatchService pone los archivos listos en una cola acotada delante del transcriptor,
+escribe los resultados y mide la latencia desde la llegada del archivo.
+"""
+
+import os
+import pathlib
+import queue
+import statistics
+import threading
+import time
+import config
+import exporters
+import metrics
+import transcript_index
+import whisper_transcriber
+
+
+class FolderWatcher:
+    """Detecta archivos nuevos y estables (escritura terminada) en un directorio."""
+
+    def __init__(self, watch_dir: pathlib.Path, extensions=None, stable_sec: float | None = None, is_processed=None):
+        """
+        Args:
+            watch_dir: Directorio a vigilar (no recursivo).
+            extensions: Extensiones aceptadas (None = config.WATCH_EXTENSIONS).
+            stable_sec: Segundos sin cambios para dar un archivo por completo.
+            is_processed (callable | None): Recibe un Path y devuelve True si ya tiene resultado.
+        """
+        self.watch_dir = pathlib.Path(watch_dir)
+        self.extensions = {ext.lower() for ext in (extensions or config.WATCH_EXTENSIONS)}
+        self.stable_sec = config.WATCH_STABLE_SEC if stable_sec is None else stable_sec
+        self.is_processed = is_processed or (lambda _path: False)
+        # Ruta -> [firma (tamaño, mtime_ns), primera vez vista, estable desde]
+        self._candidates: dict[pathlib.Path, list] = {}
+        self._handled: set[pathlib.Path] = set() # Ya entregados o con resultado previo
+
+    def poll_once(self) -> list[tuple[pathlib.Path, float]]:
+        """Revisa el directorio una vez. Devuelve [(ruta, instante de llegada)] de los archivos ya estables."""
+        now = time.time()
+        ready = []
+        seen = set()
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError as e:
+            print(f"Advertencia: No se pudo leer la carpeta vigilada {self.watch_dir}: {e}")
+            return ready
+
+        for entry in entries:
+            path = pathlib.Path(entry.path)
+            if path.suffix.lower() not in self.extensions:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue # Desapareció entre el listado y el stat
+            seen.add(path)
+            if path in self._handled:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            state = self._candidates.get(path)
+            if state is None:
+                if self.is_processed(path):
+                    self._handled.add(path)
+                    continue
+                self._candidates[path] = [signature, now, now]
+                continue
+            if signature != state[0]: # Sigue escribiéndose: reiniciar la espera
+                state[0] = signature
+                state[2] = now
+                continue
+            if stat.st_size > 0 and now - state[2] >= self.stable_sec:
+                ready.append((path, state[1]))
+                self._handled.add(path)
+                del self._candidates[path]
+
+        # Olvidar archivos que ya no están (memoria acotada al contenido del directorio)
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+        self._handled &= seen
+        return ready
+
+
+class WatchService:
+    """Vigila una carpeta y transcribe cada archivo nuevo con el modelo cargado."""
+
+    def __init__(self, watch_dir: pathlib.Path, output_dir: pathlib.Path | None = None, export_formats=None,
+                 poll_interval: float | None = None, queue_size: int | None = None,
+                 transcribe=whisper_transcriber.transcribe_file_blocking):
+        """
+        Args:
+            watch_dir: Carpeta vigilada.
+            output_dir: Dónde escribir los resultados (None = junto a cada audio).
+            export_formats: Extensiones de salida, p. ej. [".txt", ".srt"] (None = config.WATCH_EXPORT_FORMATS).
+            transcribe (callable): (ruta, live_export_paths) -> dict | None. Por defecto el modelo cargado.
+        """
+        self.watch_dir = pathlib.Path(watch_dir)
+        self.output_dir = pathlib.Path(output_dir) if output_dir else self.watch_dir
+        self.export_formats = list(export_formats or config.WATCH_EXPORT_FORMATS)
+        self.poll_interval = poll_interval or config.WATCH_POLL_INTERVAL_SEC
+        self.transcribe = transcribe
+        # Cola acotada: si el transcriptor no da abasto, los archivos esperan en el vigilante
+        self.work_queue: queue.Queue = queue.Queue(maxsize=queue_size or config.WATCH_QUEUE_SIZE)
+        self._pending: list[tuple[pathlib.Path, float]] = []
+        self.stop_event = threading.Event()
+        self.watcher = FolderWatcher(self.watch_dir, is_processed=self._has_result)
+        self.latencies: list[float] = []
+        self.failures = 0
+
+    def _result_path(self, audio_path: pathlib.Path, extension: str) -> pathlib.Path:
+        return self.output_dir / f"{audio_path.name}{extension}"
+
+    def _has_result(self, audio_path: pathlib.Path) -> bool:
+        main_format = ".txt" if ".txt" in self.export_formats else self.export_formats[0]
+        return self._result_path(audio_path, main_format).exists()
+
+    def run(self):
+        """Bucle principal (bloqueante) hasta stop() o Ctrl+C."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        metrics.register_callback("queue_depth", lambda: self.work_queue.qsize() + len(self._pending), queue="watch")
+        worker = threading.Thread(target=self._worker_loop, daemon=True)
+        worker.start()
+        print(f"Vigilando {self.watch_dir} (cada {self.poll_interval:.1f} s). Resultados en {self.output_dir}. Ctrl+C para salir.")
+        try:
+            while not self.stop_event.is_set():
+                self._pending.extend(self.watcher.poll_once())
+                self._enqueue_pending()
+                self.stop_event.wait(self.poll_interval) # Espera sin consumir CPU
+        except KeyboardInterrupt:
+            print("\nDeteniendo vigilancia...")
+        finally:
+            self.stop_event.set()
+            worker.join(timeout=1.0)
+            metrics.unregister_callback("queue_depth", queue="watch")
+            self.print_summary()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _enqueue_pending(self):
+        while self._pending:
+            try:
+                self.work_queue.put_nowait(self._pending[0])
+            except queue.Full:
+                break # Se reintenta en el siguiente sondeo
+            self._pending.pop(0)
+
+    def _worker_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                audio_path, arrived_at = self.work_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._process(audio_path, arrived_at)
+            except Exception as e: # Disco lleno, carpeta de salida de solo lectura...: el hilo debe seguir vivo
+                self.failures += 1
+                metrics.record_failure("export", e)
+                print(f"ERROR: No se pudieron guardar los resultados de {audio_path.name}: {e}")
+            finally:
+                self.work_queue.task_done()
+
+    def _process(self, audio_path: pathlib.Path, arrived_at: float):
+        dequeued_at = time.time()
+        print(f"Transcribiendo {audio_path.name} (en cola {dequeued_at - arrived_at:.1f} s, pendientes: {self.work_queue.qsize()})...")
+        # Los formatos con segmentos se escriben en vivo; el .txt al final, de forma atómica
+        live_paths = [self._result_path(audio_path, ext) for ext in self.export_formats if ext in exporters.WRITERS]
+        result = self.transcribe(audio_path, live_paths)
+        if result is None:
+            self.failures += 1
+            print(f"ERROR: No se pudo transcribir {audio_path.name}.")
+            return
+        if ".txt" in self.export_formats:
+            txt_path = self._result_path(audio_path, ".txt")
+            tmp_path = txt_path.with_suffix(".tmp")
+            tmp_path.write_text(result.get("text", "").strip() + "\n", encoding="utf-8")
+            os.replace(tmp_path, txt_path)
+        model_name = (result.get("language_detection") or {}).get("model_name") or whisper_transcriber.get_loaded_model_name()
+        transcript_index.index_result(audio_path, result, model_name)
+        latency = time.time() - arrived_at
+        self.latencies.append(latency)
+        print(f"Listo: {audio_path.name} -> latencia desde la llegada {latency:.1f} s "
+              f"(transcripción {time.time() - dequeued_at:.1f} s).")
+
+    def print_summary(self):
+        if not self.latencies:
+            print(f"Sin archivos transcritos. Fallos: {self.failures}.")
+            return
+        ordered = sorted(self.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        print(f"Archivos transcritos: {len(ordered)} | Fallos: {self.failures} | Latencia llegada->texto: "
+              f"mediana {statistics.median(ordered):.1f} s, p95 {p95:.1f} s, máx {ordered[-1]:.1f} s.")
@@ -0,0 +1,295 @@
+# waveform.py
+"""
+Forma de onda para el modo Depurar.
+
+PeakPyramid guarda pares (mínimo, máximo) por bloque de muestras en varios niveles de
+resolución (cada nivel agrupa el anterior de dos en dos) dentro de un .npy en disco que
+se abre con memory-map. Se calcula una sola vez por WAV (caché por huella del archivo) y
+dibujar cualquier tramo, con cualquier zoom, solo lee unos pocos picos por columna de
+píxeles: el coste no depende de la duración del audio.
+"""
+
+import bisect
+import json
+import math
+import os
+import pathlib
+import wave
+import tkinter as tk
+import audio_stream
+import config
+
+try:
+    import numpy as np # Dependencia de Whisper
+except ImportError:
+    np = None
+
+_BUILD_CHUNK_BLOCKS = 4096 # Bloques base procesados por lectura del WAV
+
+
+class PeakPyramid:
+    """Pirámide de picos min/max (int16) de un WAV, leída desde disco con memory-map."""
+
+    def __init__(self, peaks, metadata: dict):
+        self.peaks = peaks # Array (filas, 2) int16 con todos los niveles concatenados
+        self.sample_rate = metadata["sample_rate"]
+        self.total_frames = metadata["total_frames"]
+        self.block = metadata["block"]
+        self.levels = [(offset, length) for offset, length in metadata["levels"]]
+
+    @property
+    def duration_sec(self) -> float:
+        return self.total_frames / float(self.sample_rate)
+
+    def _level(self, index: int):
+        offset, length = self.levels[index]
+        return self.peaks[offset:offset + length]
+
+    def column_peaks(self, start_sec: float, end_sec: float, columns: int):
+        """
+        Devuelve (mínimos, máximos) en [-1, 1] para 'columns' columnas que cubren [start_sec, end_sec).
+        Usa el nivel cuya resolución es la más gruesa que aún da al menos un pico por columna,
+        así que solo se leen unas 2 filas por columna.
+        """
+        columns = max(1, int(columns))
+        frames_per_column = max(1e-9, (end_sec - start_sec) * self.sample_rate / columns)
+        level_index = 0
+        while (level_index + 1 < len(self.levels)
+               and self.block * 2 ** (level_index + 1) <= frames_per_column):
+            level_index += 1
+        level = self._level(level_index)
+        frames_per_row = self.block * 2 ** level_index
+
+        column_starts = start_sec * self.sample_rate + np.arange(columns) * frames_per_column
+        rows = np.clip((column_starts // frames_per_row).astype(np.int64), 0, len(level) - 1)
+        first_row = int(rows[0])
+        last_row = max(int(rows[-1]) + 1, min(len(level), math.ceil((column_starts[-1] + frames_per_column) / frames_per_row)))
+        window = np.asarray(level[first_row:last_row]) # Única lectura del memory-map
+        relative = rows - first_row
+        mins = np.minimum.reduceat(window[:, 0], relative).astype(np.float32) / 32768.0
+        maxs = np.maximum.reduceat(window[:, 1], relative).astype(np.float32) / 32768.0
+        outside = (column_starts < 0) | (column_starts >= self.total_frames) # Fuera del audio: sin onda
+        mins[outside] = 0.0
+        maxs[outside] = 0.0
+        return mins, maxs
+
+
+def _pyramid_paths(wav_path: pathlib.Path, cache_dir: pathlib.Path) -> tuple[pathlib.Path, pathlib.Path]:
+    key = f"{audio_stream.file_fingerprint(wav_path)}_b{config.WAVEFORM_BASE_BLOCK}"
+    return cache_dir / f"{key}.npy", cache_dir / f"{key}.json"
+
+def build_peak_pyramid(wav_path: pathlib.Path, cache_dir: pathlib.Path | None = None) -> PeakPyramid:
+    """
+    Devuelve la pirámide de picos del WAV (PCM 16-bit), calculándola si no está en caché.
+    El WAV se lee por bloques y los picos se escriben directamente en el archivo mapeado,
+    así que la memoria usada es constante.
+    """
+    if np is None:
+        raise ImportError("numpy es necesario para la forma de onda (se instala con openai-whisper).")
+    cache_dir = pathlib.Path(cache_dir or config.WAVEFORM_CACHE_DIR)
+    data_path, meta_path = _pyramid_paths(wav_path, cache_dir)
+    if data_path.exists() and meta_path.exists():
+        try:
+            metadata = json.loads(meta_path.read_text(encoding="utf-8"))
+            return PeakPyramid(np.load(data_path, mmap_mode="r"), metadata)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Advertencia: Pirámide de picos en caché ilegible ({e}). Se recalculará.")
+
+    block = config.WAVEFORM_BASE_BLOCK
+    with wave.open(str(wav_path), "rb") as wav_file:
+        if wav_file.getsampwidth() != audio_stream.BYTES_PER_SAMPLE:
+            raise ValueError("La forma de onda solo admite WAV PCM de 16 bits.")
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        total_frames = wav_file.getnframes()
+
+        lengths = [max(1, math.ceil(total_frames / block))]
+        while lengths[-1] > config.WAVEFORM_MIN_LEVEL_ROWS:
+            lengths.append(math.ceil(lengths[-1] / 2))
+        offsets = [sum(lengths[:i]) for i in range(len(lengths))]
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = data_path.with_name(data_path.stem + ".tmp.npy")
+        peaks = np.lib.format.open_memmap(str(tmp_path), mode="w+", dtype=np.int16, shape=(sum(lengths), 2))
+        peaks[:] = 0
+
+        # Nivel 0: min/max de cada bloque de muestras (mezcla mono)
+        row = 0
+        while True:
+            data = wav_file.readframes(block * _BUILD_CHUNK_BLOCKS)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16)
+            samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+            mono = samples.mean(axis=1).astype(np.int16) if channels > 1 else samples[:, 0]
+            if len(mono) % block: # Último bloque incompleto: se rellena repitiendo la última muestra
+                mono = np.pad(mono, (0, block - len(mono) % block), mode="edge")
+            blocks = mono.reshape(-1, block)
+            count = min(len(blocks), lengths[0] - row)
+            peaks[row:row + count, 0] = blocks[:count].min(axis=1)
+            peaks[row:row + count, 1] = blocks[:count].max(axis=1)
+            row += count
+
+    # Niveles superiores: cada fila resume dos filas del nivel anterior
+    for level_index in range(1, len(lengths)):
+        previous = peaks[offsets[level_index - 1]:offsets[level_index - 1] + lengths[level_index - 1]]
+        if len(previous) % 2:
+            previous = np.concatenate([previous, previous[-1:]])
+        pairs = previous.reshape(-1, 2, 2)
+        current = peaks[offsets[level_index]:offsets[level_index] + lengths[level_index]]
+        current[:, 0] = pairs[:, :, 0].min(axis=1)
+        current[:, 1] = pairs[:, :, 1].max(axis=1)
+
+    peaks.flush()
+    del peaks
+    os.replace(tmp_path, data_path)
+    metadata = {"sample_rate": sample_rate, "total_frames": total_frames, "block": block,
+                "levels": [[offset, length] for offset, length in zip(offsets, lengths)]}
+    meta_path.write_text(json.dumps(metadata), encoding="utf-8")
+    return PeakPyramid(np.load(data_path, mmap_mode="r"), metadata)
+
+
+class WaveformView(tk.Canvas):
+    """
+    Canvas con la forma de onda, los inicios de segmento y el cursor de reproducción.
+    Rueda: zoom alrededor del ratón. Mayús+rueda: desplazamiento. Clic: saltar a esa posición.
+    Arrastrar con el botón derecho: seleccionar un tramo (p. ej. para re-transcribirlo).
+    """
+
+    def __init__(self, master, seek_callback=None, **kwargs):
+        kwargs.setdefault("height", config.WAVEFORM_HEIGHT)
+        kwargs.setdefault("bg", config.WAVEFORM_BG_COLOR)
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.seek_callback = seek_callback
+        self.pyramid: PeakPyramid | None = None
+        self.segment_starts: list[float] = []
+        self.view_start = 0.0
+        self.view_span = 0.0 # Segundos visibles (0 = todavía sin audio)
+        self.cursor_sec = 0.0
+        self._cursor_item = None
+        self.selection: tuple[float, float] | None = None # Tramo seleccionado (inicio, fin) en segundos
+        self._selection_anchor = None
+
+        self.bind("<Configure>", lambda _event: self.redraw())
+        self.bind("<Button-1>", self._on_click)
+        self.bind("<MouseWheel>", self._on_mouse_wheel) # Windows / macOS
+        self.bind("<Shift-MouseWheel>", lambda event: self.scroll(-0.1 if event.delta > 0 else 0.1))
+        self.bind("<Button-4>", lambda event: self.zoom(1 / config.WAVEFORM_ZOOM_STEP, self._x_to_sec(event.x))) # Linux
+        self.bind("<Button-5>", lambda event: self.zoom(config.WAVEFORM_ZOOM_STEP, self._x_to_sec(event.x)))
+        self.bind("<Shift-Button-4>", lambda _event: self.scroll(-0.1))
+        self.bind("<Shift-Button-5>", lambda _event: self.scroll(0.1))
+        self.bind("<Button-3>", self._on_selection_start)
+        self.bind("<B3-Motion>", self._on_selection_drag)
+
+    def set_pyramid(self, pyramid: PeakPyramid | None):
+        """Asigna la pirámide de picos (None = sin forma de onda) y muestra el audio completo."""
+        self.pyramid = pyramid
+        self.view_start = 0.0
+        self.view_span = pyramid.duration_sec if pyramid else 0.0
+        self.cursor_sec = 0.0
+        self.selection = None
+        self.redraw()
+
+    def clear_selection(self):
+        self.selection = None
+        self.redraw()
+
+    def set_segments(self, segments: list[dict]):
+        """Inicios de los segmentos de la transcripción (se dibujan como líneas verticales)."""
+        self.segment_starts = sorted(segment["start"] for segment in segments
+                                     if isinstance(segment.get("start"), (int, float)))
+        self.redraw()
+
+    def _x_to_sec(self, x: float) -> float:
+        return self.view_start + x / max(1, self.winfo_width()) * self.view_span
+
+    def _sec_to_x(self, sec: float) -> float:
+        return (sec - self.view_start) / self.view_span * max(1, self.winfo_width()) if self.view_span else 0.0
+
+    def _clamp_view(self):
+        duration = self.pyramid.duration_sec if self.pyramid else 0.0
+        self.view_span = min(max(self.view_span, config.WAVEFORM_MIN_VIEW_SEC), max(duration, config.WAVEFORM_MIN_VIEW_SEC))
+        self.view_start = min(max(0.0, self.view_start), max(0.0, duration - self.view_span))
+
+    def zoom(self, factor: float, anchor_sec: float | None = None):
+        """Multiplica el tramo visible por 'factor' (<1 acerca) manteniendo 'anchor_sec' en su sitio."""
+        if not self.pyramid:
+            return
+        anchor_sec = self.view_start + self.view_span / 2 if anchor_sec is None else anchor_sec
+        anchor_fraction = (anchor_sec - self.view_start) / self.view_span
+        self.view_span *= factor
+        self.view_start = anchor_sec - anchor_fraction * self.view_span
+        self._clamp_view()
+        self.redraw()
+
+    def scroll(self, fraction: float):
+        """Desplaza la vista una fracción del tramo visible (negativo = hacia el inicio)."""
+        if not self.pyramid:
+            return
+        self.view_start += fraction * self.view_span
+        self._clamp_view()
+        self.redraw()
+
+    def set_cursor(self, sec: float):
+        """Mueve el cursor de reproducción; si sale de la vista, la vista lo sigue."""
+        self.cursor_sec = sec
+        if not self.pyramid:
+            return
+        if not self.view_start <= sec < self.view_start + self.view_span:
+            self.view_start = sec - 0.1 * self.view_span
+            self._clamp_view()
+            self.redraw()
+            return
+        x = self._sec_to_x(sec)
+        if self._cursor_item:
+            self.coords(self._cursor_item, x, 0, x, self.winfo_height())
+
+    def _on_mouse_wheel(self, event):
+        self.zoom(1 / config.WAVEFORM_ZOOM_STEP if event.delta > 0 else config.WAVEFORM_ZOOM_STEP, self._x_to_sec(event.x))
+
+    def _on_click(self, event):
+        if self.pyramid and self.seek_callback:
+            self.seek_callback(min(max(0.0, self._x_to_sec(event.x)), self.pyramid.duration_sec))
+
+    def _on_selection_start(self, event):
+        if self.pyramid:
+            self._selection_anchor = min(max(0.0, self._x_to_sec(event.x)), self.pyramid.duration_sec)
+            self.selection = None
+            self.redraw()
+
+    def _on_selection_drag(self, event):
+        if self.pyramid and self._selection_anchor is not None:
+            current = min(max(0.0, self._x_to_sec(event.x)), self.pyramid.duration_sec)
+            start, end = sorted((self._selection_anchor, current))
+            self.selection = (start, end) if end > start else None
+            self.redraw()
+
+    def redraw(self):
+        """Redibuja la vista actual. Coste proporcional al ancho en píxeles, no a la duración."""
+        self.delete("all")
+        self._cursor_item = None
+        width, height = self.winfo_width(), self.winfo_height()
+        if not self.pyramid or width <= 1 or not self.view_span:
+            return
+        middle = height / 2
+        if self.selection:
+            self.create_rectangle(self._sec_to_x(self.selection[0]), 0, self._sec_to_x(self.selection[1]), height,
+                                  fill=config.WAVEFORM_SELECTION_COLOR, outline="")
+        mins, maxs = self.pyramid.column_peaks(self.view_start, self.view_start + self.view_span, width)
+        # Una sola polilínea en zigzag (máximo, mínimo) por columna: un único elemento del canvas
+        coords = []
+        for x, (low, high) in enumerate(zip(mins.tolist(), maxs.tolist())):
+            coords.extend((x, middle - high * middle, x, middle - low * middle + 1))
+        if len(coords) >= 4:
+            self.create_line(*coords, fill=config.WAVEFORM_COLOR)
+
+        view_end = self.view_start + self.view_span
+        first = bisect.bisect_left(self.segment_starts, self.view_start)
+        last = bisect.bisect_left(self.segment_starts, view_end)
+        if last - first <= width // 3: # Con demasiados segmentos en pantalla las líneas no aportan
+            for start in self.segment_starts[first:last]:
+                x = self._sec_to_x(start)
+                self.create_line(x, 0, x, height, fill=config.WAVEFORM_SEGMENT_COLOR)
+        x = self._sec_to_x(self.cursor_sec)
+        self._cursor_item = self.create_line(x, 0, x, height, fill=config.WAVEFORM_CURSOR_COLOR, width=2)
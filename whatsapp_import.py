@@ -0,0 +1,163 @@
+# whatsapp_import.py
+"""
+Importación directa de exportaciones de chat de WhatsApp (.zip).
+
+Lee el ZIP sin extraerlo: el _chat.txt se recorre línea a línea y cada nota de voz
+se decodifica enviando el miembro del ZIP directamente a ffmpeg por una tubería.
+La decodificación (varios procesos ffmpeg en paralelo) se solapa con la inferencia, y
+solo hay unas pocas notas decodificadas en memoria a la vez, así que una exportación
+con miles de audios usa memoria acotada. El resultado es el chat completo con cada
+nota de voz sustituida por su transcripción.
+"""
+
+import io
+import pathlib
+import queue
+import re
+import threading
+import time
+import zipfile
+import audio_stream
+import config
+import metrics
+import whisper_transcriber
+
+AUDIO_ATTACHMENT_EXTENSIONS = ("opus", "ogg", "m4a", "mp3", "aac", "amr", "wav")
+
+_ATTACHMENT_NAME_RE = re.compile(r"[\w\-.]+\.(?:" + "|".join(AUDIO_ATTACHMENT_EXTENSIONS) + r")\b", re.IGNORECASE)
+# Caracteres invisibles de dirección de texto que WhatsApp mete en las exportaciones
+_INVISIBLE_CHARS = dict.fromkeys(map(ord, "‎‏‪‬"), None)
+
+
+def find_chat_member(zip_file: zipfile.ZipFile) -> str | None:
+    """Devuelve el nombre del .txt del chat dentro del ZIP ("_chat.txt" o "WhatsApp Chat with ....txt")."""
+    text_members = [name for name in zip_file.namelist() if name.lower().endswith(".txt")]
+    for name in text_members:
+        if pathlib.PurePath(name).name == "_chat.txt":
+            return name
+    return text_members[0] if text_members else None
+
+def iter_chat_lines(zip_file: zipfile.ZipFile, chat_member: str):
+    """Genera las líneas del chat (sin salto de línea ni caracteres invisibles), leyendo en streaming."""
+    with zip_file.open(chat_member) as raw:
+        for line in io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace"):
+            yield line.rstrip("\r\n").translate(_INVISIBLE_CHARS)
+
+def find_audio_attachments(line: str, audio_members: dict[str, str]) -> list[str]:
+    """Nombres de notas de voz del ZIP mencionadas en una línea del chat."""
+    return [name for name in _ATTACHMENT_NAME_RE.findall(line) if name in audio_members]
+
+def replace_attachment(line: str, name: str, transcript: str) -> str:
+    """Sustituye la referencia al adjunto ("<attached: X>", "X (archivo adjunto)", ...) por la transcripción."""
+    pattern = re.compile(r"(?:<[^<>]*?:\s*)?" + re.escape(name) + r"(?:>|\s*\([^()]*\))?")
+    return pattern.sub(lambda _m: f"[Nota de voz {name}] {transcript}", line, count=1)
+
+
+class WhatsAppExportImporter:
+    """Transcribe las notas de voz de una exportación de WhatsApp y las integra en el chat."""
+
+    def __init__(self, zip_path: pathlib.Path, decode_workers: int | None = None, decoding_preset: str | None = None):
+        self.zip_path = pathlib.Path(zip_path)
+        self.decode_workers = decode_workers or config.WHATSAPP_DECODE_WORKERS
+        self.decoding_preset = decoding_preset # None = config.DEFAULT_DECODING_PRESET
+        # Máximo de notas decodificadas esperando al modelo (acota la memoria)
+        self.max_in_flight = self.decode_workers * 2
+        self.transcripts: dict[str, str] = {} # Solo texto: el audio se libera tras transcribirlo
+        self.failures: dict[str, str] = {}
+
+    def run(self, output_path: pathlib.Path) -> dict:
+        """Transcribe todas las notas y escribe el chat combinado en 'output_path'. Devuelve estadísticas."""
+        model_name = whisper_transcriber.get_loaded_model_name()
+        if model_name is None:
+            raise RuntimeError("No hay ningún modelo cargado.")
+        start_time = time.time()
+        with zipfile.ZipFile(self.zip_path) as zip_file:
+            chat_member = find_chat_member(zip_file)
+            if chat_member is None:
+                raise ValueError(f"{self.zip_path.name} no contiene el .txt del chat.")
+            audio_members = {pathlib.PurePath(name).name: name for name in zip_file.namelist()
+                             if name.lower().endswith(tuple("." + ext for ext in AUDIO_ATTACHMENT_EXTENSIONS))}
+
+            # Pasada 1: notas de voz en el orden del chat
+            ordered_names = []
+            seen = set()
+            for line in iter_chat_lines(zip_file, chat_member):
+                for name in find_audio_attachments(line, audio_members):
+                    if name not in seen:
+                        seen.add(name)
+                        ordered_names.append(name)
+            print(f"{self.zip_path.name}: {len(ordered_names)} notas de voz en el chat.")
+
+            self._transcribe_all(zip_file, audio_members, ordered_names, model_name)
+
+            # Pasada 2: reescribir el chat con las transcripciones, línea a línea
+            output_path = pathlib.Path(output_path)
+            with open(output_path, "w", encoding="utf-8") as output:
+                for line in iter_chat_lines(zip_file, chat_member):
+                    for name in find_audio_attachments(line, audio_members):
+                        if name in self.transcripts:
+                            line = replace_attachment(line, name, self.transcripts[name])
+                        elif name in self.failures:
+                            line = replace_attachment(line, name, "(no se pudo transcribir)")
+                    output.write(line + "\n")
+
+        stats = {"notes": len(ordered_names), "transcribed": len(self.transcripts),
+                 "failed": len(self.failures), "elapsed_sec": time.time() - start_time}
+        print(f"Chat transcrito guardado en {output_path} ({stats['transcribed']}/{stats['notes']} notas, "
+              f"{stats['failed']} fallos, {stats['elapsed_sec']:.1f} s).")
+        return stats
+
+    def _transcribe_all(self, zip_file: zipfile.ZipFile, audio_members: dict[str, str], names: list[str], model_name: str):
+        """Decodifica en paralelo (hilos + ffmpeg) y transcribe en el hilo actual según llegan."""
+        decoded_queue: queue.Queue = queue.Queue()
+        in_flight = threading.Semaphore(self.max_in_flight)
+        name_queue: queue.Queue = queue.Queue()
+        for name in names:
+            name_queue.put(name)
+
+        def decode_worker():
+            while True:
+                try:
+                    name = name_queue.get_nowait()
+                except queue.Empty:
+                    return
+                in_flight.acquire() # Espera si ya hay demasiadas notas decodificadas en memoria
+                try:
+                    start = time.perf_counter()
+                    with zip_file.open(audio_members[name]) as member:
+                        samples = audio_stream.load_float32(member)
+                    metrics.observe("conversion_seconds", time.perf_counter() - start)
+                    decoded_queue.put((name, samples, None))
+                except Exception as e:
+                    metrics.record_failure("conversion", e)
+                    decoded_queue.put((name, None, e))
+
+        workers = [threading.Thread(target=decode_worker, daemon=True) for _ in range(self.decode_workers)]
+        for worker in workers:
+            worker.start()
+
+        options = whisper_transcriber.build_transcribe_options(preset=self.decoding_preset)
+        metrics.register_callback("queue_depth", decoded_queue.qsize, queue="whatsapp")
+        for done in range(1, len(names) + 1):
+            name, samples, error = decoded_queue.get()
+            try:
+                if error is not None:
+                    raise error
+                start = time.perf_counter()
+                result = whisper_transcriber.transcribe_samples(samples, options) # En el proceso de trabajo si está activo
+                metrics.record_transcription(model_name, len(samples) / audio_stream.WHISPER_SAMPLE_RATE,
+                                             time.perf_counter() - start)
+                self.transcripts[name] = result.get("text", "").strip()
+            except Exception as e:
+                if error is None: # Los fallos de decodificación ya se contaron en su hilo
+                    metrics.record_failure("transcription", e)
+                self.failures[name] = str(e)
+                print(f"ERROR: {name}: {e}")
+            finally:
+                del samples
+                in_flight.release()
+            if done % 10 == 0 or done == len(names):
+                print(f"  {done}/{len(names)} notas procesadas...")
+        metrics.unregister_callback("queue_depth", queue="whatsapp")
+        for worker in workers:
+            worker.join(timeout=1.0)
@@ -4,38 +4,309 @@
 import threading
 import time
 import pathlib
+import audio_stream
 import config
-
-try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except ImportError:
-    print("ADVERTENCIA: La librería 'whisper' no está instalada. La funcionalidad de Whisper no estará disponible.")
-    print("Instálala con: pip install -U openai-whisper")
-    whisper = None # Placeholder
-    WHISPER_AVAILABLE = False
+import exporters
+import language_detection
+import metrics
+import time_compression
+import transcription_engines
+import transcription_worker
+from segment_store import slim_segment
+from transcription_worker import TranscriptionCancelled
+
+# Whisper (o un motor alternativo) disponible para transcribir
+WHISPER_AVAILABLE = bool(transcription_engines.available_engines())
 
 # Variable global para el modelo cargado (Singleton simple)
-_whisper_model = None
+_loaded_engine = None # Instancia de transcription_engines.TranscriptionEngine con el modelo cargado (None si lo tiene el proceso de trabajo)
 _model_name_loaded = None
+_model_precision_loaded = None # Modo de precisión efectivo del modelo cargado ("fp32", "int8", "bf16")
+_engine_name_loaded = None # Motor del modelo cargado ("whisper", "faster-whisper"...)
 _model_lock = threading.Lock() # Lock para acceso a las variables globales del modelo
 _model_load_thread = None # Referencia al hilo de carga actual
 _model_load_stop_event = threading.Event() # Para intentar cancelar carga (si es posible)
 _model_ready_event = threading.Event() # Para saber si un modelo está LISTO
+_auxiliary_engines = {} # Modelos secundarios (borrador, detección de idioma, variantes .en) por nombre, cargados bajo demanda
+_worker = None # transcription_worker.TranscriptionWorker con el modelo cargado (config.OUT_OF_PROCESS_TRANSCRIPTION)
+
+def _worker_restarts():
+    with _model_lock:
+        return _worker.restarts if _worker else None
+
+metrics.register_callback("transcription_worker_restarts", _worker_restarts)
+
+def get_loaded_engine_name() -> str | None:
+    """Devuelve el nombre del motor con el que se cargó el modelo actual."""
+    with _model_lock:
+        return _engine_name_loaded
+
+def get_loaded_precision() -> str | None:
+    """Modo de precisión efectivo del modelo cargado (ya resuelto: p. ej. fp32 si se pidió bf16 sin soporte)."""
+    with _model_lock:
+        return _model_precision_loaded
 
-def _load_model_global(model_name: str, progress_callback, completion_callback, error_callback, stop_event):
+def get_loaded_model_name() -> str | None:
+    """Nombre del modelo cargado (None si no hay ninguno listo)."""
+    with _model_lock:
+        return _model_name_loaded if _model_ready_event.is_set() else None
+
+def get_loaded_engine():
+    """
+    Devuelve el motor con el modelo cargado (o None si no hay modelo listo). Con el proceso
+    de trabajo activo es un _WorkerModel: la inferencia se hace allí, no en este proceso.
+    """
+    return _get_main_engine() if _model_ready_event.is_set() else None
+
+def shutdown_worker():
+    """Cierra el proceso de trabajo (al salir de la aplicación)."""
+    global _worker
+    with _model_lock:
+        worker, _worker = _worker, None
+    if worker:
+        worker.shutdown()
+
+def build_transcribe_options(language: str | None = None, preset: str | None = None) -> dict:
+    """
+    Opciones de transcripción por defecto (formato de openai-whisper, cada motor las adapta).
+    language: idioma del audio (None = config.TARGET_LANGUAGE); el prompt inicial se elige según el idioma.
+    preset: preajuste de decodificación de config.DECODING_PRESETS (None = config.DEFAULT_DECODING_PRESET).
+    """
+    language = language or config.TARGET_LANGUAGE
+    options = {
+        "language": language,
+        "initial_prompt": config.LANGUAGE_PROMPTS.get(language),
+        "fp16": False, # Forzar CPU/compatibilidad general, cambiar si se tiene GPU potente y se prueba
+        # "word_timestamps": False, # Descomentar si se prefiere usar word timestamps (más granular)
+        "verbose": None, # Usar None o False para menos output en consola
+    }
+    options.update(config.DECODING_PRESETS.get(preset or config.DEFAULT_DECODING_PRESET,
+                                               config.DECODING_PRESETS[config.DEFAULT_DECODING_PRESET]))
+    return options
+
+class _WorkerModel:
+    """
+    Un modelo del proceso de trabajo con la interfaz de los motores (transcribe, iter_segments,
+    detect_language): así transcribe_range(), la revisión selectiva, el borrador y la detección
+    de idioma se ejecutan allí sin cargar el modelo en este proceso. El proceso carga los
+    modelos auxiliares la primera vez que se le piden.
+    """
+
+    def __init__(self, worker, model_name: str, precision: str, engine_name: str):
+        self.worker = worker
+        self.model_name = model_name
+        self.precision = precision
+        self.name = engine_name
+
+    def iter_segments(self, audio, **options):
+        return self.worker.iter_segments(audio, options, model_name=self.model_name)
+
+    def transcribe(self, audio, **options) -> dict:
+        segments = list(self.iter_segments(audio, **options))
+        return {"text": "".join(segment.get("text", "") for segment in segments), "segments": segments,
+                "language": options.get("language")}
+
+    def detect_language(self, audio) -> tuple[str, float]:
+        return self.worker.detect_language(audio, self.model_name)
+
+def _get_auxiliary_engine(model_name: str):
+    """
+    Devuelve un modelo secundario (borrador, detección de idioma...) con el mismo motor y
+    precisión que el modelo principal. Con el proceso de trabajo activo el modelo se usa (y se
+    carga la primera vez) allí; si no, se carga en este proceso la primera vez.
+    """
+    with _model_lock:
+        if _worker is not None:
+            return _WorkerModel(_worker, model_name, _model_precision_loaded, _engine_name_loaded)
+        if _loaded_engine and _loaded_engine.model_name == model_name:
+            metrics.record_cache("auxiliary_model", hit=True)
+            return _loaded_engine
+        engine = _auxiliary_engines.get(model_name)
+        if engine and engine.name == _engine_name_loaded and engine.precision == _model_precision_loaded:
+            metrics.record_cache("auxiliary_model", hit=True)
+            return engine
+        engine_name, precision = _engine_name_loaded, _model_precision_loaded
+    metrics.record_cache("auxiliary_model", hit=False)
+    print(f"Cargando modelo auxiliar '{model_name}' ({precision}, {engine_name})...")
+    engine = transcription_engines.ENGINES[engine_name]()
+    engine.load(model_name, precision)
+    with _model_lock:
+        _auxiliary_engines[model_name] = engine
+    return engine
+
+def _get_main_engine():
+    """
+    Motor del modelo cargado: el de este proceso, o un _WorkerModel si está en el proceso de
+    trabajo. Solo si el proceso de trabajo se cerró (shutdown_worker()) se carga aquí una copia.
+    """
+    with _model_lock:
+        if _loaded_engine is not None:
+            return _loaded_engine
+        model_name = _model_name_loaded
+    if model_name is None:
+        raise RuntimeError("No hay ningún modelo cargado.")
+    return _get_auxiliary_engine(model_name)
+
+def _get_draft_engine():
+    """Motor del borrador del modo progresivo (config.PROGRESSIVE_DRAFT_MODEL)."""
+    return _get_auxiliary_engine(config.PROGRESSIVE_DRAFT_MODEL)
+
+def route_language(audio_path: pathlib.Path, model_name: str) -> dict:
+    """
+    Detecta el idioma del archivo (con caché por huella) y decide cómo transcribirlo.
+    Devuelve {"language", "detected_language", "probability", "cached", "detect_sec", "model_name"}:
+    'language' es el idioma a forzar y 'model_name' el modelo a usar (variante .en si procede).
+    Si la detección falla o es dudosa se usa config.TARGET_LANGUAGE.
+    """
+    routing = {"language": config.TARGET_LANGUAGE, "detected_language": None, "probability": None,
+               "cached": False, "detect_sec": 0.0, "model_name": model_name}
+    try:
+        detection = language_detection.detect_file_language(
+            audio_path, lambda: _get_auxiliary_engine(config.LANGUAGE_DETECTION_MODEL))
+    except TranscriptionCancelled:
+        raise
+    except Exception as e:
+        print(f"Advertencia: No se pudo detectar el idioma de {pathlib.Path(audio_path).name} ({e}). Se usará '{config.TARGET_LANGUAGE}'.")
+        metrics.record_failure("language_detection", e)
+        return routing
+    metrics.record_cache("language", hit=detection["cached"])
+    routing.update(detection, detected_language=detection["language"])
+    if detection["probability"] < config.LANGUAGE_DETECTION_MIN_PROBABILITY:
+        routing["language"] = config.TARGET_LANGUAGE
+    if (routing["language"] == "en" and config.ENGLISH_MODEL_VARIANTS
+            and model_name in config.ENGLISH_VARIANT_MODELS):
+        routing["model_name"] = f"{model_name}.en"
+    print(f"Idioma detectado: {detection['language']} (p={detection['probability']:.2f}"
+          f"{', en caché' if detection['cached'] else ''}) en {detection['detect_sec']:.2f} s -> "
+          f"transcribiendo en '{routing['language']}' con '{routing['model_name']}'.")
+    return routing
+
+def transcribe_range(engine, audio_path: pathlib.Path, start_sec: float, end_sec: float, options: dict) -> list[dict]:
+    """
+    Transcribe solo el fragmento [start_sec, end_sec) del audio y devuelve sus segmentos
+    con los tiempos ya trasladados a la línea temporal del archivo completo.
+    """
+    audio = audio_stream.load_range(audio_path, start_sec, end_sec)
+    result = engine.transcribe(audio, **options)
+    segments = []
+    for segment in result.get("segments", []):
+        segment = slim_segment(segment)
+        segment["start"] = min(end_sec, segment["start"] + start_sec)
+        segment["end"] = min(end_sec, segment["end"] + start_sec)
+        segments.append(segment)
+    return segments
+
+def group_segments_into_windows(segments: list[dict], window_sec: float) -> list[list[int]]:
+    """Agrupa índices de segmentos consecutivos en ventanas de ~window_sec (cortando en límites de segmento)."""
+    windows = []
+    current = []
+    for index, segment in enumerate(segments):
+        current.append(index)
+        if segment["end"] - segments[current[0]]["start"] >= window_sec:
+            windows.append(current)
+            current = []
+    if current:
+        windows.append(current)
+    return windows
+
+def is_low_confidence(segment: dict) -> bool:
+    """True si las métricas del decodificador indican un segmento poco fiable."""
+    avg_logprob = segment.get("avg_logprob")
+    compression_ratio = segment.get("compression_ratio")
+    no_speech_prob = segment.get("no_speech_prob")
+    return ((avg_logprob is not None and avg_logprob < config.RECHECK_AVG_LOGPROB_THRESHOLD)
+            or (compression_ratio is not None and compression_ratio > config.RECHECK_COMPRESSION_RATIO_THRESHOLD)
+            or (no_speech_prob is not None and no_speech_prob > config.RECHECK_NO_SPEECH_THRESHOLD))
+
+def find_low_confidence_ranges(segments: list[dict], min_range_sec: float | None = None) -> list[list[int]]:
+    """
+    Agrupa los segmentos dudosos consecutivos en fragmentos (listas de índices). Los fragmentos
+    de menos de min_range_sec se amplían con los segmentos vecinos para dar contexto al modelo;
+    los que acaban solapándose se fusionan.
+    """
+    min_range_sec = config.RECHECK_MIN_RANGE_SEC if min_range_sec is None else min_range_sec
+    ranges = []
+    for index, segment in enumerate(segments):
+        if not is_low_confidence(segment):
+            continue
+        if ranges and ranges[-1][1] >= index - 1: # Contiguo (o solapado) con el anterior
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    expanded = []
+    for first, last in ranges:
+        while segments[last]["end"] - segments[first]["start"] < min_range_sec:
+            if last < len(segments) - 1:
+                last += 1
+            elif first > 0:
+                first -= 1
+            else:
+                break
+        if expanded and expanded[-1][1] >= first - 1:
+            expanded[-1][1] = max(expanded[-1][1], last)
+        else:
+            expanded.append([first, last])
+    return [list(range(first, last + 1)) for first, last in expanded]
+
+def recheck_low_confidence(segments: list[dict], engine, audio_path: pathlib.Path, options: dict) -> tuple[list[dict], dict]:
+    """
+    Vuelve a transcribir con 'engine' (un modelo mayor) solo los fragmentos de baja confianza
+    y sustituye su texto. Devuelve (segmentos resultantes, informe de cuánto audio se rehízo).
+    """
+    start_time = time.time()
+    ranges = find_low_confidence_ranges(segments)
+    replacements = {} # Índice del primer segmento del fragmento -> (índices, segmentos nuevos)
+    redone_sec = 0.0
+    for indices in ranges:
+        range_start, range_end = segments[indices[0]]["start"], segments[indices[-1]]["end"]
+        redone = transcribe_range(engine, audio_path, range_start, range_end, options)
+        redone_sec += range_end - range_start
+        replacements[indices[0]] = (indices, redone)
+
+    result_segments = []
+    skip_until = -1
+    for index, segment in enumerate(segments):
+        if index <= skip_until:
+            continue
+        if index in replacements:
+            indices, redone = replacements[index]
+            skip_until = indices[-1]
+            result_segments.extend(dict(new, rechecked=True) for new in redone)
+            continue
+        result_segments.append(segment)
+    for new_id, segment in enumerate(result_segments):
+        segment["id"] = new_id
+
+    audio_sec = segments[-1]["end"] if segments else 0.0
+    report = {
+        "model": engine.model_name,
+        "flagged_segments": sum(1 for segment in segments if is_low_confidence(segment)),
+        "ranges": len(ranges),
+        "redone_sec": redone_sec,
+        "audio_sec": audio_sec,
+        "redone_ratio": redone_sec / audio_sec if audio_sec else 0.0,
+        "recheck_sec": time.time() - start_time,
+    }
+    return result_segments, report
+
+def _load_model_global(model_name: str, precision: str, engine_name: str | None, progress_callback, completion_callback, error_callback, stop_event):
     """
     Carga el modelo Whisper de forma segura para subprocesos (se ejecuta en un hilo).
     Notifica progreso y finalización.
     """
-    global _whisper_model, _model_name_loaded, _model_ready_event
+    global _loaded_engine, _model_name_loaded, _model_precision_loaded, _engine_name_loaded, _model_ready_event, _worker
 
     with _model_lock:
-        _whisper_model = None
+        _loaded_engine = None
         _model_name_loaded = None
+        _model_precision_loaded = None
+        _engine_name_loaded = None
         _model_ready_event.clear()
+        old_worker, _worker = _worker, None
+    if old_worker:
+        old_worker.shutdown()
 
-    if not WHISPER_AVAILABLE:
+    if not WHISPER_AVAILABLE or not engine_name:
         error_msg = "La librería Whisper no está instalada o no se pudo importar."
         print(f"ERROR: {error_msg}")
         error_callback(error_msg)
@@ -48,7 +319,7 @@ def _load_model_global(model_name: str, progress_callback, completion_callback,
         return
 
     try:
-        print(f"Iniciando carga del modelo Whisper ({model_name})...")
+        print(f"Iniciando carga del modelo Whisper ({model_name}) con el motor '{engine_name}'...")
         start_time = time.time()
 
         # Simulación de Progreso
@@ -57,23 +328,48 @@ def _load_model_global(model_name: str, progress_callback, completion_callback,
         if stop_event.is_set(): raise InterruptedError("Carga cancelada durante preparación.")
         progress_callback(f"Descargando/Verificando '{model_name}'...", 30)
         time.sleep(0.5)
-        progress_callback(f"Cargando '{model_name}' en memoria...", 60)
+        progress_callback(f"Cargando '{model_name}' ({precision}) en memoria...", 60)
         if stop_event.is_set(): raise InterruptedError("Carga cancelada antes de load_model.")
 
-        # Carga Real
-        loaded_model = whisper.load_model(model_name)
+        # Carga Real: en un solo sitio. Con el proceso de trabajo el modelo solo se carga allí
+        # (y también los auxiliares, ver _WorkerModel)
+        engine = None
+        worker = None
+        if config.OUT_OF_PROCESS_TRANSCRIPTION:
+            try:
+                worker = transcription_worker.TranscriptionWorker(model_name, precision, engine_name)
+            except OSError as e:
+                print(f"Advertencia: No se pudo arrancar el proceso de transcripción ({e}). Se transcribe en este proceso.")
+        if worker is not None:
+            try:
+                worker.wait_ready(stop_event=stop_event)
+            except TranscriptionCancelled:
+                worker.shutdown()
+                raise InterruptedError("Carga cancelada durante load_model.")
+            except BaseException:
+                worker.shutdown()
+                raise
+        else:
+            engine = transcription_engines.ENGINES[engine_name]()
+            engine.load(model_name, precision)
 
         if stop_event.is_set():
-            del loaded_model
+            if worker is not None:
+                worker.shutdown()
+            del engine
             raise InterruptedError("Carga cancelada después de load_model.")
 
         end_time = time.time()
         load_duration = end_time - start_time
-        print(f"Modelo Whisper ({model_name}) cargado en {load_duration:.2f} segundos.")
+        where = "en el proceso de transcripción" if worker is not None else "en este proceso"
+        print(f"Modelo Whisper ({model_name}, {precision}, {engine_name}) cargado {where} en {load_duration:.2f} segundos.")
 
         with _model_lock:
-            _whisper_model = loaded_model
+            _worker = worker
+            _loaded_engine = engine
             _model_name_loaded = model_name
+            _model_precision_loaded = precision
+            _engine_name_loaded = engine_name
             _model_ready_event.set()
 
         progress_callback(f"Modelo '{model_name}' cargado.", 100)
@@ -88,9 +384,12 @@ def _load_model_global(model_name: str, progress_callback, completion_callback,
     except Exception as e:
         error_msg = f"Error crítico al cargar modelo Whisper ({model_name}): {e}"
         print(error_msg)
+        metrics.record_failure("model_load", e)
         with _model_lock:
-            _whisper_model = None
+            _loaded_engine = None
             _model_name_loaded = None
+            _model_precision_loaded = None
+            _engine_name_loaded = None
             _model_ready_event.clear()
         progress_callback(f"Error al cargar '{model_name}'.", 0)
         error_callback(error_msg)
@@ -100,7 +399,8 @@ def _load_model_global(model_name: str, progress_callback, completion_callback,
 class WhisperTranscriber:
     """Realiza la transcripción usando el modelo Whisper cargado."""
 
-    def __init__(self, update_callback, status_callback, completion_callback, error_callback):
+    def __init__(self, update_callback, status_callback, completion_callback, error_callback, segment_callback=None,
+                 draft_callback=None, refine_callback=None, span_callback=None):
         """
         Inicializa el transcriptor Whisper.
         Args:
@@ -108,19 +408,41 @@ class WhisperTranscriber:
             status_callback (callable): Función para actualizar el estado general (str).
             completion_callback (callable): Función a llamar al finalizar la transcripción (bool: success, result: dict | None).
             error_callback (callable): Función a llamar en caso de error (str).
+            segment_callback (callable | None): Función opcional llamada con cada segmento (dict) en cuanto el motor lo produce.
+            draft_callback (callable | None): Modo progresivo: recibe el borrador (dict, segundos hasta el primer texto).
+            refine_callback (callable | None): Modo progresivo: recibe (ids de segmentos del borrador reemplazados, segmentos refinados).
+            span_callback (callable | None): Re-transcripción de un fragmento: recibe (inicio, fin, segmentos nuevos, info).
         """
         self.audio_path = None
         self._transcription_thread = None
         self._is_running_transcription = False
+        self._stop_requested = threading.Event() # stop(): se comprueba entre segmentos/ventanas
+        self._active_worker = None # Proceso de trabajo con la transcripción en curso (stop() lo mata)
+        self.live_export_paths: list[pathlib.Path] = [] # Archivos .srt/.vtt/.jsonl que se escriben en vivo
+        self.detect_language = config.LANGUAGE_DETECTION_ENABLED # Detectar el idioma de cada archivo antes de transcribir
+        self.recheck_low_confidence = False # Revisar los segmentos dudosos con config.RECHECK_MODEL al terminar
+        self.speed_factor = config.DEFAULT_SPEED_FACTOR # Modo acelerado: >1 comprime el audio en el tiempo antes de transcribir
+        self.decoding_preset = config.DEFAULT_DECODING_PRESET # Preajuste de config.DECODING_PRESETS (beam, reintentos, contexto)
 
         self.update_callback = update_callback
         self.status_callback = status_callback
         self.completion_callback = completion_callback
         self.error_callback = error_callback
+        self.segment_callback = segment_callback
+        self.draft_callback = draft_callback
+        self.refine_callback = refine_callback
+        self.span_callback = span_callback
 
-    def load_model(self, model_name: str, progress_callback, model_completion_callback):
-        """Inicia la carga del modelo Whisper especificado en un hilo separado."""
+    def load_model(self, model_name: str, progress_callback, model_completion_callback, precision: str | None = None, engine: str | None = None):
+        """
+        Inicia la carga del modelo Whisper especificado en un hilo separado.
+        precision: "fp32", "int8" o "bf16" (None = config.DEFAULT_WHISPER_PRECISION).
+        engine: nombre del motor (None = config.TRANSCRIPTION_ENGINE, "auto" = el más rápido instalado).
+        """
         global _model_load_thread, _model_load_stop_event, _model_name_loaded, _model_lock
+        engine_name = transcription_engines.select_engine_name(engine)
+        if engine_name:
+            precision = transcription_engines.ENGINES[engine_name].resolve_precision(precision)
 
         with _model_lock:
             if _model_load_thread and _model_load_thread.is_alive():
@@ -130,17 +452,18 @@ class WhisperTranscriber:
                 if _model_load_thread.is_alive():
                     print(f"ADVERTENCIA: El hilo de carga anterior no terminó a tiempo.")
 
-            if _model_ready_event.is_set() and _model_name_loaded == model_name:
-                print(f"Modelo '{model_name}' ya está cargado y listo.")
+            if (_model_ready_event.is_set() and _model_name_loaded == model_name
+                    and _model_precision_loaded == precision and _engine_name_loaded == engine_name):
+                print(f"Modelo '{model_name}' ({precision}, {engine_name}) ya está cargado y listo.")
                 progress_callback(f"Modelo '{model_name}' ya cargado.", 100)
                 model_completion_callback(True, model_name)
                 return
 
             _model_load_stop_event.clear()
-            print(f"Solicitando carga del modelo: {model_name}")
+            print(f"Solicitando carga del modelo: {model_name} ({precision}, motor: {engine_name})")
             _model_load_thread = threading.Thread(
                 target=_load_model_global,
-                args=(model_name, progress_callback, model_completion_callback, self.error_callback, _model_load_stop_event),
+                args=(model_name, precision, engine_name, progress_callback, model_completion_callback, self.error_callback, _model_load_stop_event),
                 daemon=True
             )
             _model_load_thread.start()
@@ -150,13 +473,61 @@ class WhisperTranscriber:
         self.audio_path = audio_path
         print(f"WhisperTranscriber: Audio path set to {audio_path}")
 
+    def set_live_export_paths(self, paths: list[pathlib.Path]):
+        """Archivos (.srt, .vtt, .jsonl) donde se irán escribiendo los segmentos según se produzcan."""
+        self.live_export_paths = [pathlib.Path(p) for p in paths]
+
+    def _route(self, current_model, current_model_name: str):
+        """
+        Detección de idioma (si está activa). Devuelve (motor, nombre del modelo, opciones, info de
+        detección o None). El motor es None mientras se use el modelo cargado; si se enruta a otro
+        modelo (variante .en) es su motor (en el proceso de trabajo si está activo).
+        La detección se mide aparte del tiempo de transcripción.
+        """
+        if not self.detect_language:
+            return current_model, current_model_name, build_transcribe_options(preset=self.decoding_preset), None
+        self.status_callback("Detectando idioma...")
+        routing = route_language(self.audio_path, current_model_name)
+        if routing["model_name"] != current_model_name:
+            try:
+                current_model = _get_auxiliary_engine(routing["model_name"])
+                current_model_name = routing["model_name"]
+            except Exception as e:
+                print(f"Advertencia: No se pudo cargar '{routing['model_name']}' ({e}). Se usa '{current_model_name}'.")
+                routing["model_name"] = current_model_name
+        return current_model, current_model_name, build_transcribe_options(routing["language"], self.decoding_preset), routing
+
+    def _open_live_writers(self) -> list:
+        writers = []
+        for path in self.live_export_paths:
+            try:
+                writers.append(exporters.create_writer(path))
+                print(f"Exportación en vivo activada: {path}")
+            except (ValueError, OSError) as e:
+                print(f"Advertencia: No se pudo abrir la exportación en vivo {path}: {e}")
+        return writers
+
+    def _attach_worker(self):
+        """
+        Registra el proceso de trabajo (si lo hay) para que stop() lo mate, y lanza
+        TranscriptionCancelled si ya se pidió parar antes de que hubiera proceso que matar.
+        """
+        with _model_lock:
+            self._active_worker = _worker
+        if self._stop_requested.is_set():
+            raise TranscriptionCancelled("Transcripción detenida.")
+
     def is_running(self) -> bool:
         """Devuelve True si la transcripción está activa."""
         return self._is_running_transcription
 
-    def start(self):
-        """Inicia la transcripción Whisper en un hilo separado."""
-        global _model_name_loaded, _whisper_model, _model_ready_event
+    def start(self, progressive: bool = False):
+        """
+        Inicia la transcripción Whisper en un hilo separado.
+        progressive: primero un borrador con config.PROGRESSIVE_DRAFT_MODEL y luego el
+        modelo cargado refina el resultado ventana a ventana.
+        """
+        global _model_name_loaded, _loaded_engine, _model_ready_event
 
         if not self.audio_path:
             self.error_callback("Whisper: Falta la ruta al archivo de audio.")
@@ -166,21 +537,91 @@ class WhisperTranscriber:
             return
 
         with _model_lock:
-            if not _model_ready_event.is_set() or not _whisper_model:
+            if not _model_ready_event.is_set() or not _model_name_loaded:
                 self.error_callback("Whisper: El modelo no está cargado o listo. Por favor, selecciona y carga un modelo primero.")
                 return
             print(f"Whisper: Iniciando transcripción con el modelo cargado: '{_model_name_loaded}' para el archivo {self.audio_path}")
 
         self._is_running_transcription = True
-        self._transcription_thread = threading.Thread(target=self._run_transcription, daemon=True)
+        self._stop_requested.clear()
+        target = self._run_progressive_transcription if progressive else self._run_transcription
+        self._transcription_thread = threading.Thread(target=target, daemon=True)
         self._transcription_thread.start()
 
-    def stop(self):
-        """Whisper no soporta interrupción directa de transcribe(). Placeholder."""
+    def start_span(self, start_sec: float, end_sec: float, model_name: str | None = None,
+                   initial_prompt: str | None = None, language: str | None = None):
+        """
+        Re-transcribe solo [start_sec, end_sec) en un hilo y entrega el resultado a span_callback.
+        model_name: otro modelo para este fragmento (None = el cargado). initial_prompt: prompt
+        específico (None = el del idioma). Solo se decodifica el fragmento, no el archivo entero.
+        """
+        if not self.audio_path:
+            self.error_callback("Whisper: Falta la ruta al archivo de audio.")
+            return
         if self.is_running():
-            print("Advertencia: La transcripción Whisper no se puede detener una vez iniciada.")
-        else:
+            print("Transcripción Whisper ya en progreso.")
+            return
+        with _model_lock:
+            if not _model_ready_event.is_set() or not _model_name_loaded:
+                self.error_callback("Whisper: El modelo no está cargado o listo.")
+                return
+        self._is_running_transcription = True
+        self._stop_requested.clear()
+        self._transcription_thread = threading.Thread(
+            target=self._run_span_transcription, args=(start_sec, end_sec, model_name, initial_prompt, language), daemon=True)
+        self._transcription_thread.start()
+
+    def _run_span_transcription(self, start_sec: float, end_sec: float, model_name: str | None,
+                                initial_prompt: str | None, language: str | None):
+        """Hilo de start_span()."""
+        segments = None
+        info = {"model": model_name, "audio_sec": end_sec - start_sec, "elapsed_sec": None}
+        try:
+            self._attach_worker()
+            with _model_lock:
+                loaded_name = _model_name_loaded
+            if model_name and model_name != loaded_name:
+                self.status_callback(f"Cargando '{model_name}' para el fragmento...")
+                engine = _get_auxiliary_engine(model_name)
+            else:
+                engine = _get_main_engine()
+            info["model"] = engine.model_name
+            options = build_transcribe_options(language, self.decoding_preset)
+            if initial_prompt:
+                options["initial_prompt"] = initial_prompt
+            self.status_callback(f"Re-transcribiendo {start_sec:.1f}-{end_sec:.1f} s con '{engine.model_name}'...")
+            start_time = time.time()
+            segments = transcribe_range(engine, self.audio_path, start_sec, end_sec, options)
+            info["elapsed_sec"] = time.time() - start_time
+            print(f"Fragmento {start_sec:.1f}-{end_sec:.1f} s re-transcrito con '{engine.model_name}' en {info['elapsed_sec']:.2f} s.")
+        except TranscriptionCancelled:
+            print(f"Re-transcripción del fragmento {start_sec:.1f}-{end_sec:.1f} s detenida.")
+            segments = None
+        except Exception as e:
+            error_msg = f"Error al re-transcribir el fragmento {start_sec:.1f}-{end_sec:.1f} s: {e}"
+            print(error_msg)
+            self.error_callback(error_msg)
+        finally:
+            self._active_worker = None
+            self._is_running_transcription = False
+            if self.span_callback:
+                self.span_callback(start_sec, end_sec, segments, info)
+
+    def stop(self):
+        """
+        Detiene la transcripción en curso (también la detección de idioma, el borrador, el refinado,
+        los fragmentos y la revisión). Con el proceso de trabajo, al instante (se mata el proceso);
+        si no, al terminar el segmento o la ventana que se está decodificando.
+        """
+        if not self.is_running():
             print("Whisper transcriber (transcripción) no estaba corriendo.")
+            return
+        self._stop_requested.set()
+        worker = self._active_worker
+        if worker is not None:
+            worker.cancel()
+        else:
+            print("INFO: La transcripción se detendrá al terminar el segmento o la ventana en curso.")
 
     def join(self, timeout=None):
         """Espera a que el hilo de transcripción termine."""
@@ -190,13 +631,13 @@ class WhisperTranscriber:
     def _run_transcription(self):
         """Lógica principal de transcripción Whisper."""
         with _model_lock:
-            current_model = _whisper_model
-            current_model_name = _model_name_loaded
+            current_model = None # None = el modelo cargado (en el proceso de trabajo o en este)
+            current_model_name = _model_name_loaded if _model_ready_event.is_set() else None
 
         success = False
         result_data = None # Cambiado para almacenar el dict completo
 
-        if not current_model or not current_model_name:
+        if not current_model_name:
              self.error_callback("Intento de transcribir con Whisper sin modelo cargado.")
              # Llamar a completion_callback con fallo
              self.completion_callback(False, None) # Pasar None como resultado
@@ -208,33 +649,87 @@ class WhisperTranscriber:
              self._is_running_transcription = False
              return
 
+        live_writers = []
+        routing = None
+        segments = []
+        options = build_transcribe_options(preset=self.decoding_preset)
         try:
+            self._attach_worker()
+            current_model, current_model_name, options, routing = self._route(current_model, current_model_name)
             self.status_callback(f"Transcribiendo con Whisper '{current_model_name}' (puede tardar)...")
-            print(f"Iniciando transcripción Whisper para: {self.audio_path.name} usando {current_model_name}")
+            print(f"Iniciando transcripción Whisper para: {self.audio_path.name} usando {current_model_name} "
+                  f"(preajuste '{self.decoding_preset}')")
             start_time = time.time()
             audio_path_str = str(self.audio_path)
 
-            # Ejecutar transcripción
+            # Ejecutar transcripción (el motor aplica su modo de precisión)
             # word_timestamps=True es útil pero puede alentar un poco y consumir más memoria
             # segment level timestamps suelen ser suficientes para la sincronización básica.
-            result_data = current_model.transcribe(
-                audio_path_str,
-                language=config.TARGET_LANGUAGE,
-                initial_prompt=config.WHISPER_INITIAL_PROMPT,
-                fp16=False, # Forzar CPU/compatibilidad general, cambiar si se tiene GPU potente y se prueba
-                # word_timestamps=False # Descomentar si se prefiere usar word timestamps (más granular)
-                verbose=None # Usar None o False para menos output en consola
-            )
+            # Los segmentos se consumen de uno en uno: los motores con streaming los entregan
+            # mientras decodifican y así las exportaciones en vivo son usables antes de acabar.
+            live_writers = self._open_live_writers()
+            speed_factor = self.speed_factor if self.speed_factor and self.speed_factor > 1.0 else 1.0
+            if current_model is None:
+                current_model = _get_main_engine()
+            if isinstance(current_model, _WorkerModel): # La aceleración también se hace en el proceso de trabajo
+                if speed_factor > 1.0:
+                    self.status_callback(f"Transcribiendo con Whisper '{current_model_name}' (acelerado {speed_factor:g}x)...")
+                segment_source = current_model.worker.iter_segments(self.audio_path, options, speed_factor, current_model_name)
+            else: # Sin proceso de trabajo (desactivado o ya cerrado)
+                segment_source = self._iter_segments_in_process(current_model, current_model_name, audio_path_str, options, speed_factor)
+            for segment in segment_source:
+                if self._stop_requested.is_set():
+                    raise TranscriptionCancelled("Transcripción detenida.")
+                for writer in live_writers:
+                    writer.write_segment(segment)
+                if self.segment_callback:
+                    self.segment_callback(segment)
+                segments.append(slim_segment(segment)) # Sin tokens ni datos del decodificador: una fracción de la memoria
+            recheck_report = None
+            if self.recheck_low_confidence and current_model_name != config.RECHECK_MODEL and segments:
+                self.status_callback(f"Revisando segmentos dudosos con '{config.RECHECK_MODEL}'...")
+                recheck_engine = _get_auxiliary_engine(config.RECHECK_MODEL)
+                segments, recheck_report = recheck_low_confidence(segments, recheck_engine, self.audio_path, options)
+                print(f"Revisión selectiva con '{config.RECHECK_MODEL}': {recheck_report['flagged_segments']} segmentos dudosos, "
+                      f"{recheck_report['redone_sec']:.1f} s de {recheck_report['audio_sec']:.1f} s rehechos "
+                      f"({recheck_report['redone_ratio']:.0%}) en {recheck_report['recheck_sec']:.2f} s.")
+            result_data = {
+                "text": "".join(segment.get("text", "") for segment in segments),
+                "segments": segments,
+                "language": options["language"],
+            }
+            if recheck_report:
+                result_data["recheck"] = recheck_report
+            if routing:
+                result_data["language_detection"] = routing
+            if speed_factor > 1.0:
+                result_data["speed_factor"] = speed_factor
+            result_data["decoding_preset"] = self.decoding_preset
 
             end_time = time.time()
             print(f"Transcripción Whisper ({current_model_name}) completada en {end_time - start_time:.2f} segundos.")
+            metrics.record_transcription(current_model_name, self._audio_duration(segments), end_time - start_time)
             # El texto se pasa ahora dentro del result_data
             # self.status_callback("Transcripción Whisper completada.") # El status se actualiza en GUI al recibir resultado
             success = True
 
+        except TranscriptionCancelled:
+            print(f"Transcripción Whisper ({current_model_name}) detenida con {len(segments)} segmentos.")
+            metrics.record_transcription(current_model_name, None, 0.0, outcome="cancelled")
+            # Se conserva lo ya transcrito (también está en las exportaciones en vivo)
+            result_data = {
+                "text": "".join(segment.get("text", "") for segment in segments),
+                "segments": segments,
+                "language": options["language"],
+                "cancelled": True,
+            }
+            success = False
+
         except Exception as e:
             error_msg = f"Error crítico en transcripción Whisper ({current_model_name}): {e}"
             print(error_msg)
+            metrics.record_failure("transcription", e)
+            metrics.record_transcription(current_model_name, None, 0.0, outcome="error")
             # Crear un diccionario de error simulado si falla
             result_data = {
                 "text": f"Error en transcripción Whisper ({current_model_name}):\n{e}",
@@ -245,6 +740,9 @@ class WhisperTranscriber:
             # self.status_callback("Error durante transcripción Whisper.")
             success = False
         finally:
+            self._active_worker = None
+            for writer in live_writers:
+                writer.close()
             # IMPORTANTE: Llamar a update_callback con el diccionario completo
             # La GUI se encargará de extraer el texto y los segmentos
             self.update_callback(result_data)
@@ -252,4 +750,194 @@ class WhisperTranscriber:
             self._is_running_transcription = False
             # Notificar al GUI que el proceso de *transcripción* ha terminado
             # Se pasa el resultado para que la GUI lo tenga inmediatamente si lo necesita
-            self.completion_callback(success, result_data)
\ No newline at end of file
+            self.completion_callback(success, result_data)
+
+    def _audio_duration(self, segments: list[dict]) -> float | None:
+        """Duración del audio para el RTF: cabecera del WAV o, si no es WAV, el final del último segmento."""
+        if self.audio_path.suffix.lower() == ".wav":
+            return audio_stream.wav_duration(self.audio_path)
+        return segments[-1].get("end") if segments else None
+
+    def _iter_segments_in_process(self, engine, model_name: str, audio_path_str: str, options: dict, speed_factor: float):
+        """Segmentos del motor de este proceso (sin proceso de trabajo), con el modo acelerado aplicado."""
+        audio_input = audio_path_str
+        if speed_factor > 1.0:
+            self.status_callback(f"Acelerando el audio {speed_factor:g}x...")
+            compress_start = time.time()
+            samples = audio_stream.load_float32(self.audio_path)
+            original_duration = len(samples) / audio_stream.WHISPER_SAMPLE_RATE
+            audio_input = time_compression.compress(samples, speed_factor)
+            del samples
+            print(f"Audio acelerado {speed_factor:g}x en {time.time() - compress_start:.2f} s.")
+            self.status_callback(f"Transcribiendo con Whisper '{model_name}' (acelerado {speed_factor:g}x)...")
+        for segment in engine.iter_segments(audio_input, **options):
+            if speed_factor > 1.0: # Tiempos del audio acelerado -> línea temporal original
+                segment = time_compression.remap_segment(dict(segment), speed_factor, original_duration)
+            yield segment
+
+    def _run_progressive_transcription(self):
+        """
+        Transcripción en dos pasadas: borrador inmediato con el modelo pequeño y refinado
+        en segundo plano con el modelo cargado, ventana a ventana.
+        """
+        with _model_lock:
+            current_model = None
+            current_model_name = _model_name_loaded if _model_ready_event.is_set() else None
+
+        if not current_model_name or not self.audio_path or not self.audio_path.exists():
+            self.error_callback("Whisper: Falta el modelo cargado o el archivo de audio para la transcripción progresiva.")
+            self.completion_callback(False, None)
+            self._is_running_transcription = False
+            return
+
+        success = False
+        result_data = None
+        draft_segments = None
+        final_segments = []
+        timing = {"draft_model": config.PROGRESSIVE_DRAFT_MODEL, "first_text_sec": None, "total_sec": None}
+        options = build_transcribe_options(preset=self.decoding_preset)
+        routing = None
+        try:
+            self._attach_worker()
+            current_model, current_model_name, options, routing = self._route(current_model, current_model_name)
+            start_time = time.time()
+
+            # --- Pasada 1: borrador ---
+            self.status_callback(f"Generando borrador rápido con '{config.PROGRESSIVE_DRAFT_MODEL}'...")
+            draft_engine = _get_draft_engine()
+            draft = draft_engine.transcribe(str(self.audio_path), **options)
+            draft_segments = [dict(slim_segment(segment), id=index) for index, segment in enumerate(draft.get("segments", []))]
+            timing["first_text_sec"] = time.time() - start_time
+            print(f"Borrador ({config.PROGRESSIVE_DRAFT_MODEL}) listo en {timing['first_text_sec']:.2f} segundos.")
+            if self.draft_callback:
+                self.draft_callback({
+                    "text": "".join(segment["text"] for segment in draft_segments),
+                    "segments": [dict(segment) for segment in draft_segments],
+                    "language": options["language"],
+                }, timing["first_text_sec"])
+
+            # --- Pasada 2: refinado por ventanas ---
+            if current_model is None: # Después del borrador: nada retrasa el primer texto
+                current_model = _get_main_engine()
+            windows = group_segments_into_windows(draft_segments, config.PROGRESSIVE_WINDOW_SEC)
+            next_id = len(draft_segments)
+            previous_text = ""
+            for window_number, indices in enumerate(windows, start=1):
+                if self._stop_requested.is_set():
+                    raise TranscriptionCancelled("Refinado detenido.")
+                window_start = draft_segments[indices[0]]["start"]
+                window_end = draft_segments[indices[-1]]["end"]
+                self.status_callback(f"Borrador listo. Refinando con '{current_model_name}': ventana {window_number}/{len(windows)}...")
+                window_options = dict(options)
+                if previous_text: # Contexto de la ventana anterior para mantener la coherencia
+                    window_options["initial_prompt"] = f"{options['initial_prompt'] or ''} {previous_text[-200:]}".strip()
+                refined = transcribe_range(current_model, self.audio_path, window_start, window_end, window_options)
+                if not refined: # Nada que mejorar (silencio): se conserva el borrador
+                    final_segments.extend(draft_segments[i] for i in indices)
+                    continue
+                for segment in refined:
+                    segment["id"] = next_id
+                    next_id += 1
+                previous_text = "".join(segment["text"] for segment in refined)
+                final_segments.extend(refined)
+                if self.refine_callback:
+                    self.refine_callback([draft_segments[i]["id"] for i in indices], refined)
+
+            timing["total_sec"] = time.time() - start_time
+            print(f"Transcripción progresiva completada: primer texto en {timing['first_text_sec']:.2f} s, total {timing['total_sec']:.2f} s.")
+            success = True
+
+        except TranscriptionCancelled:
+            if draft_segments is None:
+                print("Transcripción progresiva detenida antes del borrador.")
+            else:
+                print("Refinado progresivo detenido. Se conserva el borrador de las ventanas no refinadas.")
+                refined_until = final_segments[-1]["end"] if final_segments else -1.0
+                final_segments.extend(segment for segment in draft_segments if segment["start"] >= refined_until)
+                success = True
+
+        except Exception as e:
+            error_msg = f"Error en transcripción progresiva ({current_model_name}): {e}"
+            print(error_msg)
+            metrics.record_failure("transcription", e)
+            self.error_callback(error_msg)
+            if draft_segments is not None:
+                # El borrador ya está en pantalla: se completa con las ventanas no refinadas
+                refined_until = final_segments[-1]["end"] if final_segments else -1.0
+                final_segments.extend(segment for segment in draft_segments if segment["start"] >= refined_until)
+                success = True
+        finally:
+            if draft_segments is not None:
+                result_data = {
+                    "text": "".join(segment.get("text", "") for segment in final_segments),
+                    "segments": final_segments,
+                    "language": options["language"],
+                    "progressive": timing,
+                    "decoding_preset": self.decoding_preset,
+                }
+                if routing:
+                    result_data["language_detection"] = routing
+            elif self._stop_requested.is_set():
+                result_data = {"text": "", "segments": [], "language": options["language"], "cancelled": True}
+            else:
+                result_data = {
+                    "text": f"Error en transcripción Whisper ({current_model_name}).",
+                    "segments": [],
+                    "language": config.TARGET_LANGUAGE
+                }
+                self.update_callback(result_data) # Sin borrador: mostrar el error en el área de texto
+            self._active_worker = None
+            self._is_running_transcription = False
+            self.completion_callback(success, result_data)
+
+
+# --- Uso síncrono (modos sin interfaz gráfica: carpeta vigilada, lotes...) ---
+
+def load_model_blocking(model_name: str, precision: str | None = None, engine: str | None = None) -> bool:
+    """Carga el modelo y espera a que termine. Devuelve True si quedó listo."""
+    done_event = threading.Event()
+    outcome = {"success": False}
+
+    def on_complete(success, _name):
+        outcome["success"] = success
+        done_event.set()
+
+    loader = WhisperTranscriber(lambda _r: None, lambda _s: None, lambda _ok, _r: None,
+                                lambda error: print(f"ERROR: {error}"))
+    loader.load_model(model_name, progress_callback=lambda _msg, _perc: None,
+                      model_completion_callback=on_complete, precision=precision, engine=engine)
+    done_event.wait()
+    return outcome["success"]
+
+def transcribe_samples(samples, options: dict) -> dict:
+    """
+    Transcribe un array (mono float32 a 16 kHz) con el modelo cargado, en el proceso de
+    trabajo si está activo (sin cargar otra copia del modelo aquí). Devuelve {"text", "segments"}.
+    """
+    return _get_main_engine().transcribe(samples, **options)
+
+def transcribe_file_blocking(audio_path: pathlib.Path, live_export_paths=(), speed_factor: float | None = None,
+                             decoding_preset: str | None = None) -> dict | None:
+    """
+    Transcribe un archivo con el modelo cargado y espera al resultado.
+    speed_factor: modo acelerado (None = config.DEFAULT_SPEED_FACTOR).
+    decoding_preset: preajuste de config.DECODING_PRESETS (None = config.DEFAULT_DECODING_PRESET).
+    Devuelve el dict de resultado, o None si hubo error.
+    """
+    outcome = {"success": False, "result": None}
+
+    def on_complete(success, result):
+        outcome["success"] = success
+        outcome["result"] = result
+
+    transcriber = WhisperTranscriber(lambda _r: None, lambda _s: None, on_complete,
+                                     lambda error: print(f"ERROR: {error}"))
+    transcriber.set_audio_file(pathlib.Path(audio_path))
+    transcriber.set_live_export_paths(list(live_export_paths))
+    if speed_factor is not None:
+        transcriber.speed_factor = speed_factor
+    if decoding_preset is not None:
+        transcriber.decoding_preset = decoding_preset
+    transcriber.start()
+    transcriber.join()
+    return outcome["result"] if outcome["success"] else None
@@ -0,0 +1,296 @@
+# windowed_transcription.py
+"""
+Transcripción con openai-whisper en memoria constante, ventana a ventana.
+
+model.transcribe() decodifica el archivo entero a un array y calcula el espectrograma
+log-mel de toda la duración antes de empezar: la memoria crece con la longitud (una
+reunión de 4 horas son ~900 MB de audio y ~450 MB de espectrograma con 128 bandas).
+Aquí el audio llega en bloques desde ffmpeg (audio_stream) y solo se guarda el tramo
+de la ventana actual (30 s + los bordes de la STFT); el espectrograma se calcula por
+ventana y el bucle de búsqueda ('seek'), el fallback de temperatura y la división en
+segmentos son los de whisper.transcribe(). Entre ventanas solo se arrastra el contexto
+mínimo: los últimos tokens que caben en el prompt y el máximo del espectrograma visto.
+
+La salida coincide con la de model.transcribe() salvo en un detalle: Whisper limita el
+rango dinámico a 80 dB bajo el máximo de TODO el archivo y aquí bajo el máximo visto
+hasta la ventana actual, lo que solo cambia tramas casi en silencio.
+"""
+
+import contextlib
+import pathlib
+import audio_stream
+import config
+
+try:
+    import numpy as np
+    import torch
+    import whisper
+    from whisper.audio import HOP_LENGTH, N_FFT, N_FRAMES, N_SAMPLES, SAMPLE_RATE, mel_filters
+    from whisper.tokenizer import get_tokenizer
+except ImportError: # transcription_engines ya avisa de que falta Whisper
+    np = torch = whisper = None
+
+# Opciones de transcribe() que este bucle no implementa: con ellas se usa model.transcribe()
+_UNSUPPORTED_OPTIONS = {"word_timestamps": False, "clip_timestamps": "0", "hallucination_silence_threshold": None}
+_IGNORED_OPTIONS = ("verbose", "prepend_punctuations", "append_punctuations")
+
+
+def supports_options(options: dict) -> bool:
+    """True si las opciones de transcribe() se pueden respetar ventana a ventana."""
+    return all(options.get(key, default) in (default, None, False) for key, default in _UNSUPPORTED_OPTIONS.items())
+
+def should_use(audio, options: dict) -> bool:
+    """
+    Decide si un audio se transcribe por ventanas: solo rutas (los arrays ya están en
+    memoria), si está activado y si el archivo dura al menos config.WINDOWED_MIN_DURATION_SEC
+    (cabecera del WAV o duración del contenedor con ffprobe). Si la duración no se conoce,
+    no: las notas cortas darían un resultado distinto al de model.transcribe().
+    """
+    if whisper is None or not config.WINDOWED_TRANSCRIPTION or not isinstance(audio, (str, pathlib.Path)):
+        return False
+    if not supports_options(options):
+        return False
+    path = pathlib.Path(audio)
+    duration = audio_stream.wav_duration(path) if path.suffix.lower() == ".wav" else audio_stream.probe_duration(path)
+    return duration is not None and duration >= config.WINDOWED_MIN_DURATION_SEC
+
+
+class _StreamingMel:
+    """
+    Espectrograma log-mel de una ventana a partir del audio en streaming. Guarda solo las
+    muestras desde el borde izquierdo de la ventana actual; las tramas son idénticas a las
+    de log_mel_spectrogram() sobre el archivo completo (mismo centrado y relleno de la STFT).
+    """
+
+    def __init__(self, audio_path: pathlib.Path, n_mels: int, device):
+        self._chunks = audio_stream.iter_float32(audio_path)
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._origin = 0 # Índice global de self._samples[0] (negativo: relleno reflejado del inicio)
+        self._started = False
+        self.finished = False
+        self.total_samples = 0
+        self._window = torch.hann_window(N_FFT)
+        self._filters = mel_filters(torch.device("cpu"), n_mels)
+        self._device = device
+        self._peak = None # Máximo del log-espectrograma visto hasta ahora
+
+    def _read_until(self, end_sample: int):
+        """Lee bloques de ffmpeg hasta tener las muestras globales < end_sample (o el final)."""
+        pending = [self._samples]
+        available = self._origin + len(self._samples)
+        while available < end_sample and not self.finished:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.finished = True
+                break
+            pending.append(chunk.copy()) # El bloque es una vista de un buffer reutilizado
+            available += len(chunk)
+            self.total_samples += len(chunk)
+        if len(pending) > 1:
+            self._samples = np.concatenate(pending)
+        if not self._started and len(self._samples):
+            # Relleno reflejado del inicio, como el centrado de torch.stft sobre el archivo completo
+            reflect = self._samples[1:N_FFT // 2 + 1][::-1]
+            self._samples = np.concatenate((reflect, self._samples))
+            self._origin = -len(reflect)
+            self._started = True
+
+    def _discard_before(self, sample: int):
+        """Olvida las muestras anteriores a 'sample' (el bucle de Whisper nunca retrocede)."""
+        drop = sample - self._origin
+        if drop > 0:
+            self._samples = self._samples[drop:].copy()
+            self._origin = sample
+
+    def content_frames(self) -> int | None:
+        """Tramas de audio del archivo (como en whisper.transcribe), o None si aún no se ha leído entero."""
+        return self.total_samples // HOP_LENGTH if self.finished else None
+
+    def window(self, seek: int):
+        """
+        (mel_segment, segment_size) de la ventana que empieza en la trama 'seek', con la misma
+        forma y relleno que en whisper.transcribe(); None si 'seek' ya está al final del audio.
+        """
+        start = seek * HOP_LENGTH - N_FFT // 2
+        end = seek * HOP_LENGTH + N_SAMPLES + N_FFT // 2
+        self._read_until(end)
+        self._discard_before(start)
+        content_frames = self.content_frames()
+        segment_size = N_FRAMES if content_frames is None else min(N_FRAMES, content_frames - seek)
+        if segment_size <= 0:
+            return None
+
+        samples = np.zeros(end - start, dtype=np.float32) # Más allá del final: silencio (el relleno de Whisper)
+        offset = max(start, self._origin)
+        available = self._samples[offset - self._origin:end - self._origin]
+        samples[offset - start:offset - start + len(available)] = available
+        stft = torch.stft(torch.from_numpy(samples), N_FFT, HOP_LENGTH, window=self._window, center=False, return_complex=True)
+        log_spec = torch.clamp(self._filters @ (stft[:, :N_FRAMES].abs() ** 2), min=1e-10).log10()
+        window_peak = log_spec[:, :segment_size].max()
+        self._peak = window_peak if self._peak is None else torch.maximum(self._peak, window_peak)
+        log_spec = (torch.maximum(log_spec, self._peak - 8.0) + 4.0) / 4.0
+        log_spec[:, segment_size:] = 0.0 # pad_or_trim() de Whisper rellena con ceros tras normalizar
+        return log_spec.to(self._device), segment_size
+
+    def close(self):
+        self._chunks.close() # Termina ffmpeg si se abandona a mitad
+
+
+class WindowedTranscription:
+    """
+    Iterador de segmentos (mismo formato que model.transcribe()) decodificando una ventana
+    de 30 s cada vez. 'language' queda fijado al empezar (detectado si no se indicó).
+    """
+
+    def __init__(self, model, audio_path: pathlib.Path, temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                 compression_ratio_threshold: float | None = 2.4, logprob_threshold: float | None = -1.0,
+                 no_speech_threshold: float | None = 0.6, condition_on_previous_text: bool = True,
+                 initial_prompt: str | None = None, carry_initial_prompt: bool = False, precision_context=None,
+                 **decode_options):
+        if not supports_options(decode_options):
+            raise ValueError("Opciones no soportadas por la transcripción por ventanas (word_timestamps, clip_timestamps...).")
+        for key in tuple(_UNSUPPORTED_OPTIONS) + _IGNORED_OPTIONS:
+            decode_options.pop(key, None)
+        self.model = model
+        self.audio_path = pathlib.Path(audio_path)
+        self.temperatures = [temperature] if isinstance(temperature, (int, float)) else list(temperature)
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.condition_on_previous_text = condition_on_previous_text
+        self.initial_prompt = initial_prompt
+        self.carry_initial_prompt = carry_initial_prompt
+        self.precision_context = precision_context
+        self.dtype = torch.float16 if decode_options.get("fp16", True) and model.device.type != "cpu" else torch.float32
+        if self.dtype == torch.float32:
+            decode_options["fp16"] = False
+        self.decode_options = decode_options
+        self.language = decode_options.get("language")
+
+    def _context(self):
+        return self.precision_context() if self.precision_context else contextlib.nullcontext()
+
+    def _decode_with_fallback(self, mel_segment):
+        """Igual que en whisper.transcribe(): sube la temperatura si el resultado es repetitivo o improbable."""
+        result = None
+        for temperature in self.temperatures:
+            kwargs = dict(self.decode_options)
+            if temperature > 0:
+                kwargs.pop("beam_size", None)
+                kwargs.pop("patience", None)
+            else:
+                kwargs.pop("best_of", None)
+            with self._context():
+                result = self.model.decode(mel_segment, whisper.DecodingOptions(**kwargs, temperature=temperature))
+            needs_fallback = ((self.compression_ratio_threshold is not None
+                               and result.compression_ratio > self.compression_ratio_threshold)
+                              or (self.logprob_threshold is not None and result.avg_logprob < self.logprob_threshold))
+            if (self.no_speech_threshold is not None and result.no_speech_prob > self.no_speech_threshold
+                    and self.logprob_threshold is not None and result.avg_logprob < self.logprob_threshold):
+                needs_fallback = False # Silencio
+            if not needs_fallback:
+                break
+        return result
+
+    def __iter__(self):
+        model = self.model
+        mel = _StreamingMel(self.audio_path, model.dims.n_mels, model.device)
+        try:
+            yield from self._run(model, mel)
+        finally:
+            mel.close()
+
+    def _run(self, model, mel: _StreamingMel):
+        first_window = mel.window(0)
+        if first_window is None:
+            return
+        if self.decode_options.get("language") is None:
+            if not model.is_multilingual:
+                self.decode_options["language"] = "en"
+            else:
+                with self._context():
+                    _tokens, probabilities = model.detect_language(first_window[0].to(self.dtype))
+                self.decode_options["language"] = max(probabilities, key=probabilities.get)
+        self.language = self.decode_options["language"]
+        tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                  language=self.language, task=self.decode_options.get("task", "transcribe"))
+
+        input_stride = N_FRAMES // model.dims.n_audio_ctx # Tramas mel por token de tiempo: 2
+        time_precision = input_stride * HOP_LENGTH / SAMPLE_RATE # 0.02 s
+        max_prompt_tokens = model.dims.n_text_ctx // 2 - 1 # Lo que el decodificador usa del prompt
+        initial_prompt_tokens = tokenizer.encode(" " + self.initial_prompt.strip()) if self.initial_prompt else []
+        remaining_prompt_length = max_prompt_tokens - len(initial_prompt_tokens)
+        # Único contexto entre ventanas: la cola de tokens que cabe en el prompt
+        context_tokens = [] if self.carry_initial_prompt else list(initial_prompt_tokens)
+        segment_id = 0
+        seek = 0
+        window = first_window
+
+        while window is not None:
+            mel_segment, segment_size = window
+            time_offset = float(seek * HOP_LENGTH / SAMPLE_RATE)
+            segment_duration = segment_size * HOP_LENGTH / SAMPLE_RATE
+            if self.carry_initial_prompt:
+                self.decode_options["prompt"] = initial_prompt_tokens + context_tokens[-remaining_prompt_length:]
+            else:
+                self.decode_options["prompt"] = list(context_tokens)
+            result = self._decode_with_fallback(mel_segment.to(self.dtype))
+            tokens = torch.tensor(result.tokens)
+
+            should_skip = self.no_speech_threshold is not None and result.no_speech_prob > self.no_speech_threshold
+            if should_skip and self.logprob_threshold is not None and result.avg_logprob > self.logprob_threshold:
+                should_skip = False
+            if should_skip:
+                seek += segment_size
+                window = mel.window(seek)
+                continue
+
+            window_seek = seek
+            current_segments = []
+
+            def new_segment(start: float, end: float, segment_tokens):
+                segment_tokens = segment_tokens.tolist()
+                return {"seek": window_seek, "start": start, "end": end,
+                        "text": tokenizer.decode([token for token in segment_tokens if token < tokenizer.eot]),
+                        "tokens": segment_tokens, "temperature": result.temperature, "avg_logprob": result.avg_logprob,
+                        "compression_ratio": result.compression_ratio, "no_speech_prob": result.no_speech_prob}
+
+            timestamp_tokens = tokens.ge(tokenizer.timestamp_begin)
+            single_timestamp_ending = timestamp_tokens[-2:].tolist() == [False, True]
+            consecutive = torch.where(timestamp_tokens[:-1] & timestamp_tokens[1:])[0] + 1
+            if len(consecutive) > 0: # Hay pares de timestamps: un segmento por par
+                slices = consecutive.tolist()
+                if single_timestamp_ending:
+                    slices.append(len(tokens))
+                last_slice = 0
+                for current_slice in slices:
+                    sliced_tokens = tokens[last_slice:current_slice]
+                    start_position = sliced_tokens[0].item() - tokenizer.timestamp_begin
+                    end_position = sliced_tokens[-1].item() - tokenizer.timestamp_begin
+                    current_segments.append(new_segment(time_offset + start_position * time_precision,
+                                                        time_offset + end_position * time_precision, sliced_tokens))
+                    last_slice = current_slice
+                if single_timestamp_ending:
+                    seek += segment_size
+                else: # El último segmento quedó a medias: se vuelve a decodificar desde su inicio
+                    seek += (tokens[last_slice - 1].item() - tokenizer.timestamp_begin) * input_stride
+            else:
+                duration = segment_duration
+                timestamps = tokens[timestamp_tokens.nonzero().flatten()]
+                if len(timestamps) > 0 and timestamps[-1].item() != tokenizer.timestamp_begin:
+                    duration = (timestamps[-1].item() - tokenizer.timestamp_begin) * time_precision
+                current_segments.append(new_segment(time_offset, time_offset + duration, tokens))
+                seek += segment_size
+
+            for segment in current_segments:
+                if segment["start"] == segment["end"] or segment["text"].strip() == "":
+                    segment["text"] = ""
+                    segment["tokens"] = []
+                context_tokens.extend(segment["tokens"])
+                yield {"id": segment_id, **segment}
+                segment_id += 1
+            if not self.condition_on_previous_text or result.temperature > 0.5:
+                context_tokens = [] # Como en Whisper: sin prompt tras una temperatura alta
+            elif len(context_tokens) > max_prompt_tokens:
+                del context_tokens[:-max_prompt_tokens]
+            window = mel.window(seek)